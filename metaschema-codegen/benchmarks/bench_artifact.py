@@ -0,0 +1,90 @@
+"""
+Measures how quickly a worker can load a compiled schema artifact.
+
+The metaschema set is parsed once and compiled into an artifact. The benchmark then starts fresh interpreters that
+load the artifact, and reports the time each takes to import the loader and load it. It fails if loading pulls in
+xmlschema, lxml or elementpath.
+
+Usage (from the metaschema-codegen directory):
+
+    python benchmarks/bench_artifact.py [OSCAL/src/metaschema/oscal_complete_metaschema.xml] [--root catalog]
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from metaschema_codegen.core.artifact import compile_artifact, write_artifact
+from metaschema_codegen.core.schemaparse import MetaschemaSetParser
+
+# Run in a fresh interpreter, so the time includes importing the loader
+LOAD_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+from metaschema_codegen.databind.artifact import load_artifact
+artifact = load_artifact(sys.argv[1])
+elapsed = time.perf_counter() - start
+heavy = [m for m in ("xmlschema", "lxml", "elementpath") if m in sys.modules]
+print(elapsed, len(artifact.definitions), ",".join(heavy))
+"""
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "location",
+        nargs="?",
+        default="OSCAL/src/metaschema/oscal_complete_metaschema.xml",
+        help="The base metaschema file. Defaults to the OSCAL complete metaschema.",
+    )
+    parser.add_argument(
+        "-S", "--schema", help="The location of the metaschema xsd file."
+    )
+    parser.add_argument(
+        "--cache-dir", type=Path, help="The metaschema xsd cache directory."
+    )
+    parser.add_argument(
+        "--root", dest="roots", action="append", help="A root assembly to select."
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    schema_args = {}
+    if args.schema is not None:
+        schema_args = {"schema_location": args.schema, "schema_base_url": None}
+
+    metaschema_set = MetaschemaSetParser(
+        metaschema_location=args.location, cache_dir=args.cache_dir, **schema_args
+    ).metaschema_set
+    contents = compile_artifact(metaschema_set, roots=args.roots)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir, "schema.msa")
+        write_artifact(path, contents)
+
+        timings = []
+        for _ in range(args.repeat):
+            result = subprocess.run(
+                [sys.executable, "-c", LOAD_SCRIPT, str(path)],
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+            elapsed, definitions, heavy = (result.stdout.strip().split(" ") + [""])[:3]
+            if heavy:
+                print(f"Loading the artifact imported {heavy}", file=sys.stderr)
+                return 1
+            timings.append(float(elapsed))
+
+    print(f"artifact: {len(contents) / 1024:.1f} KiB, {definitions} definitions")
+    print(
+        f"import and load: {statistics.median(timings) * 1000:.1f} ms (median of {args.repeat})"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""
+Compares the time the two extraction engines take to decode a set of metaschemas.
+
+Each metaschema file in the import closure of the base metaschema is parsed with lxml once, then decoded repeatedly
+with xmlschema's to_dict() and with an ElementExtractor. The schema_dict each engine produces is compared, so the
+benchmark fails if the engines disagree.
+
+Usage (from the metaschema-codegen directory):
+
+    python benchmarks/bench_extract.py [OSCAL/src/metaschema/oscal_complete_metaschema.xml] [--repeat 5]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from lxml import etree
+
+from metaschema_codegen.core.extract import ElementExtractor
+from metaschema_codegen.core.schemaparse import MetaschemaSetParser
+
+
+def _time(function, repeat: int) -> list[float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "location",
+        nargs="?",
+        default="OSCAL/src/metaschema/oscal_complete_metaschema.xml",
+        help="The base metaschema file. Defaults to the OSCAL complete metaschema.",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="Runs per engine. Defaults to 5."
+    )
+    parser.add_argument(
+        "-S", "--schema", help="The location of the metaschema xsd file."
+    )
+    parser.add_argument(
+        "--cache-dir", type=Path, help="The metaschema xsd cache directory."
+    )
+    args = parser.parse_args()
+
+    schema_args = {}
+    if args.schema is not None:
+        schema_args = {"schema_location": args.schema, "schema_base_url": None}
+
+    # Use the parser only to find the files in the import closure and to load the compiled xsd
+    metaschema_parser = MetaschemaSetParser(
+        metaschema_location=args.location,
+        cache_dir=args.cache_dir,
+        use_snapshot=False,
+        **schema_args,
+    )
+    schema_xsd = metaschema_parser._metaschema_schema()
+    xml_parser = etree.XMLParser(resolve_entities=True)
+    trees = [
+        etree.parse(Path(metaschema_parser.base, metaschema.file), parser=xml_parser)
+        for metaschema in metaschema_parser.metaschema_set.metaschemas
+    ]
+
+    extractor = ElementExtractor(schema_xsd)
+    for tree in trees:
+        if extractor.extract(tree) != schema_xsd.to_dict(tree):
+            print(f"The engines disagree on {tree.docinfo.URL}", file=sys.stderr)
+            return 1
+
+    timings = {
+        "xmlschema": _time(
+            lambda: [schema_xsd.to_dict(tree) for tree in trees], args.repeat
+        ),
+        # A new extractor on each run includes the time to build its decoding plans
+        "lxml": _time(
+            lambda: [ElementExtractor(schema_xsd).extract(tree) for tree in trees],
+            args.repeat,
+        ),
+    }
+
+    print(f"{len(trees)} metaschemas, {args.repeat} runs per engine")
+    for engine, engine_timings in timings.items():
+        print(
+            f"{engine:>10}: median {statistics.median(engine_timings):.3f}s, "
+            f"min {min(engine_timings):.3f}s, max {max(engine_timings):.3f}s"
+        )
+    speedup = statistics.median(timings["xmlschema"]) / statistics.median(
+        timings["lxml"]
+    )
+    print(f"lxml is {speedup:.1f}x faster")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
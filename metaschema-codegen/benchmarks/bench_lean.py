@@ -0,0 +1,81 @@
+"""
+Compares the memory a parsed metaschema set takes with and without lean mode.
+
+The set is parsed once normally and once with lean=True, without a snapshot. The memory each parsed set retains is
+measured with tracemalloc, after the parser (and with it the compiled xsd) has been released, so only the
+MetaSchemaSet is counted. The benchmark fails if the lean set's definitions differ from the full set's, apart from
+the documentation.
+
+Usage (from the metaschema-codegen directory):
+
+    python benchmarks/bench_lean.py [OSCAL/src/metaschema/oscal_complete_metaschema.xml]
+"""
+
+import argparse
+import gc
+import sys
+import tracemalloc
+from pathlib import Path
+
+from metaschema_codegen.core.schemaparse import MetaschemaSetParser, MetaSchemaSet
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "location",
+        nargs="?",
+        default="OSCAL/src/metaschema/oscal_complete_metaschema.xml",
+        help="The base metaschema file. Defaults to the OSCAL complete metaschema.",
+    )
+    parser.add_argument(
+        "-S", "--schema", help="The location of the metaschema xsd file."
+    )
+    parser.add_argument(
+        "--cache-dir", type=Path, help="The metaschema xsd cache directory."
+    )
+    args = parser.parse_args()
+
+    schema_args = {}
+    if args.schema is not None:
+        schema_args = {"schema_location": args.schema, "schema_base_url": None}
+
+    def parse(lean: bool) -> tuple[MetaSchemaSet, int]:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            metaschema_set = MetaschemaSetParser(
+                metaschema_location=args.location,
+                cache_dir=args.cache_dir,
+                use_snapshot=False,
+                lean=lean,
+                **schema_args,
+            ).metaschema_set
+            gc.collect()
+            retained = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+        return metaschema_set, retained
+
+    # Warm the xsd cache, so neither parse compiles it
+    parse(lean=False)
+
+    full_set, full_memory = parse(lean=False)
+    lean_set, lean_memory = parse(lean=True)
+
+    for full, lean in zip(full_set.metaschemas, lean_set.metaschemas):
+        full_names = [definition.name for definition in full.definitions or []]
+        lean_names = [definition.name for definition in lean.definitions or []]
+        if full_names != lean_names or full.globals != lean.globals:
+            print(f"The lean parse of {full.file} differs", file=sys.stderr)
+            return 1
+
+    print(f"{len(full_set.metaschemas)} metaschemas")
+    print(f"      full: {full_memory / 2**20:.1f} MiB")
+    print(f"      lean: {lean_memory / 2**20:.1f} MiB")
+    print(f"lean mode saves {1 - lean_memory / full_memory:.0%} of the memory")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+"""
+Compares the memory a loaded catalog takes with and without a __slots__ layout, in bytes per control.
+
+The catalog metaschema is parsed and its classes are created with load_bindings(), once with slots=False and once
+with slots=True. The catalog JSON, e.g. the NIST SP 800-53 rev5 catalog, is then loaded into objects of each set of
+classes: an assembly or field object per JSON object, and a flag object per flag. The values are the strings of the
+JSON document, which is read before measuring, so only the objects, their attributes and the lists of grouped
+children are counted. The memory the objects retain is measured with tracemalloc and divided by the number of
+controls, including control enhancements. The benchmark fails if the two loads create different numbers of objects.
+
+The classes measured are the runtime bindings of load_bindings(), not modules written by PackageGenerator, which
+doesn't generate field and assembly classes yet. The bindings take their attributes from
+core.layout.attribute_layout(), as the class templates do, so the objects have the same layout as those of generated
+classes. The base classes don't implement serialization yet, so the benchmark subclasses them with the abstract
+methods filled in, to be able to create objects.
+
+Usage (from the metaschema-codegen directory):
+
+    python benchmarks/bench_slots.py [OSCAL/src/metaschema/oscal_catalog_metaschema.xml] \\
+        [--catalog oscal-content/nist.gov/SP800-53/rev5/json/NIST_SP-800-53_rev5_catalog.json]
+"""
+
+import argparse
+import gc
+import json
+import sys
+import tracemalloc
+import types
+import typing
+from pathlib import Path
+
+from metaschema_codegen.core.artifact import compile_artifact
+from metaschema_codegen.core.schemaparse import MetaschemaSetParser
+from metaschema_codegen.databind.bindings import (
+    BindingInstance,
+    load_bindings,
+    load_runtime,
+)
+
+
+def concrete_runtime() -> types.ModuleType:
+    """
+    Returns a base_classes module whose Flag, Field and Assembly can be instantiated.
+    """
+    base_classes = load_runtime()
+    runtime = types.ModuleType("concrete_base_classes")
+    runtime.SimpleDatatype = base_classes.SimpleDatatype
+    runtime.ComplexDataType = base_classes.ComplexDataType
+    for name in ("Flag", "Field", "Assembly"):
+        base = getattr(base_classes, name)
+        namespace = {method: None for method in base.__abstractmethods__}
+        setattr(runtime, name, type(name, (base,), {"__slots__": (), **namespace}))
+    return runtime
+
+
+class ObjectLoader:
+    """
+    Loads a JSON document into objects of binding classes, and counts the objects of each definition.
+    """
+
+    def __init__(self, runtime: types.ModuleType) -> None:
+        self.runtime = runtime
+        self.counts: dict[str, int] = {}
+        self._json_keys: dict[type, dict[str, BindingInstance]] = {}
+
+    def load(self, binding: type, value: typing.Any) -> typing.Any:
+        self.counts[binding.name] = self.counts.get(binding.name, 0) + 1
+        if issubclass(binding, self.runtime.Flag):
+            return binding(value=value)
+        if not isinstance(value, dict):
+            # a field without flags
+            return binding(value=value)
+
+        json_keys = self._json_keys.get(binding)
+        if json_keys is None:
+            json_keys = {
+                instance.json_key: instance for instance in binding.instances.values()
+            }
+            self._json_keys[binding] = json_keys
+
+        attributes = {}
+        for key, item in value.items():
+            instance = json_keys.get(key)
+            if instance is None:
+                # the value of a field with flags
+                attributes["value"] = item
+            elif instance.multiple:
+                if (
+                    isinstance(item, dict)
+                    and (instance.group_as or {}).get("in_json") == "BY_KEY"
+                ):
+                    items = list(item.values())
+                else:
+                    items = item if isinstance(item, list) else [item]
+                attributes[instance.attribute] = [
+                    self.load(instance.binding, entry) for entry in items
+                ]
+            else:
+                attributes[instance.attribute] = self.load(instance.binding, item)
+        return binding(**attributes)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "location",
+        nargs="?",
+        default="OSCAL/src/metaschema/oscal_catalog_metaschema.xml",
+        help="The catalog metaschema file. Defaults to the OSCAL catalog metaschema.",
+    )
+    parser.add_argument(
+        "--catalog",
+        type=Path,
+        default=Path(
+            "oscal-content/nist.gov/SP800-53/rev5/json/NIST_SP-800-53_rev5_catalog.json"
+        ),
+        help="The catalog JSON file. Defaults to the NIST SP 800-53 rev5 catalog.",
+    )
+    parser.add_argument(
+        "-S", "--schema", help="The location of the metaschema xsd file."
+    )
+    parser.add_argument(
+        "--cache-dir", type=Path, help="The metaschema xsd cache directory."
+    )
+    args = parser.parse_args()
+
+    schema_args = {}
+    if args.schema is not None:
+        schema_args = {"schema_location": args.schema, "schema_base_url": None}
+
+    metaschema_set = MetaschemaSetParser(
+        metaschema_location=args.location, cache_dir=args.cache_dir, **schema_args
+    ).metaschema_set
+    artifact = compile_artifact(metaschema_set, roots=["catalog"])
+    document = json.loads(args.catalog.read_text())
+    runtime = concrete_runtime()
+
+    def load(slots: bool) -> tuple[typing.Any, dict[str, int], int]:
+        catalog_class = load_bindings(artifact, base_classes=runtime, slots=slots).root(
+            "catalog"
+        )
+        loader = ObjectLoader(runtime)
+        # create the classes before measuring, so only the objects are counted
+        loader.load(catalog_class, document["catalog"])
+        gc.collect()
+        tracemalloc.start()
+        loader.counts.clear()
+        try:
+            catalog = loader.load(catalog_class, document["catalog"])
+            gc.collect()
+            retained = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+        return catalog, loader.counts, retained
+
+    dict_catalog, dict_counts, dict_memory = load(slots=False)
+    del dict_catalog
+    slots_catalog, slots_counts, slots_memory = load(slots=True)
+    del slots_catalog
+
+    if dict_counts != slots_counts:
+        print("The two loads created different objects", file=sys.stderr)
+        return 1
+    controls = dict_counts.get("control", 0)
+    if controls == 0:
+        print(f"{args.catalog} has no controls", file=sys.stderr)
+        return 1
+
+    print(f"{controls} controls, {sum(dict_counts.values())} objects")
+    print(f"   __dict__: {dict_memory / controls:,.0f} bytes per control")
+    print(f"  __slots__: {slots_memory / controls:,.0f} bytes per control")
+    print(f"__slots__ saves {1 - slots_memory / dict_memory:.0%} of the memory")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""
+Compares the time a full parse of a metaschema set takes with each validation mode.
+
+The set is parsed repeatedly with MetaschemaSetParser, without a snapshot, once per validation mode: "strict" and
+"lax" validate each document with xmlschema's to_dict(), "skip" decodes it with an ElementExtractor. The compiled xsd
+is loaded from the cache, so the timings are dominated by decoding the metaschemas. The metaschemas each mode
+produces are compared, so the benchmark fails if the modes disagree.
+
+Usage (from the metaschema-codegen directory):
+
+    python benchmarks/bench_validation.py [OSCAL/src/metaschema/oscal_complete_metaschema.xml] [--repeat 3]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from metaschema_codegen.core.schemaparse import VALIDATION_MODES, MetaschemaSetParser
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "location",
+        nargs="?",
+        default="OSCAL/src/metaschema/oscal_complete_metaschema.xml",
+        help="The base metaschema file. Defaults to the OSCAL complete metaschema.",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Parses per mode. Defaults to 3."
+    )
+    parser.add_argument(
+        "-S", "--schema", help="The location of the metaschema xsd file."
+    )
+    parser.add_argument(
+        "--cache-dir", type=Path, help="The metaschema xsd cache directory."
+    )
+    args = parser.parse_args()
+
+    schema_args = {}
+    if args.schema is not None:
+        schema_args = {"schema_location": args.schema, "schema_base_url": None}
+
+    def parse(validation: str) -> MetaschemaSetParser:
+        return MetaschemaSetParser(
+            metaschema_location=args.location,
+            cache_dir=args.cache_dir,
+            use_snapshot=False,
+            validation=validation,
+            **schema_args,
+        )
+
+    # Warm the xsd cache, so no mode pays for compiling it
+    expected = parse("strict").metaschema_set.metaschemas
+
+    timings: dict[str, list[float]] = {}
+    for validation in VALIDATION_MODES:
+        timings[validation] = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            metaschemas = parse(validation).metaschema_set.metaschemas
+            timings[validation].append(time.perf_counter() - start)
+
+        if metaschemas != expected:
+            print(f"validation={validation} disagrees with strict", file=sys.stderr)
+            return 1
+
+    print(f"{len(expected)} metaschemas, {args.repeat} parses per mode")
+    for validation, mode_timings in timings.items():
+        print(
+            f"{validation:>10}: median {statistics.median(mode_timings):.3f}s, "
+            f"min {min(mode_timings):.3f}s, max {max(mode_timings):.3f}s"
+        )
+    speedup = statistics.median(timings["strict"]) / statistics.median(timings["skip"])
+    print(f"skip is {speedup:.1f}x faster than strict")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
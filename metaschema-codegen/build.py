@@ -0,0 +1,35 @@
+"""
+The build script poetry runs before packaging the wheel. It writes the datatype table shipped with the package, see
+metaschema_codegen.core.datatypes, so the parser doesn't have to introspect the default metaschema xsd.
+
+If the xsd can't be fetched, e.g. in an offline build, the wheel is built without the table, and the parser reads
+the datatypes from the xsd instead.
+"""
+
+import logging
+from pathlib import Path
+
+from metaschema_codegen.core.cache import SchemaCacheException
+from metaschema_codegen.core.datatypes import (
+    PACKAGED_TABLE,
+    build_datatype_table,
+    dump_datatype_table,
+)
+
+
+def build() -> None:
+    table_file = Path(__file__).parent.joinpath(
+        "metaschema_codegen", "core", "data", PACKAGED_TABLE
+    )
+    try:
+        table = build_datatype_table()
+    except (SchemaCacheException, OSError) as e:
+        logging.warning(f"Building the package without a datatype table: {e}")
+        return
+    table_file.parent.mkdir(parents=True, exist_ok=True)
+    table_file.write_bytes(dump_datatype_table(table))
+    print(f"Wrote {len(table.datatypes)} datatypes to {table_file}")
+
+
+if __name__ == "__main__":
+    build()
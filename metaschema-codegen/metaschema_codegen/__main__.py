@@ -1,7 +1,11 @@
 import argparse
 import sys
+from pathlib import Path
 
-from .core.schemaparse import MetaschemaSetParser
+from .codegen.python import precompile_templates
+from .core.artifact import compile_artifact, write_artifact
+from .core.graph import DefinitionGraphException
+from .core.schemaparse import EXTRACTION_ENGINES, VALIDATION_MODES, MetaschemaSetParser
 
 # from .core.assembly import Context
 
@@ -14,7 +18,8 @@ parser = argparse.ArgumentParser(
 parser.add_argument(
     "location",
     type=str,
-    help="A filename or url for the base metaschema file.",
+    nargs="*",
+    help="A filename or url for the base metaschema file. Several root metaschemas in the same directory can be given, their shared imports are parsed once.",
 )
 parser.add_argument(
     "-B",
@@ -34,15 +39,140 @@ parser.add_argument(
     dest="package_name",
     help="The name of the package to generate. This should be the name of the specification (e.g. oscal)",
 )
+parser.add_argument(
+    "--cache-dir",
+    dest="cache_dir",
+    type=Path,
+    help="[optional] The directory used to cache the metaschema xsd and its compiled form, and the compiled code generation templates. Defaults to the user cache directory.",
+)
+parser.add_argument(
+    "-j",
+    "--jobs",
+    dest="jobs",
+    type=int,
+    default=1,
+    help="[optional] The number of worker processes used to parse imported metaschemas. 0 uses one per CPU. Defaults to 1.",
+)
+parser.add_argument(
+    "--no-snapshot",
+    dest="use_snapshot",
+    action="store_false",
+    help="[optional] Always parse the metaschemas, instead of loading a snapshot of an earlier parse of the same files.",
+)
+parser.add_argument(
+    "--offline",
+    dest="offline",
+    action="store_true",
+    help="[optional] Never download the metaschema xsd, use the cached or bundled copy instead.",
+)
+parser.add_argument(
+    "--engine",
+    dest="engine",
+    choices=EXTRACTION_ENGINES,
+    default="xmlschema",
+    help="[optional] How metaschema documents are decoded. 'lxml' is faster but does not validate them. Defaults to xmlschema.",
+)
+parser.add_argument(
+    "--validation",
+    dest="validation",
+    choices=VALIDATION_MODES,
+    help="[optional] How metaschema documents are validated. 'skip' trusts them and decodes them without validation, which is the fastest. Defaults to strict, or skip for the lxml engine.",
+)
+parser.add_argument(
+    "--lean",
+    dest="lean",
+    action="store_true",
+    help="[optional] Leave the documentation out of the parsed metaschemas to save memory. The generated code has no docstrings.",
+)
+parser.add_argument(
+    "--root",
+    dest="roots",
+    action="append",
+    help="[optional] The root name of an assembly to select, e.g. catalog. Can be given more than once. Reports the definitions and datatypes reachable from the selected roots, the ones code is generated for.",
+)
+parser.add_argument(
+    "--artifact",
+    dest="artifact",
+    type=Path,
+    help="[optional] Compile the parsed metaschemas into a schema artifact at this path, for runtime validation. With --root, only the definitions reachable from the roots are included.",
+)
+parser.add_argument(
+    "--precompile-templates",
+    dest="precompile_templates",
+    action="store_true",
+    help="[optional] Compile the code generation templates into the cache, e.g. at install time, so no later run compiles them. The location can be left out to only precompile.",
+)
+
+parser.add_argument(
+    "--profile",
+    dest="profile",
+    action="store_true",
+    help="[optional] Print the time spent in each phase of the parse and on each file, and the peak memory.",
+)
 
 args = parser.parse_args()
 
+if args.precompile_templates:
+    templates = precompile_templates(args.cache_dir)
+    print(f"Compiled {len(templates)} templates into the cache")
+    if len(args.location) == 0:
+        sys.exit(0)
+
+if len(args.location) == 0:
+    parser.error("the following arguments are required: location")
+
 
 # Parse all of the metaschema definitions into trees.
+# Only pass the xsd location if it was provided, so the parser default applies otherwise
+schema_args = {}
+if args.schema is not None:
+    schema_args["schema_location"] = args.schema
+    schema_args["schema_base_url"] = None
+
 try:
-    metaschema_dict = MetaschemaSetParser(metaschema_location=args.location)
+    metaschema_parser = MetaschemaSetParser(
+        metaschema_location=(
+            args.location[0] if len(args.location) == 1 else args.location
+        ),
+        cache_dir=args.cache_dir,
+        offline=args.offline,
+        jobs=args.jobs,
+        use_snapshot=args.use_snapshot,
+        engine=args.engine,
+        validation=args.validation,
+        lean=args.lean,
+        profile=args.profile,
+        **schema_args,
+    )
+    metaschema_dict = metaschema_parser.metaschema_set
 except Exception as e:
     print("Error parsing metaschema:", e)
     sys.exit(1)
 
+if metaschema_parser.schema_load is not None:
+    print(metaschema_parser.schema_load)
+else:
+    print("Loaded the parsed metaschemas from a snapshot.")
+
+if metaschema_parser.report is not None:
+    print(metaschema_parser.report)
+
+if args.roots is not None:
+    try:
+        reachable = metaschema_dict.graph.reachable(args.roots)
+    except DefinitionGraphException as e:
+        print("Error selecting the roots:", e)
+        sys.exit(1)
+    print(
+        f"{len(reachable.nodes)} of {len(metaschema_dict.graph.nodes())} definitions and "
+        f"{len(reachable.datatypes)} of {len(metaschema_dict.datatypes)} datatypes are reachable from "
+        f"{', '.join(args.roots)}"
+    )
+
+if args.artifact is not None:
+    # The roots have been checked above
+    contents = compile_artifact(metaschema_dict, roots=args.roots)
+    write_artifact(args.artifact, contents)
+    print(f"Wrote the schema artifact {args.artifact} ({len(contents)} bytes)")
+
 print("finished")
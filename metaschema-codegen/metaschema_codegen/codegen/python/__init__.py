@@ -1,29 +1,138 @@
+from __future__ import annotations
+
+import dataclasses
+import hashlib
 import jinja2
+import logging
 import typing
+from pathlib import Path
+
+from ...core.cache import default_cache_dir
+from ...core.model import Definition, GroupAs, MetaschemaDefinitions, Prop
+from ...core.model import pythonize_name as _pythonize_name
+from ...core.layout import attribute_layout
+
+if typing.TYPE_CHECKING:
+    from ...core.constraints import ConstraintEntry, ConstraintTable
+    from ...core.graph import DefinitionGraph, DefinitionNode, Reachable
+    from ...core.schemaparse import Metaschema
 
 # Module functions and variables
 
 
-def _pythonize_name(name: str) -> str:
+class TemplateBytecodeCache(jinja2.FileSystemBytecodeCache):
     """
-    Returns the name of the class or variable for a defined assembly, field or flag in a module.
-    Makes the name python safe by stripping spaces and converts dashes to underscores.
-    This is provided to ensure consistent names when translating from fields to anything else.
+    A cache of the compiled templates on disk, so that a warm run doesn't compile them.
+
+    The compiled templates are keyed by the name and content of the template, so the templates of different versions
+    of the library don't replace each other's bytecode. The cache is best effort: if it can't be written, the
+    templates are compiled each run.
     """
-    # Some variables have a leading "@" which we don't want
-    name = name.removeprefix("@")
-    # Strip spaces, convert dashes to underscores
-    return f'{name.replace(" ", "").replace("-","_")}'
+
+    def __init__(self, directory: Path) -> None:
+        super().__init__(directory=str(directory), pattern="%s.jinja2.cache")
+
+    def get_bucket(
+        self,
+        environment: jinja2.Environment,
+        name: str,
+        filename: str | None,
+        source: str,
+    ) -> jinja2.bccache.Bucket:
+        checksum = self.get_source_checksum(source)
+        bucket = jinja2.bccache.Bucket(
+            environment,
+            hashlib.sha1(f"{name}|{checksum}".encode()).hexdigest(),
+            checksum,
+        )
+        self.load_bytecode(bucket)
+        return bucket
+
+    def dump_bytecode(self, bucket: jinja2.bccache.Bucket) -> None:
+        try:
+            Path(self.directory).mkdir(parents=True, exist_ok=True)
+            super().dump_bytecode(bucket)
+        except OSError as e:
+            logging.debug(
+                f"Unable to cache the compiled template in {self.directory}: {e}"
+            )
 
 
 # Intialize the jinja environment
-def _initialize_jinja() -> jinja2.Environment:
+def _initialize_jinja(cache_dir: Path | None = None) -> jinja2.Environment:
+    """
+    Returns a new jinja environment for the templates. Generators use the shared jinja_env instead.
+
+    Args:
+        cache_dir (Path | None, optional): The cache directory, the compiled templates are cached in its "templates"
+            directory. Defaults to None, which uses the default cache directory.
+    """
+    if cache_dir is None:
+        cache_dir = default_cache_dir()
     jinja_env = jinja2.Environment(
-        loader=jinja2.PackageLoader(package_name="metaschema_codegen.codegen.python")
+        loader=jinja2.PackageLoader(package_name="metaschema_codegen.codegen.python"),
+        bytecode_cache=TemplateBytecodeCache(cache_dir.joinpath("templates")),
+        # the templates are package resources, which don't change while the process runs
+        auto_reload=False,
     )
     return jinja_env
 
 
+# The jinja environment shared by all of the generators in the process, so each template is loaded once
+jinja_env = _initialize_jinja()
+
+# The cache directory the shared environment caches compiled templates in, None for the default one
+_template_cache_dir: Path | None = None
+
+
+def configure_template_cache(cache_dir: Path | None) -> None:
+    """
+    Sets the cache directory the shared environment caches compiled templates in, e.g. the one given with
+    --cache-dir. Worker processes are configured with the same directory, see template_cache_dir().
+
+    Args:
+        cache_dir (Path | None): The cache directory, the compiled templates are cached in its "templates"
+            directory. None uses the default cache directory.
+    """
+    global _template_cache_dir
+    _template_cache_dir = cache_dir
+    jinja_env.bytecode_cache = TemplateBytecodeCache(
+        (cache_dir if cache_dir is not None else default_cache_dir()).joinpath(
+            "templates"
+        )
+    )
+    # the templates loaded so far would never be written to the new cache directory
+    jinja_env.cache.clear()
+
+
+def template_cache_dir() -> Path | None:
+    """
+    Returns the cache directory set with configure_template_cache(), None if it is the default one.
+    """
+    return _template_cache_dir
+
+
+def precompile_templates(cache_dir: Path | None = None) -> list[str]:
+    """
+    Loads all of the templates into the shared environment, and compiles the ones that aren't in the bytecode cache
+    yet. Running this at install time, with "python -m metaschema_codegen --precompile-templates", means no run of
+    the generator compiles templates.
+
+    Args:
+        cache_dir (Path | None, optional): The cache directory to compile the templates into, see
+            configure_template_cache(). Defaults to None, which keeps the configured one.
+
+    Returns:
+        list[str]: the names of the templates
+    """
+    if cache_dir is not None:
+        configure_template_cache(cache_dir)
+    names = jinja_env.list_templates(extensions=["jinja2"])
+    for name in names:
+        jinja_env.get_template(name)
+    return names
+
+
 #
 # Utility Dataclasses
 #
@@ -65,6 +174,137 @@ class GeneratedClass(typing.NamedTuple):
     refs: list[ImportItem]
 
 
+@dataclasses.dataclass(eq=False)
+class ModuleSource:
+    """
+    What the module of a metaschema is generated from: the nodes of its definitions, their constraints and the
+    modules it imports. The nodes are those of the definition graph, and their instances still point at the nodes of
+    definitions in other modules, but a module source can be sent to a worker process with those nodes replaced by
+    their global references, see PackageGenerator.
+
+    Attributes:
+        file (str): the file of the metaschema
+        module_name (str): the name of the module
+        version (str): the schema version of the metaschema
+        nodes (list[DefinitionNode]): the top-level definitions to generate, in order
+        imported_modules (list[str]): the modules of the metaschemas it imports
+        entries (list[ConstraintEntry]): the constraints of the nodes and of their inline definitions
+        slots (bool): whether the flag, field and assembly classes have a __slots__ layout
+    """
+
+    __slots__ = (
+        "file",
+        "module_name",
+        "version",
+        "nodes",
+        "imported_modules",
+        "entries",
+        "slots",
+        "_by_node",
+    )
+
+    file: str
+    module_name: str
+    version: str
+    nodes: list[DefinitionNode]
+    imported_modules: list[str]
+    entries: list[ConstraintEntry]
+    slots: bool
+
+    def __post_init__(self) -> None:
+        # the entries of each node, by the id of the node
+        self._by_node: dict[int, list[ConstraintEntry]] = {}
+        for entry in self.entries:
+            self._by_node.setdefault(id(entry.node), []).append(entry)
+
+    def __getstate__(self) -> dict:
+        # the index is keyed by the ids of the nodes, which change when a worker unpickles them
+        return {
+            name: getattr(self, name) for name in self.__slots__ if name != "_by_node"
+        }
+
+    def __setstate__(self, state: dict) -> None:
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+        self.__post_init__()
+
+    @classmethod
+    def from_graph(
+        cls,
+        metaschema: Metaschema,
+        graph: DefinitionGraph,
+        constraint_table: ConstraintTable,
+        reachable: Reachable | None = None,
+        slots: bool = False,
+    ) -> ModuleSource:
+        """
+        Returns the source of the module of a metaschema.
+
+        Args:
+            metaschema (Metaschema): the metaschema to generate a module for
+            graph (DefinitionGraph): the resolved definitions of the metaschema set, see MetaSchemaSet.graph
+            constraint_table (ConstraintTable): the constraints of the metaschema set, see MetaSchemaSet.constraints
+            reachable (Reachable | None, optional): the definitions to generate, see DefinitionGraph.reachable().
+                Defaults to None, which generates all of the definitions.
+            slots (bool, optional): Whether the flag, field and assembly classes have a __slots__ layout. Defaults
+                to False.
+        """
+        nodes = [
+            node
+            for node in graph.modules[metaschema.file]
+            if reachable is None or node in reachable
+        ]
+        entries: list[ConstraintEntry] = []
+        pending = list(nodes)
+        while len(pending) > 0:
+            node = pending.pop(0)
+            entries.extend(constraint_table.constraints(node))
+            pending.extend(
+                edge.target for edge in node.instances() if edge.target.inline
+            )
+
+        # the metaschema's typed definitions are built when it is created
+        definitions = typing.cast(MetaschemaDefinitions, metaschema.definitions)
+        return cls(
+            file=metaschema.file,
+            module_name=_pythonize_name(metaschema.short_name),
+            version=definitions.schema_version or "",
+            nodes=nodes,
+            imported_modules=sorted(
+                {
+                    _pythonize_name(symbol.module_name)
+                    for symbol in graph.symbols.imported(metaschema.file).values()
+                }
+            ),
+            entries=entries,
+            slots=slots,
+        )
+
+    def constraints(self, node: DefinitionNode) -> list[ConstraintEntry]:
+        """
+        Returns the constraints of a node of the module, top-level or inline, in order.
+        """
+        return self._by_node.get(id(node), [])
+
+    def layout_properties(self, node: DefinitionNode) -> dict[str, typing.Any]:
+        """
+        Returns the template properties for the attributes of the objects of a node's class: the __slots__, if the
+        module has slots, and the optional and grouped attributes, see core.layout.attribute_layout().
+        """
+        layout = attribute_layout(
+            node.kind,
+            (
+                (edge.python_name, edge.required, edge.multiple)
+                for edge in node.instances()
+            ),
+        )
+        return {
+            "slots": layout.slots if self.slots else None,
+            "optional_attributes": layout.optional,
+            "grouped_attributes": layout.grouped,
+        }
+
+
 class GeneratedConstraint(typing.NamedTuple):
     """
     A Named Tuple representing the result of processing a constraint with a template
@@ -84,10 +324,12 @@ class Root(typing.NamedTuple):
 
 
 class Property:
-    def __init__(self, prop_dict: dict[str, str]):
-        self.name = _pythonize_name(prop_dict["@name"])
-        self.namespace = _pythonize_name(prop_dict["@namespace"])
-        self.value = _pythonize_name(prop_dict["@value"])
+    def __init__(self, prop: Prop):
+        self.name = _pythonize_name(prop.name)
+        self.namespace = (
+            _pythonize_name(prop.namespace) if prop.namespace is not None else None
+        )
+        self.value = _pythonize_name(prop.value)
 
 
 class CommonTopLevelDefinition:
@@ -95,56 +337,16 @@ class CommonTopLevelDefinition:
     A Generator Class to handle Common top-level Instance Data
     """
 
-    def __init__(self, class_dict: dict[str, str | dict[str, str]]):
+    def __init__(self, definition: Definition):
         # Mandatory values for all instances
-        self.common_properties = {}
-
-        keys = class_dict.keys()
-
-        # Name is mandatory so we reference the key directly - it should throw a key error
-        # if the key is missing
-        self.common_properties["name"] = _pythonize_name(
-            typing.cast(str, class_dict["@name"])
-        )
-
-        # The following attributes are optional, so we use get which will return None or
-        # another default value if we need something else (e.g. empty list)
-        if "@deprecated" in keys:
-            self.common_properties["deprecated"] = _pythonize_name(
-                typing.cast(str, class_dict["@deprecated"])
-            )
-
-        if "@scope" in keys:
-            self.common_properties["scope"] = _pythonize_name(
-                typing.cast(str, class_dict["@scope"])
-            )
-
-        if "formal-name" in keys:
-            self.common_properties["formal_name"] = _pythonize_name(
-                typing.cast(str, class_dict["formal-name"])
-            )
-
-        # Don't pythonize description - it's a weird markup field
-        self.common_properties["description"] = class_dict.get("description")
+        self.common_properties = CommonInlineDefinition(
+            definition=definition
+        ).common_properties
 
-        self.common_properties["props"] = [
-            Property(prop_dict=typing.cast(dict, prop_dict))
-            for prop_dict in class_dict.get("prop", list())
-        ]
-
-        self.common_properties["use_name"] = _pythonize_name(
-            typing.cast(str, class_dict.get("use-name"))
-        )
-        self.common_properties["remarks"] = class_dict.get("remarks", dict())
+        self.common_properties["scope"] = definition.scope
 
-        # Since the "effective name" can either be the "name" or the "use-name"
-        # We calculate it here so it can be used elsewhere
-        if self.common_properties["use_name"] is not None:
-            self.common_properties["effective_name"] = self.common_properties[
-                "use_name"
-            ]
-        else:
-            self.common_properties["effective_name"] = self.common_properties["name"]
+        # The effective name is the "use-name" if there is one, otherwise the "name". It is calculated by the parser.
+        self.common_properties["effective_name"] = definition.python_name
 
 
 class CommonInlineDefinition:
@@ -152,50 +354,42 @@ class CommonInlineDefinition:
     A Generator Class to handle Common inline Instance Data
     """
 
-    def __init__(self, class_dict: dict[str, str | dict[str, str]]):
-        self.common_properties = {}
+    def __init__(self, definition: Definition):
+        self.common_properties: dict[str, typing.Any] = {}
 
-        keys = class_dict.keys()
+        self.common_properties["name"] = _pythonize_name(definition.name)
 
-        # Name is mandatory so we reference the key directly - it should throw a key error
-        # if the key is missing
-        self.common_properties["name"] = _pythonize_name(
-            typing.cast(str, class_dict["@name"])
-        )
-
-        # The following attributes are optional, so we use get which will return None or
-        # another default value if we need something else (e.g. empty list)
-        if "@deprecated" in keys:
+        # The following attributes are optional, and are only added to the context if they are set
+        if definition.deprecated is not None:
             self.common_properties["deprecated"] = _pythonize_name(
-                typing.cast(str, class_dict["@deprecated"])
+                definition.deprecated
             )
 
-        if "formal-name" in keys:
-            self.common_properties["formal_name"] = _pythonize_name(
-                typing.cast(str, class_dict["formal-name"])
-            )
+        # The class name is the pythonized formal name, or the name if there is no formal name
+        self.common_properties["formal_name"] = definition.class_name
 
         # Don't pythonize description - it's a weird markup field
-        self.common_properties["description"] = class_dict.get("description")
+        self.common_properties["description"] = definition.description
 
         self.common_properties["props"] = [
-            Property(prop_dict=typing.cast(dict, prop_dict))
-            for prop_dict in class_dict.get("prop", list())
+            Property(prop=prop) for prop in definition.props
         ]
 
-        self.common_properties["use_name"] = _pythonize_name(
-            typing.cast(str, class_dict.get("use-name"))
+        self.common_properties["use_name"] = (
+            _pythonize_name(definition.use_name)
+            if definition.use_name is not None
+            else None
+        )
+        self.common_properties["remarks"] = (
+            definition.remarks if definition.remarks is not None else dict()
         )
-        self.common_properties["remarks"] = class_dict.get("remarks", dict())
 
 
 class GroupAsParser:
     @staticmethod
-    def parse(group_info: dict[str, str]) -> dict[str, str]:
-        parsed_dict = {}
-        for key, value in group_info.items():
-            # Remove leading "@" if it exists
-            key = _pythonize_name(key)
-            parsed_dict[key] = value
-
-        return parsed_dict
+    def parse(group_as: GroupAs) -> dict[str, str]:
+        return {
+            "name": group_as.name,
+            "in_json": group_as.in_json,
+            "in_xml": group_as.in_xml,
+        }
@@ -1,8 +1,11 @@
-from . import _initialize_jinja
+import typing
 
-from .. import CodeGenException
+from ...core.constraints import ConstraintEntry
+from ...core.model import AllowedValuesConstraint
+
+from . import jinja_env
 
-jinja_env = _initialize_jinja()
+from .. import CodeGenException
 
 
 class ConstraintsGenerator:
@@ -10,51 +13,29 @@ class ConstraintsGenerator:
     A class to convert a set of constraints into a format that can be fed to a code generation template.
     """
 
-    def __init__(self, constraint_dict: dict[str, dict]) -> None:
+    def __init__(self, constraints: list[ConstraintEntry]) -> None:
         """
-        __init__ Recursively parses a constraint and produces a template context.
+        __init__ Converts the constraints of a definition into a template context.
 
         Args:
-            constraint_dict (dict): "constraint" dictionary parsed from a metaschema element.
+            constraints (list[ConstraintEntry]): the constraints of a definition, see ConstraintTable.constraints()
         """
 
-        """
-        NOTE: 
-        constraints are structured as a dict, with the type as key and the details as value
-        if there is only a single constraint of a type, it will be a dict. if there is more than one, it will be a list of dicts
-        "constraint" : {
-          "type": [ (constraints_by_type)
-              {
-                  "prop": "value", (constraint_prop, constraint_value)
-                  "prop": [
-                    "key": "value",
-                    "key": "value"
-                  ],
-
-                  <...>
-              } (constraints_of_type)
-          ]
-        }
-        """
+        # Constraints are generated in groups by type, so all of the allowed-values constraints of a definition
+        # become a single entry in constraints_classes
+        allowed_values = [
+            entry
+            for entry in constraints
+            if isinstance(entry.constraint, AllowedValuesConstraint)
+        ]
 
         self.constraints_classes = []
-        for constraint_type, constraints_of_type in constraint_dict.items():
-            # constraints_of_type can be a list of dicts or a single dict.
-            # It's easier to process if they are all the same, so if it's a dict,
-            # we make it a list with a single member.
-            if isinstance(constraints_of_type, dict):
-                constraints_of_type = [constraints_of_type]  # now it's a list :)
-
-            if constraint_type == "allowed-values":
-                self.constraints_classes.append(
-                    AllowedValueConstraintsGenerator(
-                        constraints_of_type
-                    ).constraint_classes
-                )
-            else:
-                pass
-                # TODO: Uncomment the thing below once we have the core constraints implemented.
-                # raise CodeGenException("Unrecognized or unimplemented constraint type")
+        if len(allowed_values) > 0:
+            self.constraints_classes.append(
+                AllowedValueConstraintsGenerator(allowed_values).constraint_classes
+            )
+        # TODO: Raise the exception below for the other types once we have the core constraints implemented.
+        # raise CodeGenException("Unrecognized or unimplemented constraint type")
 
     @classmethod
     def _generate(cls, template_file: str, template_context: list[dict]) -> str:
@@ -64,43 +45,28 @@ class ConstraintsGenerator:
 
 
 class AllowedValueConstraintsGenerator:
-    def __init__(self, constraints: list[dict]) -> None:
+    def __init__(self, constraints: list[ConstraintEntry]) -> None:
         allowed_values_list = []
         self.constraint_classes: str
 
-        for constraint in constraints:
-            target = constraint.get("@target", ".")
-            allow_other = constraint.get("@allow-other", "no")
-            level = constraint.get("@level", "ERROR")
-            extensible = constraint.get("@extensible", "model")
-
-            try:
-                constraint_enums = constraint["enum"]
-            except KeyError:
+        for entry in constraints:
+            constraint = typing.cast(AllowedValuesConstraint, entry.constraint)
+            if len(constraint.values) == 0:
                 raise CodeGenException(
                     "Allowed-value constraint has no enumerated values"
                 )
 
-            processed_enums = []
-            for enum in constraint_enums:
-                try:
-                    # value is mandatory with no default, so it's okay if we raise an exception here
-                    value = enum["@value"]
-                except KeyError:
-                    raise CodeGenException(
-                        f"No value in enum under constraint {target}"
-                    )
-                # TODO: figure out how to handle the contents of the tag (e.g. the description)
-                # It is of type MarkupLine, so maybe we could re-use that.
-                processed_enums.append({"value": value})
+            # TODO: figure out how to handle the contents of the tag (e.g. the description)
+            # It is of type MarkupLine, so maybe we could re-use that.
+            processed_enums = [{"value": enum.value} for enum in constraint.values]
 
             # We've completed processing, add it to the list
             allowed_values_list.append(
                 {
-                    "target": target,
-                    "allow_other": allow_other,
-                    "level": level,
-                    "extensible": extensible,
+                    "target": entry.target.expression,
+                    "allow_other": "yes" if constraint.allow_other else "no",
+                    "level": constraint.level,
+                    "extensible": constraint.extensible,
                     "enums": processed_enums,
                 }
             )
@@ -3,14 +3,13 @@ from __future__ import annotations
 import urllib.parse
 import datetime
 
-from . import _initialize_jinja, ImportItem
+from . import ImportItem, jinja_env
 
 from ...core.schemaparse import SimpleRestrictionDatatype, ComplexDataType, DataType
 
 from .. import CodeGenException
 
 
-jinja_env = _initialize_jinja()
 
 
 class DatatypeModuleGenerator:
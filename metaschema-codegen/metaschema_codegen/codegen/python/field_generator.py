@@ -1,16 +1,20 @@
+import typing
+
+from ...core.graph import DefinitionNode
+from ...core.model import FieldDefinition
+
 from . import (
     CommonTopLevelDefinition,
     GroupAsParser,
     GeneratedClass,
     ImportItem,
-    _initialize_jinja,
+    ModuleSource,
+    jinja_env,
 )
 
 from .constraint_generator import ConstraintsGenerator
 
-from .flag_generator import InlineFlagClassGenerator
-
-jinja_env = _initialize_jinja()
+from .flag_generator import InlineFlagClassGenerator, _datatype_class
 
 
 class TopLevelFieldClassGenerator:
@@ -18,50 +22,52 @@ class TopLevelFieldClassGenerator:
     A class to generate a top-level field object from parsed metaschema field data
     """
 
-    def __init__(self, class_dict: dict, refs: dict[str, str]) -> None:
+    def __init__(self, node: DefinitionNode, source: ModuleSource) -> None:
+        definition = typing.cast(FieldDefinition, node.definition)
         template_context = CommonTopLevelDefinition(
-            class_dict=class_dict
+            definition=definition
         ).common_properties
 
-        datatype = class_dict["@as-type"]
-        datatype_ref = refs[datatype]
+        datatype_ref = _datatype_class(node)
         template_context["data_type"] = datatype_ref
 
         # collapsible is optional, with a default value of "no"
-        template_context["collapsible"] = class_dict.get("@collapsible", "no")
+        template_context["collapsible"] = "yes" if definition.collapsible else "no"
 
-        template_context["default"] = class_dict.get("@default")
+        template_context["default"] = definition.default
 
-        template_context["description"] = class_dict.get("description")
+        template_context["description"] = definition.description
 
-        template_context["json_key"] = class_dict.get("json-key")
-        template_context["json_value_key"] = class_dict.get("json-value-key")
-        template_context["json_value_key_flag"] = class_dict.get("json-value-key-flag")
+        template_context["json_value_key"] = definition.json_value_key
+        template_context["json_value_key_flag"] = definition.json_value_key_flag
 
-        if class_dict.get("@min-occurs", 0) > 0:
+        if definition.required:
             template_context["mandatory"] = True
 
-        if class_dict.get("@max-occurs") is not None:
-            if class_dict["@max-occurs"] == "unbounded":
-                template_context["bounded"] = 0
-            else:
-                template_context["bounded"] = class_dict.get("@max-occurs")
+        # A max-occurs of "unbounded" is None in the model, and 0 in the template
+        if definition.max_occurs is None:
+            template_context["bounded"] = 0
+        else:
+            template_context["bounded"] = definition.max_occurs
 
-        template_context["json_value_key"] = class_dict.get("json-value-key")
+        if definition.group_as is not None:
+            template_context["group_as"] = GroupAsParser.parse(definition.group_as)
 
-        if "group-as" in class_dict.keys():
-            template_context["group_as"] = GroupAsParser.parse(class_dict["group-as"])
+        # the attributes of the objects of the class
+        template_context.update(source.layout_properties(node))
 
         # Build constraints
         template_context["constraints"] = ConstraintsGenerator(
-            constraint_dict=class_dict.get("constraint", {})
+            constraints=source.constraints(node)
         ).constraints_classes
 
         inline_flags = []
-        if "define-flag" in class_dict.keys():
-            for flag in class_dict["define-flag"]:
+        for flag in node.flags:
+            if flag.target.inline:
                 inline_flags.append(
-                    InlineFlagClassGenerator(class_dict=flag, refs=refs).generated_class
+                    InlineFlagClassGenerator(
+                        node=flag.target, source=source
+                    ).generated_class
                 )
 
         template_context["inline-flags"] = inline_flags
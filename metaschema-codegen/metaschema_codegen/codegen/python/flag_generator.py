@@ -1,8 +1,16 @@
-from . import CommonTopLevelDefinition, GeneratedClass, ImportItem, _initialize_jinja
+from ...core.graph import DefinitionNode
 
-from .constraint_generator import ConstraintsGenerator
+from .. import CodeGenException
+
+from . import (
+    CommonTopLevelDefinition,
+    GeneratedClass,
+    ImportItem,
+    ModuleSource,
+    jinja_env,
+)
 
-jinja_env = _initialize_jinja
+from .constraint_generator import ConstraintsGenerator
 
 
 class TopLevelFlagClassGenerator:
@@ -10,21 +18,24 @@ class TopLevelFlagClassGenerator:
     A class to generate a flag object from parsed metaschema flag data
     """
 
-    def __init__(self, class_dict: dict, refs: dict[str, str]) -> None:
+    def __init__(self, node: DefinitionNode, source: ModuleSource) -> None:
         # Parse flag data, and produce a GeneratedClass object
+        definition = node.definition
         template_context = CommonTopLevelDefinition(
-            class_dict=class_dict
+            definition=definition
         ).common_properties
 
-        # look up the datatype class in the class_dict
-        datatype = class_dict["@as-type"]
-        datatype_class = refs[datatype]
+        # the datatype class was resolved with the definition graph
+        datatype_class = _datatype_class(node)
 
         template_context["datatype"] = datatype_class
 
+        # the attributes of the objects of the class
+        template_context.update(source.layout_properties(node))
+
         # Build constraints
         template_context["constraints"] = ConstraintsGenerator(
-            constraint_dict=class_dict.get("constraint", {})
+            constraints=source.constraints(node)
         ).constraints_classes
 
         template = jinja_env.get_template("class_flag.py.jinja2")
@@ -43,20 +54,23 @@ class TopLevelFlagClassGenerator:
 
 
 class InlineFlagClassGenerator:
-    def __init__(self, class_dict: dict, refs: dict[str, str]):
+    def __init__(self, node: DefinitionNode, source: ModuleSource):
+        definition = node.definition
         template_context = CommonTopLevelDefinition(
-            class_dict=class_dict
+            definition=definition
         ).common_properties
 
-        # look up the datatype class in the class_dict
-        datatype = class_dict["@as-type"]
-        datatype_class = refs[datatype]
+        # the datatype class was resolved with the definition graph
+        datatype_class = _datatype_class(node)
 
         template_context["datatype"] = datatype_class
 
+        # the attributes of the objects of the class
+        template_context.update(source.layout_properties(node))
+
         # Build constraints
         template_context["constraints"] = ConstraintsGenerator(
-            constraint_dict=class_dict.get("constraint", {})
+            constraints=source.constraints(node)
         ).constraints_classes
 
         template = jinja_env.get_template("class_flag.py.jinja2")
@@ -72,3 +86,11 @@ class InlineFlagClassGenerator:
                 )
             ],
         )
+
+
+def _datatype_class(node: DefinitionNode) -> str:
+    if node.datatype_class is None:
+        raise CodeGenException(
+            f"{node.schema}: the datatype of {node.kind} {node.definition.name} is not defined"
+        )
+    return node.datatype_class
@@ -0,0 +1,166 @@
+"""
+The manifest module records what each file of a generated package was generated from, so that regenerating the
+package only renders and writes the modules whose inputs changed.
+
+The manifest is a JSON file in the generated package. For each file it records the hash of the file's inputs, e.g.
+the fingerprints of the definitions of a module, the templates and the version of metaschema_codegen, and the hash
+of the contents written. A file whose inputs are unchanged, and which is still as it was written, is skipped, so its
+.pyc and any downstream build caches stay valid. Files in the previous manifest that a regeneration doesn't produce,
+e.g. the module of a metaschema that was removed, are deleted.
+
+The files are written through a PackageWriter, so the package only changes when the manifest is saved, all at once.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import json
+import logging
+import typing
+from pathlib import Path
+
+from .package_writer import PackageWriter
+
+# The name of the manifest file in a generated package
+MANIFEST_FILENAME = ".codegen-manifest.json"
+
+# Increment this whenever the layout of the manifest changes, so older manifests are ignored
+MANIFEST_FORMAT_VERSION = 1
+
+
+def hash_inputs(inputs: typing.Any) -> str:
+    """
+    Returns the hash of the inputs of a file, which must be JSON-compatible.
+    """
+    return hashlib.sha256(
+        json.dumps(inputs, sort_keys=True, separators=(",", ":")).encode()
+    ).hexdigest()
+
+
+@dataclasses.dataclass
+class ManifestEntry:
+    """
+    A generated file.
+
+    Attributes:
+        inputs (str): the hash of the inputs the file was generated from
+        digest (str): the sha256 hash of the contents written
+    """
+
+    __slots__ = ("inputs", "digest")
+
+    inputs: str
+    digest: str
+
+
+class GenerationManifest:
+    """
+    The manifest of a generated package: the files of the previous generation, and those of the current one.
+
+    Attributes:
+        package_path (Path): the directory of the generated package
+        previous (dict[str, ManifestEntry]): the files of the previous generation, by file name
+        current (dict[str, ManifestEntry]): the files of the current generation, written or unchanged, by file name
+        writer (PackageWriter): writes the files of the current generation
+    """
+
+    def __init__(self, package_path: Path) -> None:
+        """
+        Reads the manifest of a package, if it has one. An earlier generation that didn't finish is cleaned up
+        first.
+
+        Args:
+            package_path (Path): the directory of the generated package
+        """
+        self.package_path = package_path
+        self.previous: dict[str, ManifestEntry] = {}
+        self.current: dict[str, ManifestEntry] = {}
+        self.writer = PackageWriter(package_path)
+
+        manifest_path = package_path.joinpath(MANIFEST_FILENAME)
+        if not manifest_path.is_file():
+            return
+        try:
+            manifest = json.loads(manifest_path.read_text())
+            if manifest["format_version"] != MANIFEST_FORMAT_VERSION:
+                raise ValueError(f"format version {manifest['format_version']}")
+            self.previous = {
+                name: ManifestEntry(inputs=entry["inputs"], digest=entry["digest"])
+                for name, entry in manifest["files"].items()
+            }
+        except (ValueError, KeyError, TypeError) as e:
+            # Regenerating everything is always safe
+            logging.warning(f"Ignoring the manifest {manifest_path}: {e}")
+
+    def unchanged(self, name: str, inputs: str) -> bool:
+        """
+        Returns whether a file was generated from the same inputs and is still as it was written. If so, it is kept
+        in the current generation.
+
+        Args:
+            name (str): the name of the file in the package
+            inputs (str): the hash of the inputs of the file, see hash_inputs()
+        """
+        entry = self.previous.get(name)
+        if entry is None or entry.inputs != inputs:
+            return False
+        try:
+            contents = self.package_path.joinpath(name).read_bytes()
+        except OSError:
+            return False
+        if hashlib.sha256(contents).hexdigest() != entry.digest:
+            return False
+        self.current[name] = entry
+        return True
+
+    def write_file(self, name: str, inputs: str, contents: str) -> None:
+        """
+        Writes a file of the current generation. It is added to the package when the manifest is saved.
+
+        Args:
+            name (str): the name of the file in the package
+            inputs (str): the hash of the inputs of the file, see hash_inputs()
+            contents (str): the contents of the file
+        """
+        encoded = contents.encode()
+        self.writer.write_file(name, encoded)
+        self.current[name] = ManifestEntry(
+            inputs=inputs, digest=hashlib.sha256(encoded).hexdigest()
+        )
+
+    def stale(self) -> list[str]:
+        """
+        Returns the files of the previous generation that aren't in the current one.
+        """
+        return [name for name in self.previous if name not in self.current]
+
+    def save(self) -> None:
+        """
+        Writes the manifest if the package changed, and replaces the package with the files of the current
+        generation, leaving out the stale files.
+        """
+        if self.current != self.previous:
+            self._write_manifest()
+        self.writer.commit(removed=self.stale())
+
+    def abort(self) -> None:
+        """
+        Discards the files written, leaving the package as it was.
+        """
+        self.writer.abort()
+
+    def _write_manifest(self) -> None:
+        self.writer.write_file(
+            MANIFEST_FILENAME,
+            json.dumps(
+                {
+                    "format_version": MANIFEST_FORMAT_VERSION,
+                    "files": {
+                        name: dataclasses.asdict(entry)
+                        for name, entry in sorted(self.current.items())
+                    },
+                },
+                indent=2,
+            ).encode(),
+        )
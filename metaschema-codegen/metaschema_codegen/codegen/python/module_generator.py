@@ -1,19 +1,12 @@
-import typing
-
-from ...core.schemaparse import Metaschema
-
 from . import (
-    _pythonize_name,
-    _initialize_jinja,
-    GlobalReference,
+    jinja_env,
     GeneratedClass,
     ImportItem,
+    ModuleSource,
 )
 
 from . import flag_generator
 
-jinja_env = _initialize_jinja()
-
 
 class MetaschemaModuleGenerator:
     """
@@ -22,92 +15,44 @@ class MetaschemaModuleGenerator:
     oriented dictionary to pass to a template.
     """
 
-    def __init__(
-        self, metaschema: Metaschema, global_refs: list[GlobalReference]
-    ) -> None:
-        self.metaschema = metaschema
-        self.version = typing.cast(str, metaschema.schema_dict["schema-version"])
-        self.module_name = _pythonize_name(
-            typing.cast(str, metaschema.schema_dict["short-name"])
-        )
+    def __init__(self, source: ModuleSource) -> None:
+        """
+        Generates the module for a metaschema.
+
+        Args:
+            source (ModuleSource): the definitions of the metaschema to generate, see ModuleSource.from_graph()
+        """
+        self.source = source
+        self.version = source.version
+        self.module_name = source.module_name
         self.generated_classes: list[GeneratedClass] = []
 
-        #
-        # The first pass is to generate the list of elements imported by or defined in the metaschema so that we can
-        # identify the appropriate class for a "@ref". Not all of these refs are actually used by the module
-        #
+        # The references were resolved once for the whole set by the definition graph, so each node already has its
+        # datatype class and each instance points at the node of its definition, local or imported.
         # The format of the module import will be
         # from . import <module-name>
         # <...>
         # @dataclass
         # def Class:
         #     <ref_name>: <module-name>.<class-name>
+        self.nodes = source.nodes
+        self.imported_modules = source.imported_modules
+
+        for node in self.nodes:
+            if node.kind == "flag":
+                self.generated_classes.append(
+                    flag_generator.TopLevelFlagClassGenerator(
+                        node=node, source=source
+                    ).generated_class
+                )
 
-        # get a list of elements from imports that could be referenced with a "@ref" in this module
-        # The form will be {@ref: module.Class}
-        imported_modules: list[str] = []
-        module_refs: dict[str, str] = {}
-
-        # Add all the refs from datatypes, since most of these will be used. Datatypes are not explicitly imported by a metaschem spec
-        imported_modules.append("datatypes")
-        module_refs.update(
-            {
-                global_ref.ref_name: f"{global_ref.class_name}"
-                for global_ref in global_refs
-                if global_ref.schema_source == "datatype"
-            }
-        )
-
-        # get the list of explicitly imported schemas and add all the relevant global refs
-        for schema in self.metaschema.imports:
-            imported_modules.extend(
-                [
-                    global_ref.module_name
-                    for global_ref in global_refs
-                    if global_ref.schema_source == schema
-                ]
-            )
-            module_refs.update(
-                {
-                    global_ref.ref_name: f"{global_ref.class_name}"
-                    for global_ref in global_refs
-                    if global_ref.schema_source == schema
-                }
-            )
-
-        # record all of the top-level assemblies, flags and fields in this metaschema to include as local refs
-        # Note that a locally defined instance's @ref will overwrite an import @ref, which I think is the correct behavior
-
-        for flag in self.metaschema.schema_dict.get("define-flag", []):
-            module_refs[f'{_pythonize_name(flag["@name"])}'] = (
-                f'{_pythonize_name(flag["formal-name"])}'
-            )
-
-        for field in self.metaschema.schema_dict.get("define-field", []):
-            module_refs[f'{_pythonize_name(field["@name"])}'] = (
-                f'{_pythonize_name(field["formal-name"])}'
-            )
-
-        for assembly in self.metaschema.schema_dict.get("define-assembly", []):
-            module_refs[f'{_pythonize_name(assembly["@name"])}'] = (
-                f'{_pythonize_name(assembly["formal-name"])}'
-            )
-
-        #
-        # Second Pass: With our ref dictionary in place, we perform a deeper parse to actually generate the classes.
-        #
-
-        for flag in self.metaschema.schema_dict.get("define-flag", []):
-            self.generated_classes.append(
-                flag_generator.TopLevelFlagClassGenerator(
-                    class_dict=flag, refs=module_refs
-                ).generated_class
-            )
-
-        # for field in self.metaschema.schema_dict.get("define-field", []):
-        #     self.generated_classes.append(
-        #         FieldClassGenerator(class_dict=field, refs=module_refs).generated_class
-        #     )
+        # for node in self.nodes:
+        #     if node.kind == "field":
+        #         self.generated_classes.append(
+        #             TopLevelFieldClassGenerator(
+        #                 node=node, source=source
+        #             ).generated_class
+        #         )
 
         # With the classes generated, we create a dict to represent all of the actually used modules and classes
         imports = self._merge_imports(
@@ -1,42 +1,74 @@
 from __future__ import annotations
+import dataclasses
 import importlib.abc
 
 
 import importlib
 import importlib.resources
+import io
+import os
+import pickle
+import typing
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    as_completed,
+    wait,
+)
 from pathlib import Path
 
 
 from . import (
     _pythonize_name,
-    _initialize_jinja,
-    GlobalReference,
+    ModuleSource,
+    configure_template_cache,
     pkg_resources,
+    template_cache_dir,
 )
 
 from .. import CodeGenException
+from ... import __version__
 
+from ...core.datatypes import DataType
+from ...core.graph import DefinitionGraphException, DefinitionNode, Reachable
 from ...core.schemaparse import (
     MetaSchemaSet,
 )
+from ...metapath import Metapath, MetapathCompiler
 
 from .module_generator import MetaschemaModuleGenerator
 
 from .datatypes_generator import DatatypeModuleGenerator
 
+from .manifest import GenerationManifest, hash_inputs
+from .package_writer import PackageWriterException, lock_path
 
 #
 # Classes to parse the metaschemaset
 #
 
 
-jinja_env = _initialize_jinja()
-
-
 class PackageGenerator:
     """
     This class is initialized with a MetaSchemaSet and generates a package with Python source
     code for each of the metaschemas.
+
+    The package contains a manifest of the inputs each file was generated from. When a package is regenerated over
+    an earlier generation (ignore_existing_files=True), the modules whose inputs are unchanged are neither rendered
+    nor written, and the files the earlier generation wrote that are no longer generated are deleted.
+
+    With jobs, the modules are rendered in worker processes. Each worker receives the source of one module, in which
+    the definitions of other modules are replaced by their global references, and returns the rendered module. The
+    output is the same as when the modules are rendered in this process.
+
+    With slots, the classes rendered from the flag, field and assembly templates have a __slots__ layout, so their
+    objects have no __dict__. Only flag classes are generated so far, the field and assembly templates aren't
+    rendered by any module yet.
+
+    Each module is written as soon as it is rendered, and isn't kept, so only a few rendered modules are held at
+    a time. The files are written into a staging directory, which replaces the package once all of them are
+    written, so a generation that fails leaves the package as it was.
     """
 
     def __init__(
@@ -45,6 +77,10 @@ class PackageGenerator:
         destination_directory: Path,
         package_name: str,
         ignore_existing_files: bool = False,
+        roots: list[str] | None = None,
+        jobs: int = 1,
+        slots: bool = False,
+        cache_dir: Path | None = None,
     ) -> None:
         """
             This class is initialized with a MetaSchemaSet and generates a package with Python source
@@ -55,122 +91,239 @@ class PackageGenerator:
                 destination_directory (Path): The directory to write the generated code to
                 package_name (str): the name of the package containing the modules
                 ignore_existing_files (bool, optional): Whether to ignore existing directories and files. If true, will overwrite. If false will throw an exception. Defaults to False.
+                roots (list[str] | None, optional): The root names of the assemblies to generate code for. Only the definitions and datatypes reachable from them are generated, and modules left empty are skipped. Defaults to None, which generates everything.
+                jobs (int, optional): The number of worker processes used to render the modules. 0 uses one per CPU. Defaults to 1 (no workers).
+                slots (bool, optional): Whether the classes rendered from the flag, field and assembly templates have a __slots__ layout. Defaults to False.
+                cache_dir (Path | None, optional): The cache directory the compiled templates are cached in, see configure_template_cache(). Defaults to None, which keeps the configured one.
         """
         # initialize the package
         self.metaschema_set = parsed_metaschemas
         self.destination = destination_directory
         self.package_name = package_name
-        self.module_generators: list[
-            MetaschemaModuleGenerator | DatatypeModuleGenerator
-        ] = []
+        self.jobs = jobs if jobs > 0 else (os.cpu_count() or 1)
+        self.slots = slots
+        if cache_dir is not None:
+            configure_template_cache(cache_dir)
+        # the names of the modules rendered, in the order they were written
+        self.rendered_modules: list[str] = []
+        # what each module to render is generated from, the datatypes or the module source of a metaschema
+        self.module_sources: list[list[DataType] | ModuleSource] = []
+
+        # check the destination directory, before the package is locked in it
+        try:
+            self._check_directory(self.destination, ignore_existing_files)
+        except CodeGenException as e:
+            raise CodeGenException(f"Error when checking destination directory: {e}")
+
+        # the manifest of an earlier generation, and the hash of the inputs of each module generated this time.
+        # The package is locked until the package is written, or the generation fails.
+        self.manifest = GenerationManifest(Path(destination_directory, package_name))
+        self.module_inputs: dict[str, str] = {}
+        self.unchanged_modules: list[str] = []
 
-        # generate code for all of the core datatypes
-        self.generate_datatype_module()
+        try:
+            # select the definitions reachable from the root assemblies, if any were given
+            self.reachable: Reachable | None = None
+            if roots is not None:
+                try:
+                    self.reachable = self.metaschema_set.graph.reachable(roots)
+                except DefinitionGraphException as e:
+                    raise CodeGenException(f"Error when selecting the roots: {e}")
 
-        # collect all the elements of each metaschema which might be used across modules
-        # and put them into a dictionary that can be passed to the module/class generators
-        self.generate_global_reference_list()
+            # collect the definitions and constraints that are passed to the module/class generators
+            self.generate_global_reference_list()
 
-        # generate modules for all of the schemas parsed.
-        self.generate_schema_modules()
+            # generate code for all of the core datatypes
+            self.generate_datatype_module()
 
-        # write the generated code to files in a directory.
-        self.write_package(ignore_existing_files=ignore_existing_files)
+            # generate modules for all of the schemas parsed.
+            self.generate_schema_modules()
+
+            # render the modules, in this process or in workers, and write each one to the package as it is rendered.
+            self.write_package()
+        except BaseException:
+            self.manifest.abort()
+            raise
 
     def generate_global_reference_list(self):
         """
-        This function parses all of the metaschema global elements that each metaschema exports for reference in
-        other schemas through "import". For each global element it creates a GlobalRef object with attributes
-        that can be used to generate import statements in the python modules we generate. It also creates
-        GlobalRef objects for datatypes since those are used by all modules.
-        """
-        self.global_refs: list[GlobalReference] = []
-        for metaschema in self.metaschema_set.metaschemas:
-            schema_source = str(metaschema.file)
-            module_name = _pythonize_name(metaschema.short_name)
-            for global_reference_key in metaschema.globals.keys():
-                self.global_refs.append(
-                    GlobalReference(
-                        schema_source=schema_source,
-                        module_name=module_name,
-                        ref_name=_pythonize_name(global_reference_key),
-                        class_name=_pythonize_name(
-                            metaschema.globals[global_reference_key]
-                        ),
-                    )
-                )
-
-        # add references for metaschema datatypes, they look a little strange because
-        # they're in the metaschema xsd, not a specific metaschema
-        for datatype in self.metaschema_set.datatypes:
-            if datatype.ref_name is not None:
-                self.global_refs.append(
-                    GlobalReference(
-                        schema_source="datatype",
-                        module_name="datatypes",
-                        ref_name=_pythonize_name(datatype.ref_name),
-                        class_name=_pythonize_name(datatype.name),
-                    )
-                )
+        Collects what the module generators share: the definition graph of the metaschema set, which resolves every
+        reference once, including the references to the definitions of other modules and to the datatypes, and its
+        constraint table, which parses every metapath once.
+        """
+        self.graph = self.metaschema_set.graph
+        self.constraint_table = self.metaschema_set.constraints
+        self.symbol_table = self.graph.symbols
+        self.fingerprints = self.metaschema_set.fingerprints
+        self.generator_inputs = self._generator_inputs()
 
     def generate_datatype_module(self):
         """
-        Generates the module to represent the basic datatypes
+        Generates the module to represent the basic datatypes, unless it is unchanged since the last generation
         """
-        self.module_generators.append(
-            DatatypeModuleGenerator(datatypes=self.metaschema_set.datatypes)
+        datatypes = (
+            self.reachable.datatypes
+            if self.reachable is not None
+            else self.metaschema_set.datatypes
         )
+        inputs = hash_inputs(
+            [
+                self.generator_inputs,
+                [self.fingerprints.datatypes[datatype.name] for datatype in datatypes],
+            ]
+        )
+        if self._module_unchanged("datatypes", inputs):
+            return
+        self.module_sources.append(datatypes)
 
     def generate_schema_modules(self):
         """
-        Generates a list of module to represent the metaschemas included in the metaschema set
+        Generates a list of module to represent the metaschemas included in the metaschema set. The modules that are
+        unchanged since the last generation are skipped.
+
+        The inputs of a module are the fingerprints of the definitions it is generated from, which cover the
+        definitions they depend on, and the names of the modules and datatype classes it can import from.
         """
-        for metaschema in self.metaschema_set.metaschemas:
-            self.module_generators.append(
-                MetaschemaModuleGenerator(
+        module_names = [
+            [metaschema.file, metaschema.short_name]
+            for metaschema in self.metaschema_set.metaschema_list()
+        ]
+        datatype_classes = sorted(self.graph.datatype_classes.items())
+
+        for metaschema in self.metaschema_set.metaschema_list():
+            if (
+                self.reachable is not None
+                and metaschema.file not in self.reachable.schemas
+            ):
+                continue
+            inputs = hash_inputs(
+                [
+                    self.generator_inputs,
+                    metaschema.file,
+                    metaschema.short_name,
+                    [
+                        self.fingerprints.node_fingerprint(node)
+                        for node in self.graph.modules[metaschema.file]
+                        if self.reachable is None or node in self.reachable
+                    ],
+                    module_names,
+                    datatype_classes,
+                    self.slots,
+                ]
+            )
+            if self._module_unchanged(_pythonize_name(metaschema.short_name), inputs):
+                continue
+            self.module_sources.append(
+                ModuleSource.from_graph(
                     metaschema=metaschema,
-                    global_refs=self.global_refs,
+                    graph=self.graph,
+                    constraint_table=self.constraint_table,
+                    reachable=self.reachable,
+                    slots=self.slots,
                 )
             )
 
-    def write_package(self, ignore_existing_files: bool) -> None:
+    def render_modules(self) -> typing.Iterator[tuple[str, str]]:
+        """
+        Renders the modules to generate, in this process or, with more than one job, in worker processes, and yields
+        the name and source code of each one as it is rendered.
+
+        Workers are only given as many modules as there are workers, so no more than that many rendered modules
+        wait to be written. They are yielded in the order they finish.
         """
-        Writes all the files in the package to files at a location provided.
+        if self.jobs > 1 and len(self.module_sources) > 1:
+            # the workers cache compiled templates in the same directory as this process
+            with ProcessPoolExecutor(
+                max_workers=min(self.jobs, len(self.module_sources)),
+                initializer=configure_template_cache,
+                initargs=(template_cache_dir(),),
+            ) as executor:
+                pending: set[Future[tuple[str, str]]] = set()
+                for source in self.module_sources:
+                    pending.add(
+                        executor.submit(_render_in_worker, _pack_module_source(source))
+                    )
+                    if len(pending) < self.jobs:
+                        continue
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+                for future in as_completed(pending):
+                    yield future.result()
+            return
+
+        for source in self.module_sources:
+            module_generator = _module_generator(source)
+            yield module_generator.module_name, module_generator.generated_module
+
+    def write_package(self) -> None:
+        """
+        Renders the modules and writes all the files in the package to files at a location provided.
 
         Note that we assume that thePath exists and represents an empty directory that can be written to.
-        The caller is responsible for verifying that this is correct before giving us the path.
-        We will raise Exceptions if anything doesn't work.
+        The destination directory is checked by the initializer, before the package is locked.
+        We will raise Exceptions if anything doesn't work, and the package is left as it was.
         """
 
-        # check the destination directory.
         try:
-            self._check_directory(self.destination, ignore_existing_files)
-        except CodeGenException as e:
-            raise CodeGenException(f"Error when checking destination directory: {e}")
-
-        # create the directory Path by appending the provided base path and the provided package name
-        package_path = Path(self.destination, self.package_name)
-
-        package_path.mkdir(exist_ok=ignore_existing_files)
-
-        # Get all of the package resource files
-        for resource_file in importlib.resources.files(pkg_resources).iterdir():
-            if resource_file.is_file() and resource_file.name.startswith("pkg."):
-                self._copy_resource_file_to_pkg(resource_file, package_path)
+            # Get all of the package resource files
+            for resource_file in importlib.resources.files(pkg_resources).iterdir():
+                if resource_file.is_file() and resource_file.name.startswith("pkg."):
+                    self._copy_resource_file_to_pkg(resource_file)
+
+            for module_name, generated_module in self.render_modules():
+                self.manifest.write_file(
+                    f"{module_name}.py",
+                    inputs=self.module_inputs[module_name],
+                    contents=generated_module,
+                )
+                self.rendered_modules.append(module_name)
+        except BaseException:
+            self.manifest.abort()
+            raise
 
-        for module_generator in self.module_generators:
-            module_file = package_path.joinpath(
-                Path(f"{module_generator.module_name}.py")
-            )
-            module_file.write_text(module_generator.generated_module)
+        # swap in the package, without the files of the last generation that weren't generated this time
+        try:
+            self.manifest.save()
+        except PackageWriterException as e:
+            raise CodeGenException(f"Error when writing the package: {e}")
 
-    def _copy_resource_file_to_pkg(
-        self, resource_file: importlib.abc.Traversable, package_path
-    ):
+    def _copy_resource_file_to_pkg(self, resource_file: importlib.abc.Traversable):
         # The file will be written to the package directory without the leading "pkg." in the filename
         target_filename = resource_file.name.lstrip("pkg.")
         with importlib.resources.as_file(resource_file) as r_file:
-            package_path.joinpath(target_filename).write_text(r_file.read_text())
+            contents = r_file.read_text()
+        inputs = hash_inputs(contents)
+        if not self.manifest.unchanged(target_filename, inputs):
+            self.manifest.write_file(target_filename, inputs=inputs, contents=contents)
+
+    def _generator_inputs(self) -> str:
+        """
+        Returns the hash of the version of metaschema_codegen and of the templates, which every module is generated
+        with.
+        """
+        templates = importlib.resources.files(__package__).joinpath("templates")
+        return hash_inputs(
+            [
+                __version__,
+                sorted(
+                    (template.name, template.read_text())
+                    for template in templates.iterdir()
+                    if template.is_file()
+                ),
+            ]
+        )
+
+    def _module_unchanged(self, module_name: str, inputs: str) -> bool:
+        """
+        Records the inputs of a module, and returns whether the module was generated from the same inputs last
+        time, and so can be skipped.
+        """
+        self.module_inputs[module_name] = inputs
+        if self.manifest.unchanged(f"{module_name}.py", inputs):
+            self.unchanged_modules.append(module_name)
+            return True
+        return False
 
     def _check_directory(
         self, path_to_check: Path, ignore_existing_files: bool
@@ -190,5 +343,137 @@ class PackageGenerator:
                 f"{str(path_to_check)} exists but is not a directory."
             )
 
-        if ignore_existing_files is False and len(list(path_to_check.iterdir())) > 0:
+        # the lock file of the package is left behind by earlier generations, even ones that failed
+        package_lock = lock_path(path_to_check.joinpath(self.package_name))
+        if ignore_existing_files is False and any(
+            path != package_lock for path in path_to_check.iterdir()
+        ):
             raise CodeGenException(f"{str(path_to_check)} exists but is not empty.")
+
+
+#
+# Rendering in worker processes
+#
+
+
+class _ForeignDefinition(typing.NamedTuple):
+    """
+    The names of a definition of another module, see _ForeignNode.
+    """
+
+    name: str
+    python_name: str
+    class_name: str
+
+
+@dataclasses.dataclass(eq=False)
+class _ForeignNode:
+    """
+    Stands in for the node of a definition of another module in the source of a module sent to a worker. It has
+    what the generators read from the target of an instance that refers to another module, without the definition
+    and its instances.
+
+    Attributes:
+        kind (str): "flag", "field" or "assembly"
+        definition (_ForeignDefinition): the names of the definition
+        schema (str): the file of the metaschema with the definition
+        module_name (str): the python module of the metaschema with the definition
+        datatype_class (str | None): the class of the datatype of a flag or field
+        inline (bool): always False, an inline definition is in the module of its parent
+    """
+
+    __slots__ = ("kind", "definition", "schema", "module_name", "datatype_class")
+
+    kind: str
+    definition: _ForeignDefinition
+    schema: str
+    module_name: str
+    datatype_class: str | None
+
+    inline: typing.ClassVar[bool] = False
+
+    @property
+    def class_name(self) -> str:
+        return self.definition.class_name
+
+    @classmethod
+    def from_node(cls, node: DefinitionNode) -> _ForeignNode:
+        return cls(
+            kind=node.kind,
+            definition=_ForeignDefinition(
+                name=node.definition.name,
+                python_name=node.definition.python_name,
+                class_name=node.definition.class_name,
+            ),
+            schema=node.schema,
+            module_name=node.module_name,
+            datatype_class=node.datatype_class,
+        )
+
+
+class _ModulePickler(pickle.Pickler):
+    """
+    Pickles the source of a module for a worker. The nodes of the definitions of other modules are pickled as
+    _ForeignNodes, so the rest of the definition graph isn't sent, and metapaths as their expressions, which the
+    worker parses again.
+    """
+
+    def __init__(self, file: io.BytesIO, source: list[DataType] | ModuleSource):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        # the nodes of the module, top-level and inline
+        self._module_nodes: set[int] = set()
+        pending = list(source.nodes) if isinstance(source, ModuleSource) else []
+        while len(pending) > 0:
+            node = pending.pop()
+            self._module_nodes.add(id(node))
+            pending.extend(
+                edge.target for edge in node.instances() if edge.target.inline
+            )
+
+    def persistent_id(self, obj):
+        if isinstance(obj, DefinitionNode) and id(obj) not in self._module_nodes:
+            return ("node", _ForeignNode.from_node(obj))
+        if isinstance(obj, Metapath):
+            return ("metapath", obj.expression)
+        return None
+
+
+class _ModuleUnpickler(pickle.Unpickler):
+    def persistent_load(self, pid):
+        kind, value = pid
+        if kind == "metapath":
+            return _worker_metapath_compiler().compile(value)
+        return value
+
+
+# Parses the metapaths of the modules a worker renders, each distinct expression once
+_metapath_compiler: MetapathCompiler | None = None
+
+
+def _worker_metapath_compiler() -> MetapathCompiler:
+    global _metapath_compiler
+    if _metapath_compiler is None:
+        _metapath_compiler = MetapathCompiler()
+    return _metapath_compiler
+
+
+def _pack_module_source(source: list[DataType] | ModuleSource) -> bytes:
+    buffer = io.BytesIO()
+    _ModulePickler(buffer, source).dump(source)
+    return buffer.getvalue()
+
+
+def _module_generator(
+    source: list[DataType] | ModuleSource,
+) -> MetaschemaModuleGenerator | DatatypeModuleGenerator:
+    if isinstance(source, ModuleSource):
+        return MetaschemaModuleGenerator(source)
+    return DatatypeModuleGenerator(datatypes=source)
+
+
+def _render_in_worker(job: bytes) -> tuple[str, str]:
+    """
+    Renders a module in a worker process, and returns its name and source code.
+    """
+    module_generator = _module_generator(_ModuleUnpickler(io.BytesIO(job)).load())
+    return module_generator.module_name, module_generator.generated_module
@@ -0,0 +1,201 @@
+"""
+The package_writer module writes a generated package so that a failed or interrupted generation never leaves a
+partly written package behind.
+
+The files are written into a staging directory next to the package, each to a temporary file that is renamed into
+place once it is complete. Only when every file is written is the staging directory swapped in for the package:
+the package is renamed to a backup, the staging directory to the package, and the backup is deleted. The files of
+the package that weren't written again, e.g. unchanged modules, are hard linked into the staging directory first,
+so they keep their modification times, and their .pyc files stay valid.
+
+If a generation fails, the staging directory is deleted and the package is left as it was. If the process dies,
+the next PackageWriter for the package cleans up: it deletes a leftover staging directory, and puts back a backup
+that was never replaced by its staging directory.
+
+A PackageWriter holds a lock on a file next to the package (.{name}.lock) from before it cleans up until it commits
+or aborts, so a generation of the same package started meanwhile waits for it, instead of taking its staging
+directory or backup for leftovers. The lock file is kept, deleting it would let two generations lock different
+files.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import shutil
+import uuid
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:
+    # e.g. on Windows, where generations of the same package aren't serialized
+    fcntl = None  # type: ignore[assignment]
+
+
+class PackageWriterException(Exception):
+    pass
+
+
+class PackageWriter:
+    """
+    Writes the files of a package into a staging directory, and swaps it in for the package on commit().
+
+    Attributes:
+        package_path (Path): the directory of the package
+        lock_path (Path): the file locked while the writer is in use
+        staging_path (Path | None): the staging directory, once a file is written
+        written (list[str]): the names of the files written
+    """
+
+    def __init__(self, package_path: Path) -> None:
+        """
+        Locks the package, waiting for another generation of it to finish, and cleans up after an earlier
+        generation that didn't finish.
+
+        Args:
+            package_path (Path): the directory of the package, in an existing directory
+        """
+        self.package_path = package_path
+        self.lock_path = lock_path(package_path)
+        self.staging_path: Path | None = None
+        self.written: list[str] = []
+        self._lock_fd: int | None = None
+        self._lock()
+
+        backup_path = self._backup_path()
+        if backup_path.exists():
+            if package_path.exists():
+                # the package was swapped in, but the backup wasn't deleted
+                shutil.rmtree(backup_path, ignore_errors=True)
+            else:
+                logging.warning(
+                    f"Restoring {package_path} from an interrupted generation"
+                )
+                backup_path.rename(package_path)
+        for staging_path in package_path.parent.glob(f".{package_path.name}.*.staging"):
+            shutil.rmtree(staging_path, ignore_errors=True)
+
+    def write_file(self, name: str, contents: bytes) -> None:
+        """
+        Writes a file of the package into the staging directory.
+
+        Args:
+            name (str): the name of the file in the package
+            contents (bytes): the contents of the file
+        """
+        staging_path = self._staging()
+        # the staging directory is private to this writer, so the temporary file needs no unique name
+        tmp_path = staging_path.joinpath(f".{name}.tmp")
+        with open(tmp_path, "xb") as tmp_file:
+            tmp_file.write(contents)
+            tmp_file.flush()
+            os.fsync(tmp_file.fileno())
+        os.replace(tmp_path, staging_path.joinpath(name))
+        self.written.append(name)
+
+    def commit(self, removed: list[str] | None = None) -> None:
+        """
+        Swaps the staging directory in for the package, and unlocks it. The package is left as it is if no file was
+        written, and none removed.
+
+        Args:
+            removed (list[str] | None, optional): the files of the package to leave out of the new package.
+                Defaults to None.
+        """
+        removed = removed if removed is not None else []
+        package_exists = self.package_path.exists()
+        if package_exists and len(self.written) == 0:
+            if not any(self.package_path.joinpath(name).exists() for name in removed):
+                self._unlock()
+                return
+        staging_path = self._staging()
+        try:
+            if package_exists:
+                self._link_unchanged(staging_path, set(self.written) | set(removed))
+                backup_path = self._backup_path()
+                self.package_path.rename(backup_path)
+                try:
+                    staging_path.rename(self.package_path)
+                except OSError:
+                    backup_path.rename(self.package_path)
+                    raise
+                shutil.rmtree(backup_path, ignore_errors=True)
+            else:
+                staging_path.rename(self.package_path)
+        except OSError as e:
+            self.abort()
+            raise PackageWriterException(
+                f"Error when replacing {self.package_path}: {e}"
+            )
+        self.staging_path = None
+        self._unlock()
+
+    def abort(self) -> None:
+        """
+        Deletes the staging directory and unlocks the package, leaving it as it was.
+        """
+        if self.staging_path is not None:
+            shutil.rmtree(self.staging_path, ignore_errors=True)
+            self.staging_path = None
+        self._unlock()
+
+    def _lock(self) -> None:
+        self._lock_fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            # blocks until another writer of the package commits or aborts, or its process dies
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+
+    def _unlock(self) -> None:
+        if self._lock_fd is not None:
+            # closing the file releases the lock
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    def _staging(self) -> Path:
+        """
+        Returns the staging directory, which is created the first time.
+        """
+        if self.staging_path is None:
+            # created with mkdir rather than tempfile, so the package gets the usual permissions
+            staging_path = self.package_path.parent.joinpath(
+                f".{self.package_path.name}.{uuid.uuid4().hex[:8]}.staging"
+            )
+            staging_path.mkdir()
+            self.staging_path = staging_path
+        return self.staging_path
+
+    def _backup_path(self) -> Path:
+        return self.package_path.parent.joinpath(f".{self.package_path.name}.backup")
+
+    def _link_unchanged(self, staging_path: Path, replaced: set[str]) -> None:
+        """
+        Links the files and directories of the package that aren't replaced into the staging directory.
+        """
+        for path in self.package_path.iterdir():
+            if path.name in replaced:
+                continue
+            target = staging_path.joinpath(path.name)
+            if path.is_symlink():
+                os.symlink(os.readlink(path), target)
+            elif path.is_dir():
+                shutil.copytree(
+                    path, target, symlinks=True, copy_function=_link_or_copy
+                )
+            else:
+                _link_or_copy(path, target)
+
+
+def lock_path(package_path: Path) -> Path:
+    """
+    Returns the lock file of a package, see PackageWriter.
+    """
+    return package_path.parent.joinpath(f".{package_path.name}.lock")
+
+
+def _link_or_copy(source: str | Path, target: str | Path) -> None:
+    try:
+        os.link(source, target)
+    except OSError:
+        # e.g. a file system without hard links
+        shutil.copy2(source, target)
@@ -15,8 +15,34 @@ class MetaschemaException(Exception):
 class MetaschemaABC(metaclass=ABCMeta):
     """
     Abstract Base Class for object generated from metaschema specifications. Contains empty methods that all derived classes must implement.
+
+    An object holds each of its flags, fields and assemblies in an attribute. The base classes have empty __slots__, so the objects of a generated class with __slots__ have no __dict__.
     """
 
+    __slots__ = ()
+
+    # The attributes that default to None when they aren't given, those of optional instances that occur at most once
+    OPTIONAL_ATTRIBUTES: tuple[str, ...] = ()
+
+    # The attributes that default to an empty list when they aren't given, those of instances that can occur more than once
+    GROUPED_ATTRIBUTES: tuple[str, ...] = ()
+
+    def __init__(self, **attributes) -> None:
+        """
+        Sets the attributes given, and the defaults of the optional and grouped attributes that aren't.
+
+        Args:
+            attributes: the value of a flag or field, and its flags, fields and assemblies, by attribute name
+        """
+        for name, value in attributes.items():
+            setattr(self, name, value)
+        for name in type(self).OPTIONAL_ATTRIBUTES:
+            if name not in attributes:
+                setattr(self, name, None)
+        for name in type(self).GROUPED_ATTRIBUTES:
+            if name not in attributes:
+                setattr(self, name, [])
+
     @abstractmethod
     def to_dict(self) -> dict:
         pass
@@ -107,12 +133,16 @@ class Flag(MetaschemaABC):
     A class representing a generic Flag. This is primarily used by the metaschema_codegen code generator and should not generally be used outside the library.
     """
 
+    __slots__ = ()
+
 
 class Field(MetaschemaABC):
     """
     A class representing a generic Field. This is primarily used by the metaschema_codegen code generator and should not generally be used outside the library.
     """
 
+    __slots__ = ()
+
     constraints: list[Constraint] = []
 
 
@@ -121,6 +151,8 @@ class Assembly(MetaschemaABC):
     A class representing a generic Assembly. This is primarily used by the metaschema_codegen code generator and should not generally be used outside the library.
     """
 
+    __slots__ = ()
+
     constraints: list[AssemblyConstraint] = []
 
     def _apply_constraints(self) -> Self:
@@ -0,0 +1,218 @@
+"""
+The artifact module compiles a parsed metaschema set into a schema artifact, for runtime validation.
+
+The artifact holds the resolved definitions, their cardinalities, the datatypes with their patterns and the
+constraints with their metapaths parsed, in a compact file that metaschema_codegen.databind.artifact loads with only
+the standard library. The parse trees of the metapaths are written as nested lists of the elementpath token
+symbols and values, so the runtime doesn't need elementpath either.
+
+Compile an artifact with:
+
+    python -m metaschema_codegen <metaschema> --artifact schema.msa [--root catalog]
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import os
+import tempfile
+import typing
+from pathlib import Path
+
+from elementpath.xpath_tokens import XPathToken
+
+from .. import __version__
+from ..databind.artifact import pack_artifact
+from ..metapath import Metapath
+from .constraints import ConstraintEntry
+from .datatypes import DATATYPE_KINDS, DataType
+from .graph import ChoiceEdge, DefinitionNode, InstanceEdge
+from .model import AssemblyDefinition, pythonize_name
+
+if typing.TYPE_CHECKING:
+    from .schemaparse import MetaSchemaSet
+
+# The attributes of constraint parameters that are documentation, which validation doesn't need
+_DOCUMENTATION_ATTRIBUTES = frozenset({"description", "remarks"})
+
+
+def compile_artifact(
+    metaschema_set: MetaSchemaSet, roots: list[str] | None = None
+) -> bytes:
+    """
+    Returns the contents of a schema artifact for a metaschema set.
+
+    Args:
+        metaschema_set (MetaSchemaSet): the parsed metaschemas
+        roots (list[str] | None, optional): the root names of the assemblies to include, with the definitions and
+            datatypes reachable from them. Defaults to None, which includes everything.
+    """
+    graph = metaschema_set.graph
+    if roots is not None:
+        reachable = graph.reachable(roots)
+        nodes, datatypes = reachable.nodes, reachable.datatypes
+    else:
+        nodes, datatypes = graph.nodes(), graph.datatypes
+
+    return pack_artifact(_ArtifactCompiler(metaschema_set, nodes, datatypes).payload)
+
+
+def write_artifact(path: Path, contents: bytes) -> None:
+    """
+    Writes an artifact to a file. The file is replaced atomically so a worker never loads a partial artifact.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as tmp_file:
+            tmp_file.write(contents)
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+class _ArtifactCompiler:
+    """
+    Converts the nodes of a definition graph into the artifact payload, with definitions, datatypes and metapaths
+    referenced by their index in the payload.
+    """
+
+    def __init__(
+        self,
+        metaschema_set: MetaSchemaSet,
+        nodes: list[DefinitionNode],
+        datatypes: list[DataType],
+    ) -> None:
+        constraint_table = metaschema_set.constraints
+        self._definition_index = {id(node): index for index, node in enumerate(nodes)}
+        self._datatype_index = {
+            pythonize_name(datatype.name): index
+            for index, datatype in enumerate(datatypes)
+        }
+        self._metapath_index: dict[str, int] = {}
+        self._metapaths: list[list] = []
+
+        kinds = {cls: kind for kind, cls in DATATYPE_KINDS.items()}
+        self.payload = {
+            "library_version": __version__,
+            "datatypes": [
+                {
+                    "name": datatype.name,
+                    "ref_name": datatype.ref_name,
+                    "kind": kinds[type(datatype)],
+                    "base_type": getattr(datatype, "base_type", None),
+                    "pattern": getattr(datatype, "patterns", {}).get("pcre"),
+                    "elements": getattr(datatype, "elements", []),
+                }
+                for datatype in datatypes
+            ],
+            "definitions": [
+                self._definition(node, constraint_table.constraints(node))
+                for node in nodes
+            ],
+            "metapaths": self._metapaths,
+        }
+
+    def _definition(
+        self, node: DefinitionNode, constraints: list[ConstraintEntry]
+    ) -> dict:
+        definition = node.definition
+        return {
+            "kind": node.kind,
+            "name": definition.name,
+            "python_name": definition.python_name,
+            "schema": node.schema,
+            "module_name": node.module_name,
+            "class_name": node.class_name,
+            "inline": node.inline,
+            "root_name": (
+                definition.root_name
+                if isinstance(definition, AssemblyDefinition)
+                else None
+            ),
+            "datatype": (
+                self._datatype_index.get(node.datatype_class)
+                if node.datatype_class is not None
+                else None
+            ),
+            "flags": [self._instance(edge) for edge in node.flags],
+            "model": [
+                (
+                    {"choice": [self._instance(edge) for edge in item.instances]}
+                    if isinstance(item, ChoiceEdge)
+                    else self._instance(item)
+                )
+                for item in node.model
+            ],
+            "constraints": [
+                {
+                    "kind": entry.kind,
+                    "id": entry.constraint.id,
+                    "level": entry.constraint.level,
+                    "target": self._metapath(entry.target),
+                    "parameters": {
+                        name: self._parameter(value)
+                        for name, value in entry.parameters.items()
+                    },
+                }
+                for entry in constraints
+            ],
+        }
+
+    def _instance(self, edge: InstanceEdge) -> list:
+        return [
+            self._definition_index[id(edge.target)],
+            edge.effective_name,
+            edge.python_name,
+            edge.json_key,
+            edge.min_occurs,
+            edge.max_occurs,
+            (
+                {
+                    "name": edge.group_as.name,
+                    "in_json": edge.group_as.in_json,
+                    "in_xml": edge.group_as.in_xml,
+                }
+                if edge.group_as is not None
+                else None
+            ),
+        ]
+
+    def _metapath(self, metapath: Metapath) -> int:
+        index = self._metapath_index.get(metapath.expression)
+        if index is None:
+            index = len(self._metapaths)
+            self._metapath_index[metapath.expression] = index
+            self._metapaths.append(
+                [
+                    metapath.expression,
+                    _token_tree(metapath.token) if metapath.token is not None else None,
+                ]
+            )
+        return index
+
+    def _parameter(self, value: typing.Any) -> typing.Any:
+        if isinstance(value, Metapath):
+            return self._metapath(value)
+        if isinstance(value, (list, tuple)):
+            return [self._parameter(item) for item in value]
+        if dataclasses.is_dataclass(value):
+            return {
+                field.name: self._parameter(getattr(value, field.name))
+                for field in dataclasses.fields(value)
+                if field.name not in _DOCUMENTATION_ATTRIBUTES
+            }
+        return value
+
+
+def _token_tree(token: XPathToken) -> list:
+    """
+    Returns the parse tree of a metapath as [symbol, value, children]. The value is only kept for names and
+    literals, whose symbols are in parentheses, e.g. "(name)" or "(string)". Numbers other than integers are kept
+    as strings, so they aren't rounded.
+    """
+    value = None
+    if token.symbol.startswith("("):
+        value = token.value if isinstance(token.value, (str, int)) else str(token.value)
+    return [token.symbol, value, [_token_tree(child) for child in token]]
@@ -0,0 +1,438 @@
+"""
+The cache module provides an on-disk, content-addressed cache for the metaschema XSD and its compiled XMLSchema.
+
+Raw resources are stored under their sha256 digest, and the compiled schema is pickled next to them, so a warm run
+needs neither the network nor the (slow) XSD compilation. The cache revalidates with ETag/Last-Modified when it is
+online, and falls back to the cached (or bundled) copy when it is offline.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import importlib.resources
+import json
+import logging
+import os
+import pickle
+import http.client
+import tempfile
+import threading
+import time
+from pathlib import Path
+from urllib import parse
+
+import xmlschema
+from lxml import etree
+
+from .pool import ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+XSD_NAMESPACE = "http://www.w3.org/2001/XMLSchema"
+
+
+def default_cache_dir() -> Path:
+    """
+    Returns the default cache directory. It can be overridden with the METASCHEMA_CODEGEN_CACHE environment variable,
+    and otherwise follows XDG_CACHE_HOME.
+    """
+    if "METASCHEMA_CODEGEN_CACHE" in os.environ:
+        return Path(os.environ["METASCHEMA_CODEGEN_CACHE"])
+    xdg_cache = os.environ.get("XDG_CACHE_HOME")
+    base = Path(xdg_cache) if xdg_cache else Path.home().joinpath(".cache")
+    return base.joinpath("metaschema-codegen")
+
+
+def sha256_digest(contents: bytes) -> str:
+    return hashlib.sha256(contents).hexdigest()
+
+
+class SchemaCacheException(Exception):
+    pass
+
+
+@dataclasses.dataclass
+class CachedResource:
+    location: str
+    digest: str
+    contents: bytes
+    source: str  # one of "network", "revalidated", "cache", "local" or "bundled"
+
+
+@dataclasses.dataclass
+class CachedSchema:
+    """
+    The result of loading the metaschema XSD through the cache.
+
+    Attributes:
+        schema (xmlschema.XMLSchema): the compiled schema
+        digest (str): a digest of the XSD and all of the files it includes
+        warm (bool): True if the compiled schema was loaded from the cache instead of being compiled
+        fetch_seconds (float): wall time spent obtaining the XSD files
+        compile_seconds (float): wall time spent compiling (cold) or unpickling (warm) the schema
+    """
+
+    schema: xmlschema.XMLSchema
+    digest: str
+    warm: bool
+    fetch_seconds: float
+    compile_seconds: float
+
+    def __str__(self) -> str:
+        return (
+            f"metaschema XSD {self.digest[:12]} ({'warm' if self.warm else 'cold'} run): "
+            f"fetch {self.fetch_seconds:.3f}s, "
+            f"{'load' if self.warm else 'compile'} {self.compile_seconds:.3f}s"
+        )
+
+
+class SchemaCache:
+    """
+    A content-addressed cache for the metaschema XSD.
+
+    The layout of the cache directory is:
+
+        index.json                   maps a location to the digest, ETag and Last-Modified of its last known contents
+        objects/<digest>             raw file contents, keyed by sha256
+        xsd/<digest>/                the XSD and the files it includes, laid out so it can be compiled offline
+        compiled/<digest>.pickle     the compiled xmlschema.XMLSchema
+        artifacts/<digest>/<name>    data derived from the compiled schema (e.g. the datatype table)
+
+    The pickled schemas are only ever read from the user's own cache directory.
+    """
+
+    def __init__(self, cache_dir: Path | None = None, offline: bool = False):
+        """
+        Args:
+            cache_dir (Path | None, optional): The directory to store cached files in. Defaults to default_cache_dir().
+            offline (bool, optional): If True, never go to the network and only use cached or bundled files.
+        """
+        self.cache_dir = (
+            Path(cache_dir) if cache_dir is not None else default_cache_dir()
+        )
+        self.offline = offline
+        # Remote files are fetched over persistent connections. fetch() may be called from several threads.
+        self.pool = ConnectionPool()
+        self._index_lock = threading.Lock()
+        self._index_file = self.cache_dir.joinpath("index.json")
+        self._index: dict[str, dict[str, str]] = self._read_index()
+
+    def load_schema(
+        self,
+        schema_location: str,
+        schema_base_url: str | None = None,
+        use_compiled: bool = True,
+    ) -> CachedSchema:
+        """
+        Returns the compiled metaschema XSD, using cached files and a cached compiled schema whenever possible.
+
+        Args:
+            schema_location (str): A URL or a local path to the metaschema XSD
+            schema_base_url (str | None, optional): The location the XSD's includes are relative to. Defaults to the
+                directory containing the XSD.
+            use_compiled (bool, optional): If False, always compile the schema instead of loading the cached copy.
+                Unpickled schemas do not keep their annotations, so this is needed to read the documentation.
+        """
+        fetch_start = time.perf_counter()
+        digest, xsd_files = self._fetch_schema_files(schema_location, schema_base_url)
+        fetch_seconds = time.perf_counter() - fetch_start
+
+        compile_start = time.perf_counter()
+        compiled_file = self.cache_dir.joinpath("compiled", f"{digest}.pickle")
+        if use_compiled and compiled_file.exists():
+            try:
+                schema = pickle.loads(compiled_file.read_bytes())
+                return CachedSchema(
+                    schema=schema,
+                    digest=digest,
+                    warm=True,
+                    fetch_seconds=fetch_seconds,
+                    compile_seconds=time.perf_counter() - compile_start,
+                )
+            except Exception as e:
+                logger.warning(
+                    f"Ignoring unreadable compiled schema {compiled_file}: {e}"
+                )
+
+        # Lay out the XSD files so that relative includes resolve without the network, and compile from there
+        xsd_dir = self.cache_dir.joinpath("xsd", digest)
+        for name, resource in xsd_files.items():
+            self._write_atomic(xsd_dir.joinpath(name), resource.contents)
+        root_name = Path(parse.urlparse(schema_location).path).name
+        schema = xmlschema.XMLSchema(source=str(xsd_dir.joinpath(root_name)))
+
+        try:
+            self._write_atomic(compiled_file, pickle.dumps(schema))
+        except Exception as e:
+            logger.warning(f"Unable to cache the compiled schema: {e}")
+
+        return CachedSchema(
+            schema=schema,
+            digest=digest,
+            warm=False,
+            fetch_seconds=fetch_seconds,
+            compile_seconds=time.perf_counter() - compile_start,
+        )
+
+    def schema_digest(
+        self, schema_location: str, schema_base_url: str | None = None
+    ) -> str | None:
+        """
+        Returns the digest load_schema would use for the XSD without going to the network, or None if the XSD has
+        never been cached. For a remote XSD this is the digest of the last copy that was fetched.
+        """
+        try:
+            digest, _ = self._fetch_schema_files(
+                schema_location, schema_base_url, use_network=False
+            )
+        except (SchemaCacheException, OSError):
+            return None
+        return digest
+
+    def _fetch_schema_files(
+        self,
+        schema_location: str,
+        schema_base_url: str | None,
+        use_network: bool = True,
+    ) -> tuple[str, dict[str, CachedResource]]:
+        """
+        Fetches the XSD and the files it includes, and returns them with a digest covering all of them.
+        """
+        if schema_base_url is None:
+            schema_base_url = parse.urljoin(schema_location, ".")
+
+        root = self.fetch(schema_location, use_network=use_network)
+        xsd_files = {Path(parse.urlparse(schema_location).path).name: root}
+        self._collect_includes(root.contents, schema_base_url, xsd_files, use_network)
+
+        # The digest covers every file that goes into the compiled schema, and the xmlschema version that pickled it
+        bundle_hash = hashlib.sha256(xmlschema.__version__.encode())
+        for name in sorted(xsd_files):
+            bundle_hash.update(f"{name}:{xsd_files[name].digest}\n".encode())
+
+        return bundle_hash.hexdigest(), xsd_files
+
+    def fetch(self, location: str, use_network: bool = True) -> CachedResource:
+        """
+        Returns the contents of a location. Remote files are revalidated with ETag/Last-Modified when online, and
+        served from the cache when offline or when the server is unreachable. Local files are read directly.
+
+        Args:
+            location (str): A URL or a local path
+            use_network (bool, optional): If False, behave as if the cache was offline for this call.
+        """
+        scheme = parse.urlparse(location).scheme
+        if (
+            scheme in ["", "file"] or len(scheme) == 1
+        ):  # a single letter is a windows drive
+            path = Path(parse.urlparse(location).path if scheme == "file" else location)
+            contents = path.read_bytes()
+            return CachedResource(
+                location=location,
+                digest=sha256_digest(contents),
+                contents=contents,
+                source="local",
+            )
+
+        entry = self._index.get(location)
+        cached_contents = self._read_object(entry["digest"]) if entry else None
+
+        if use_network and not self.offline:
+            headers = {}
+            if cached_contents is not None and entry is not None:
+                if entry.get("etag"):
+                    headers["If-None-Match"] = entry["etag"]
+                if entry.get("last_modified"):
+                    headers["If-Modified-Since"] = entry["last_modified"]
+
+            try:
+                response = self.pool.get(location, headers=headers)
+            except (http.client.HTTPException, OSError) as e:
+                if cached_contents is None and self._read_bundled(location) is None:
+                    raise SchemaCacheException(f"Unable to fetch {location}: {e}")
+                logger.warning(f"Working offline, unable to fetch {location}: {e}")
+            else:
+                if 200 <= response.status < 300:
+                    return self._store(
+                        location,
+                        response.body,
+                        etag=response.headers.get("ETag"),
+                        last_modified=response.headers.get("Last-Modified"),
+                    )
+                if (
+                    response.status == 304
+                    and cached_contents is not None
+                    and entry is not None
+                ):
+                    return CachedResource(
+                        location=location,
+                        digest=entry["digest"],
+                        contents=cached_contents,
+                        source="revalidated",
+                    )
+                if cached_contents is None:
+                    raise SchemaCacheException(
+                        f"Unable to fetch {location}: HTTP {response.status}"
+                    )
+                logger.warning(
+                    f"Using cached copy of {location}: HTTP {response.status}"
+                )
+
+        if cached_contents is not None and entry is not None:
+            return CachedResource(
+                location=location,
+                digest=entry["digest"],
+                contents=cached_contents,
+                source="cache",
+            )
+
+        bundled_contents = self._read_bundled(location)
+        if bundled_contents is not None:
+            return CachedResource(
+                location=location,
+                digest=sha256_digest(bundled_contents),
+                contents=bundled_contents,
+                source="bundled",
+            )
+
+        raise SchemaCacheException(
+            f"{location} is not cached and no bundled copy exists, so it cannot be loaded offline."
+        )
+
+    def load_artifact(self, digest: str, name: str) -> bytes | None:
+        """
+        Returns an artifact stored for a schema digest with store_artifact, or None if there isn't one.
+        """
+        try:
+            return self.cache_dir.joinpath("artifacts", digest, name).read_bytes()
+        except OSError:
+            return None
+
+    def store_artifact(self, digest: str, name: str, contents: bytes) -> None:
+        """
+        Stores data derived from the schema with the given digest, so later runs can skip deriving it.
+        """
+        self._write_atomic(self.cache_dir.joinpath("artifacts", digest, name), contents)
+
+    def cached_digest(self, location: str) -> str | None:
+        """
+        Returns the digest of the last known contents of a location without going to the network, or None if the
+        location has never been fetched.
+        """
+        entry = self._index.get(location)
+        return entry["digest"] if entry is not None else None
+
+    def _collect_includes(
+        self,
+        xsd_contents: bytes,
+        base_url: str,
+        xsd_files: dict[str, CachedResource],
+        use_network: bool = True,
+    ) -> None:
+        """
+        Recursively fetches the relative xs:include, xs:import and xs:redefine locations of an XSD.
+        Absolute locations (e.g. the W3C xml.xsd) are left for xmlschema to resolve, since it bundles the common ones.
+        """
+        tree = etree.fromstring(xsd_contents)
+        for child in tree.iterchildren(
+            f"{{{XSD_NAMESPACE}}}include",
+            f"{{{XSD_NAMESPACE}}}import",
+            f"{{{XSD_NAMESPACE}}}redefine",
+        ):
+            schema_location = child.get("schemaLocation")
+            if schema_location is None or parse.urlparse(schema_location).scheme:
+                continue
+            if schema_location in xsd_files:
+                continue
+            if (
+                Path(schema_location).is_absolute()
+                or ".." in Path(schema_location).parts
+            ):
+                raise SchemaCacheException(
+                    f"Refusing to cache XSD include outside of the schema directory: {schema_location}"
+                )
+
+            resource = self.fetch(
+                parse.urljoin(base_url, schema_location), use_network=use_network
+            )
+            xsd_files[schema_location] = resource
+            self._collect_includes(
+                resource.contents,
+                parse.urljoin(base_url, schema_location),
+                xsd_files,
+                use_network,
+            )
+
+    def _store(
+        self,
+        location: str,
+        contents: bytes,
+        etag: str | None = None,
+        last_modified: str | None = None,
+    ) -> CachedResource:
+        digest = sha256_digest(contents)
+        object_file = self.cache_dir.joinpath("objects", digest)
+        if not object_file.exists():
+            self._write_atomic(object_file, contents)
+
+        entry = {"digest": digest}
+        if etag is not None:
+            entry["etag"] = etag
+        if last_modified is not None:
+            entry["last_modified"] = last_modified
+        with self._index_lock:
+            self._index[location] = entry
+            self._write_atomic(
+                self._index_file,
+                json.dumps(self._index, indent=2, sort_keys=True).encode(),
+            )
+
+        return CachedResource(
+            location=location, digest=digest, contents=contents, source="network"
+        )
+
+    def _read_index(self) -> dict[str, dict[str, str]]:
+        try:
+            return json.loads(self._index_file.read_text())
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable cache index {self._index_file}: {e}")
+            return {}
+
+    def _read_object(self, digest: str) -> bytes | None:
+        object_file = self.cache_dir.joinpath("objects", digest)
+        try:
+            contents = object_file.read_bytes()
+        except OSError:
+            return None
+        # Content addressing lets us detect a corrupt object for free
+        if sha256_digest(contents) != digest:
+            logger.warning(f"Ignoring corrupt cache object {object_file}")
+            return None
+        return contents
+
+    def _read_bundled(self, location: str) -> bytes | None:
+        """
+        Returns a copy of a file shipped with the package in metaschema_codegen/core/xsd, if there is one.
+        """
+        name = Path(parse.urlparse(location).path).name
+        bundled_file = (
+            importlib.resources.files(__package__).joinpath("xsd").joinpath(name)
+        )
+        if bundled_file.is_file():
+            return bundled_file.read_bytes()
+        return None
+
+    def _write_atomic(self, path: Path, contents: bytes) -> None:
+        # Write to a temporary file in the same directory and rename it, so readers never see a partial file
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                tmp_file.write(contents)
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
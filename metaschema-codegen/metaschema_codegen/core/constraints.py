@@ -0,0 +1,149 @@
+"""
+The constraints module collects the constraints of a metaschema set into one table, with their metapaths parsed.
+
+Constraints are defined on flag, field and assembly definitions, top-level and inline, and each one has metapath
+expressions: the target it applies to, and for some types a test or key fields. Large metaschemas repeat the same
+expressions many times (OSCAL uses some targets hundreds of times), so the table parses each distinct expression
+once, when it is built, and every constraint with that expression shares the parsed Metapath.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import logging
+import typing
+
+from ..metapath import Metapath, MetapathCompiler
+from .graph import DefinitionGraph, DefinitionNode
+from .model import Constraint, KeyField
+
+# The attributes common to all constraint types, which aren't parameters
+_COMMON_ATTRIBUTES = frozenset(field.name for field in dataclasses.fields(Constraint))
+
+# The parameters that are metapath expressions
+_METAPATH_PARAMETERS = frozenset({"test"})
+
+
+@dataclasses.dataclass(eq=False)
+class ConstraintEntry:
+    """
+    A constraint in the table.
+
+    Attributes:
+        node (DefinitionNode): the definition with the constraint
+        constraint (Constraint): the constraint
+        kind (str): the constraint type, e.g. "allowed-values"
+        target (Metapath): the parsed target of the constraint
+        parameters (dict[str, typing.Any]): the attributes of the constraint type, with metapath expressions parsed.
+            The key fields of an index or is-unique constraint are (Metapath, pattern) pairs.
+    """
+
+    __slots__ = ("node", "constraint", "kind", "target", "parameters")
+
+    node: DefinitionNode
+    constraint: Constraint
+    kind: str
+    target: Metapath
+    parameters: dict[str, typing.Any]
+
+
+@dataclasses.dataclass(frozen=True)
+class InvalidMetapath:
+    """
+    A metapath expression that couldn't be parsed, in a constraint.
+    """
+
+    schema: str
+    definition: str
+    constraint: str
+    metapath: Metapath
+
+
+class ConstraintTable:
+    """
+    The constraints of every definition in a metaschema set.
+
+    Attributes:
+        entries (list[ConstraintEntry]): the constraints, in the order of the definitions of the graph
+        metapaths (dict[str, Metapath]): every distinct metapath expression, by expression
+        invalid (list[InvalidMetapath]): the expressions that couldn't be parsed, where they were used
+    """
+
+    def __init__(self, graph: DefinitionGraph) -> None:
+        """
+        Collects the constraints of a definition graph and parses their metapaths. Usually accessed through
+        MetaSchemaSet.constraints.
+
+        Args:
+            graph (DefinitionGraph): the resolved definitions, see MetaSchemaSet.graph
+        """
+        self.graph = graph
+        self.entries: list[ConstraintEntry] = []
+        self.invalid: list[InvalidMetapath] = []
+        self._by_node: dict[int, list[ConstraintEntry]] = {}
+
+        compiler = MetapathCompiler()
+        self.metapaths = compiler.metapaths
+
+        for node in graph.nodes():
+            entries = []
+            for constraint in node.definition.constraints:
+                entry = ConstraintEntry(
+                    node=node,
+                    constraint=constraint,
+                    kind=constraint.kind,
+                    target=compiler.compile(constraint.target),
+                    parameters={
+                        field.name: _parameter(
+                            field.name, getattr(constraint, field.name), compiler
+                        )
+                        for field in dataclasses.fields(constraint)
+                        if field.name not in _COMMON_ATTRIBUTES
+                    },
+                )
+                entries.append(entry)
+                self._check(entry)
+            self._by_node[id(node)] = entries
+            self.entries.extend(entries)
+
+        for invalid in self.invalid:
+            logging.warning(
+                f"{invalid.schema}: {invalid.constraint} constraint of {invalid.definition} has an invalid metapath "
+                f"{invalid.metapath.expression!r}: {invalid.metapath.error}"
+            )
+
+    def constraints(self, node: DefinitionNode) -> list[ConstraintEntry]:
+        """
+        Returns the constraints of a definition, in the order they are defined.
+        """
+        return self._by_node[id(node)]
+
+    def _check(self, entry: ConstraintEntry) -> None:
+        metapaths = [entry.target]
+        for name, value in entry.parameters.items():
+            if name in _METAPATH_PARAMETERS:
+                metapaths.append(value)
+            elif name == "key_fields":
+                metapaths.extend(target for target, _ in value)
+
+        for metapath in metapaths:
+            if not metapath.valid:
+                self.invalid.append(
+                    InvalidMetapath(
+                        schema=entry.node.schema,
+                        definition=entry.node.definition.name,
+                        constraint=entry.kind,
+                        metapath=metapath,
+                    )
+                )
+
+
+def _parameter(name: str, value: typing.Any, compiler: MetapathCompiler) -> typing.Any:
+    if name in _METAPATH_PARAMETERS:
+        return compiler.compile(value)
+    if name == "key_fields":
+        return [
+            (compiler.compile(key_field.target), key_field.pattern)
+            for key_field in typing.cast(list[KeyField], value)
+        ]
+    return value
@@ -0,0 +1,401 @@
+"""
+The datatypes module provides the metaschema datatypes, and the precompiled datatype table shipped with the package.
+
+The datatypes (names, base types, patterns and documentation) are read from the annotations of the metaschema xsd.
+That needs a freshly compiled schema, since a compiled schema loaded from the cache has lost its annotations, and
+translates every pattern with elementpath. The table rarely changes, so a build step writes it once as a versioned
+JSON file (data/datatypes.json), and the parser loads that instead. The xsd is only introspected when the parser is
+given a different xsd than the one the table was built from.
+
+Building the wheel builds the table, see build.py. Build it by hand (from the metaschema-codegen directory) with:
+
+    python -m metaschema_codegen.core.datatypes [--schema URL] [--cache-dir DIR]
+"""
+
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import importlib.resources
+import json
+import logging
+import sys
+from pathlib import Path
+
+import elementpath
+import xmlschema
+
+from .cache import SchemaCache
+
+logger = logging.getLogger(__name__)
+
+# Increment this whenever the layout of the datatype table changes, so tables written by older versions are ignored
+DATATYPE_TABLE_VERSION = 1
+
+# The table shipped with the package, written by the build step
+PACKAGED_TABLE = "datatypes.json"
+
+DEFAULT_SCHEMA_LOCATION = "https://raw.githubusercontent.com/usnistgov/metaschema/main/schema/xml/metaschema.xsd"
+DEFAULT_SCHEMA_BASE_URL = (
+    "https://raw.githubusercontent.com/usnistgov/metaschema/main/schema/xml/"
+)
+
+# FIXME: This dict is necessary because of a bug in the metaschema xsd. This should be something we can calculate.
+SIMPLE_TYPE_MAP: dict[str, str] = {
+    "Base64Datatype": "base64",
+    "BooleanDatatype": "boolean",
+    "DateDatatype": "date",
+    "DateTimeDatatype": "date-time",
+    "DateTimeWithTimezoneDatatype": "date-time-with-timezone",
+    "DateWithTimezoneDatatype": "date-with-timezone",
+    "DayTimeDurationDatatype": "day-time-duration",
+    "DecimalDatatype": "decimal",
+    "EmailAddressDatatype": "email-address",
+    "HostnameDatatype": "hostname",
+    "IntegerDatatype": "integer",
+    "IPV4AddressDatatype": "ip-v4-address",
+    "IPV6AddressDatatype": "ip-v6-address",
+    "NonNegativeIntegerDatatype": "non-negative-integer",
+    "PositiveIntegerDatatype": "positive-integer",
+    "StringDatatype": "string",
+    "TokenDatatype": "token",
+    "URIDatatype": "uri",
+    "URIReferenceDatatype": "uri-reference",
+    "UUIDDatatype": "uuid",
+    "MarkupLineDatatype": "markup-line",
+    "MarkupMultilineDatatype": "markup-multiline",
+}
+
+
+class DatatypeException(Exception):
+    pass
+
+
+#  utility classes to simplify data passing
+@dataclasses.dataclass
+class DataType:
+    ref_name: str
+    name: str
+    documentation: str | None
+
+    def __repr__(self) -> str:
+        return str(dataclasses.asdict(self))
+
+
+@dataclasses.dataclass
+class SimpleRestrictionDatatype(DataType):
+    # HACK: ref_name is how this datatype is referenced in a metaschema specification
+    # The schema is busted so we have a dictionary in the class (simple_type_map)
+    base_type: str
+    patterns: dict[str, list[str]]
+
+
+@dataclasses.dataclass
+class SimpleUnionDatatype(DataType):
+    member_types: list[str]
+
+
+@dataclasses.dataclass
+class ComplexDataType(DataType):
+    elements: list[str]
+
+
+# The kind of each datatype class in the table
+DATATYPE_KINDS: dict[str, type[DataType]] = {
+    "simple-restriction": SimpleRestrictionDatatype,
+    "simple-union": SimpleUnionDatatype,
+    "complex": ComplexDataType,
+}
+
+
+@dataclasses.dataclass
+class DatatypeTable:
+    """
+    The datatypes of a metaschema xsd, and the xsd they were read from.
+
+    Attributes:
+        schema_location (str): the location of the xsd
+        xsd_digest (str): the digest of the xsd and the files it includes, from SchemaCache
+        datatypes (list[DataType]): the datatypes
+    """
+
+    schema_location: str
+    xsd_digest: str
+    datatypes: list[DataType]
+
+    def matches(self, schema_location: str, xsd_digest: str) -> bool:
+        """
+        Returns True if the table can stand in for introspecting an xsd, which is the case if the xsd is the one the
+        table was built from. A changed copy from the same location, e.g. a newer xsd on the upstream branch, may
+        have changed patterns or documentation, so it doesn't match.
+        """
+        if xsd_digest == self.xsd_digest:
+            return True
+        if schema_location == self.schema_location:
+            logger.warning(
+                f"{schema_location} has changed since the datatype table was built, reading its datatypes instead"
+            )
+        return False
+
+
+def dump_datatype_table(table: DatatypeTable) -> bytes:
+    """
+    Returns the JSON for a datatype table.
+    """
+    kinds = {datatype_class: kind for kind, datatype_class in DATATYPE_KINDS.items()}
+    return json.dumps(
+        {
+            "version": DATATYPE_TABLE_VERSION,
+            "schema_location": table.schema_location,
+            "xsd_digest": table.xsd_digest,
+            "datatypes": [
+                {"kind": kinds[type(datatype)], **dataclasses.asdict(datatype)}
+                for datatype in table.datatypes
+            ],
+        },
+        indent=2,
+    ).encode()
+
+
+def load_datatype_table(contents: bytes) -> DatatypeTable | None:
+    """
+    Reads a datatype table from its JSON. Returns None if it was written by a different version of the table
+    format, or cannot be read.
+    """
+    try:
+        table = json.loads(contents)
+        if table.get("version") != DATATYPE_TABLE_VERSION:
+            return None
+        return DatatypeTable(
+            schema_location=table["schema_location"],
+            xsd_digest=table["xsd_digest"],
+            datatypes=[
+                DATATYPE_KINDS[record.pop("kind")](**record)
+                for record in table["datatypes"]
+            ],
+        )
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        logger.warning(f"Ignoring unreadable datatype table: {e}")
+        return None
+
+
+def packaged_datatype_table() -> DatatypeTable | None:
+    """
+    Returns the datatype table shipped with the package, or None if the package was built without one.
+    """
+    table_file = importlib.resources.files(__package__).joinpath("data", PACKAGED_TABLE)
+    if not table_file.is_file():
+        return None
+    return load_datatype_table(table_file.read_bytes())
+
+
+def introspect_datatypes(metaschema_schema: xmlschema.XMLSchema) -> list[DataType]:
+    """
+    Reads the datatypes from the annotations of a compiled metaschema xsd. The schema must have been compiled
+    rather than loaded from the cache, which drops the annotations.
+    """
+    # Parse simple types only if they are one of the types used in the OSCAL metaschema
+    datatypes: list[DataType] = []
+    datatypes.extend(
+        _parse_simple_datatypes(
+            [
+                datatype
+                for datatype in metaschema_schema.simple_types
+                if datatype.local_name in SIMPLE_TYPE_MAP.keys()
+            ]
+        )
+    )
+    datatypes.extend(
+        _parse_complex_datatypes(
+            [
+                datatype
+                for datatype in metaschema_schema.complex_types
+                if datatype.local_name in SIMPLE_TYPE_MAP.keys()
+            ]
+        )
+    )
+    return datatypes
+
+
+def _parse_datatype_documentation(
+    datatype: xmlschema.validators.XsdSimpleType | xmlschema.validators.XsdComplexType,
+):
+    if (
+        datatype.annotation is not None
+        and datatype.annotation.documentation is not None
+    ):
+        doc_strings = [
+            str(documentation.text)
+            for documentation in datatype.annotation.documentation
+        ]
+        documentation = "".join(doc_strings)
+
+        # replace "\n" with " " and get rid of "\t"
+        documentation = documentation.replace("\n", " ").replace("\t", "")
+    else:
+        documentation = None
+
+    return documentation
+
+
+def _parse_simple_datatypes(
+    datatypes: list[xmlschema.validators.XsdSimpleType],
+) -> list[DataType]:
+    simple_datatypes: list[DataType] = []
+
+    for simple_datatype in datatypes:
+        if isinstance(simple_datatype, xmlschema.validators.XsdList):
+            # process as XsdList - none of these in the
+            # current metaschema so we're ignoring them
+            pass
+        elif isinstance(simple_datatype, xmlschema.validators.XsdUnion):
+            # Metaschema defines union types, but they don't appear to be used in oscal. ignoring.
+            pass
+        elif isinstance(
+            simple_datatype, xmlschema.validators.XsdAtomicRestriction
+        ):  # simple_datatype.variety == "atomic"
+            simple_datatypes.append(_parse_simple_atomicrestrictions(simple_datatype))
+        else:
+            raise DatatypeException(
+                f"Unrecognized simple data type {type(simple_datatype)}"
+            )
+
+    return simple_datatypes
+
+
+def _parse_simple_atomicrestrictions(
+    datatype: xmlschema.validators.XsdAtomicRestriction,
+) -> SimpleRestrictionDatatype:
+    if datatype.local_name is not None:
+        name = datatype.local_name  # local_name excludes the namespace
+
+    if name in SIMPLE_TYPE_MAP.keys():
+        ref_name = SIMPLE_TYPE_MAP[name]
+    else:
+        raise DatatypeException(
+            "Couldn't map " + name + " to any of the expected Metaschema types."
+        )
+
+    if datatype.base_type is not None and datatype.base_type.local_name is not None:
+        base_type = datatype.base_type.local_name
+
+    documentation = _parse_datatype_documentation(datatype=datatype)
+
+    patterns = {}
+    if datatype.patterns is not None:
+        # We take advantage of the fact that there's only one regex in this particular schema
+        xml_pattern = datatype.patterns.regexps[0]
+        pcre_pattern = elementpath.regex.translate_pattern(xml_pattern)
+        patterns.update(
+            {
+                "xml": xml_pattern,
+                "pcre": pcre_pattern,
+            }
+        )
+
+    return SimpleRestrictionDatatype(
+        ref_name=ref_name,
+        name=name,
+        base_type=base_type,
+        documentation=documentation,
+        patterns=patterns,
+    )
+
+
+def _parse_complex_datatypes(
+    datatypes: list[xmlschema.validators.XsdComplexType],
+) -> list[DataType]:
+    complex_datatypes: list[DataType] = []
+
+    for complex_datatype in datatypes:
+        if complex_datatype.local_name is not None:
+            name = complex_datatype.local_name
+
+        if name in SIMPLE_TYPE_MAP.keys():
+            ref_name = SIMPLE_TYPE_MAP[name]
+        else:
+            raise DatatypeException(
+                "Couldn't map " + name + " to any of the expected Metaschema types."
+            )
+
+        documentation = _parse_datatype_documentation(complex_datatype)
+
+        elements = []
+        if isinstance(complex_datatype.content, xmlschema.validators.XsdGroup):
+            for element in complex_datatype.content.iter_elements():
+                elements.append(element.local_name)
+
+        complex_datatypes.append(
+            ComplexDataType(
+                ref_name=ref_name,
+                name=name,
+                documentation=documentation,
+                elements=elements,
+            )
+        )
+
+    return complex_datatypes
+
+
+def build_datatype_table(
+    schema_location: str = DEFAULT_SCHEMA_LOCATION,
+    schema_base_url: str | None = DEFAULT_SCHEMA_BASE_URL,
+    cache_dir: Path | None = None,
+) -> DatatypeTable:
+    """
+    Compiles a metaschema xsd and reads its datatype table.
+
+    Args:
+        schema_location (str, optional): A URL or local path for the metaschema xsd. Defaults to the metaschema xsd
+            the parser uses by default.
+        schema_base_url (str | None, optional): The location the files included by the xsd are relative to.
+        cache_dir (Path | None, optional): The SchemaCache directory used to fetch the xsd.
+    """
+    schema_load = SchemaCache(cache_dir=cache_dir).load_schema(
+        schema_location=schema_location,
+        schema_base_url=schema_base_url,
+        use_compiled=False,
+    )
+    return DatatypeTable(
+        schema_location=schema_location,
+        xsd_digest=schema_load.digest,
+        datatypes=introspect_datatypes(schema_load.schema),
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Build the datatype table shipped with the package."
+    )
+    parser.add_argument(
+        "-S",
+        "--schema",
+        help="The location of the metaschema xsd file. Defaults to the parser's default xsd.",
+    )
+    parser.add_argument(
+        "--cache-dir", type=Path, help="The metaschema xsd cache directory."
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        default=Path(__file__).parent.joinpath("data", PACKAGED_TABLE),
+        help="The file to write the table to. Defaults to the table shipped with the package.",
+    )
+    args = parser.parse_args()
+
+    schema_args = {}
+    if args.schema is not None:
+        schema_args = {"schema_location": args.schema, "schema_base_url": None}
+
+    table = build_datatype_table(cache_dir=args.cache_dir, **schema_args)
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_bytes(dump_datatype_table(table))
+    print(
+        f"Wrote {len(table.datatypes)} datatypes from {table.schema_location} to {args.output}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,505 @@
+"""
+The extract module decodes a metaschema document straight from its lxml tree.
+
+xmlschema's to_dict() validates every element against the content model and runs each value through a generic
+converter, which makes it the slowest step of a cold parse. The metaschema xsd doesn't change between documents, so
+the ElementExtractor derives a small decoding plan from each xsd type once and then walks the lxml tree, producing
+exactly the dict to_dict() produces for a valid document: "@"-prefixed attributes (with defaults filled in), "$" for
+the text of an element that also has attributes, lists for repeatable elements and decoded simple values.
+
+The extractor does not validate. A document that the plan can't decode faithfully (for instance one using xsi:type)
+is decoded by to_dict() instead, with the validation mode of the parse, so a parse that skips validation doesn't
+validate that document either.
+"""
+
+from __future__ import annotations
+
+import decimal
+import logging
+import typing
+
+import xmlschema
+from elementpath.datatypes import AbstractDateTime, Duration
+from lxml import etree
+
+XSI_TYPE = "{http://www.w3.org/2001/XMLSchema-instance}type"
+XSI_NAMESPACE = "http://www.w3.org/2001/XMLSchema-instance"
+
+# The types xmlschema's decoder keeps as they are, any other decoded value is converted to a string
+_KEPT_TYPES = (int, float, list, decimal.Decimal, str)
+
+# Values of types derived from these primitives decode to their whitespace normalized text
+_STRING_PRIMITIVES = ("string", "anyURI")
+
+
+class _Skipped:
+    """Marks content matched by a processContents="skip" wildcard, which is left out of the result."""
+
+
+_SKIPPED = _Skipped()
+
+
+class _Unsupported(Exception):
+    """Raised when a document uses a feature the plan can't decode faithfully."""
+
+
+class _ElementDeclaration(typing.NamedTuple):
+    """The parts of an element declaration (or a wildcard match) needed to decode an element."""
+
+    xsd_type: typing.Any
+    default: str | None
+    fixed: str | None
+    single: bool
+
+
+class _TypePlan:
+    """
+    How the elements of one xsd type are decoded.
+
+    Attributes:
+        simple_type: the simple type of the text, for simple types and complex types with simple content
+        has_group (bool): whether the type has a model group (element content)
+        cdata (bool): whether text in element content is kept, which is the case for mixed content
+        is_qname (bool): whether the type is an xs:QName
+        attributes (dict): the declared attributes by name
+        defaults (list): the attributes with a default or fixed value, in declaration order
+        any_attribute: the attribute wildcard, if any
+        children (dict[str, _ElementDeclaration]): the declared child elements by name
+        wildcards (list): the element wildcards and whether each is single
+    """
+
+    __slots__ = (
+        "simple_type",
+        "has_group",
+        "cdata",
+        "is_qname",
+        "attributes",
+        "defaults",
+        "any_attribute",
+        "children",
+        "wildcards",
+    )
+
+    def __init__(self, xsd_type: typing.Any):
+        self.is_qname = bool(xsd_type.is_qname())
+        self.attributes: dict[str, typing.Any] = {}
+        self.defaults: list[tuple[str, typing.Any]] = []
+        self.any_attribute = None
+        self.children: dict[str, _ElementDeclaration] = {}
+        self.wildcards: list[tuple[typing.Any, bool]] = []
+
+        if xsd_type.is_simple():
+            self.simple_type = xsd_type
+            self.has_group = False
+            self.cdata = False
+            return
+
+        for name, xsd_attribute in xsd_type.attributes.items():
+            if name is None:
+                self.any_attribute = xsd_attribute
+                continue
+            self.attributes[name] = xsd_attribute
+            if xsd_attribute.fixed is not None or xsd_attribute.default is not None:
+                self.defaults.append((name, xsd_attribute))
+
+        model_group = xsd_type.model_group
+        if model_group is None:
+            self.simple_type = xsd_type.content
+            self.has_group = False
+            self.cdata = False
+            return
+
+        self.simple_type = None
+        self.has_group = True
+        self.cdata = bool(xsd_type.mixed) or (
+            len(model_group) == 1
+            and isinstance(model_group[0], xmlschema.validators.XsdAnyElement)
+        )
+
+        has_single_group = model_group.is_single()
+        for particle in model_group.iter_elements():
+            single = bool(has_single_group and particle.is_single())
+            if isinstance(particle, xmlschema.validators.XsdAnyElement):
+                self.wildcards.append((particle, single))
+                continue
+
+            declaration = _ElementDeclaration(
+                xsd_type=particle.type,
+                default=particle.default,
+                fixed=particle.fixed,
+                single=single,
+            )
+            previous = self.children.setdefault(particle.name, declaration)
+            if (
+                previous.single != single
+                or particle.name in particle.maps.substitution_groups
+            ):
+                # Which declaration applies depends on the position of the element in the content model,
+                # which only a validating decoder tracks
+                raise _Unsupported(f"element {particle.name} is ambiguous")
+
+
+class ElementExtractor:
+    """
+    Decodes metaschema documents against a compiled metaschema xsd without validating them. The decoding plan of
+    each xsd type is built the first time the type is seen, and decoded values are memoized, so one extractor should
+    be reused for all of the documents decoded against the same xsd.
+    """
+
+    def __init__(self, schema_xsd: xmlschema.XMLSchema, validation: str = "strict"):
+        """
+        Args:
+            schema_xsd (xmlschema.XMLSchema): The compiled metaschema xsd
+            validation (str, optional): How to_dict() validates a document the extractor can't decode, one of
+                "strict", "lax" and "skip", see schemaparse.VALIDATION_MODES. Defaults to "strict".
+        """
+        self.schema_xsd = schema_xsd
+        self.validation = validation
+        self._plans: dict[int, _TypePlan] = {}
+        self._unsupported_types: set[int] = set()
+        self._wildcard_matches: dict[
+            tuple[int, str], _ElementDeclaration | _Skipped
+        ] = {}
+        self._values: dict[tuple[int, str | None], typing.Any] = {}
+        self._string_types: dict[int, bool] = {}
+        # Keep the components whose ids key the caches alive, so an id is never reused
+        self._components: list[typing.Any] = []
+
+    def extract(self, metaschema_etree: etree._ElementTree) -> dict:
+        """
+        Returns the same dict as schema_xsd.to_dict() for a metaschema document.
+
+        Args:
+            metaschema_etree (etree._ElementTree): The parsed metaschema document
+        """
+        root = metaschema_etree.getroot()
+        try:
+            xsd_element = self.schema_xsd.maps.elements.get(root.tag)
+            if xsd_element is None:
+                raise _Unsupported(f"{root.tag} is not a global element")
+
+            declaration = _ElementDeclaration(
+                xsd_type=xsd_element.type,
+                default=xsd_element.default,
+                fixed=xsd_element.fixed,
+                single=True,
+            )
+            xmlns = [(prefix or "", uri) for prefix, uri in root.nsmap.items()]
+            # On the root the first prefix declared for a namespace is used, on descendants the last one
+            reverse: dict[str, str] = {}
+            for prefix, uri in xmlns:
+                reverse.setdefault(uri, prefix and prefix + ":")
+            return typing.cast(dict, self._decode(root, declaration, xmlns, reverse))
+        except _Unsupported:
+            resource = typing.cast(xmlschema.XMLResource, metaschema_etree)
+            if self.validation == "lax":
+                schema_dict, errors = self.schema_xsd.to_dict(
+                    resource, validation="lax"
+                )
+                for error in errors:
+                    logging.warning(f"{root.tag} is not valid: {error.reason}")
+                return typing.cast(dict, schema_dict)
+            return typing.cast(
+                dict, self.schema_xsd.to_dict(resource, validation=self.validation)
+            )
+
+    def _decode(
+        self,
+        elem: etree._Element,
+        declaration: _ElementDeclaration,
+        xmlns: list[tuple[str, str]] | None,
+        reverse: dict[str, str],
+    ) -> typing.Any:
+        """
+        Decodes an element, mirroring xmlschema's XMLSchemaConverter.element_decode().
+
+        Args:
+            xmlns (list[tuple[str, str]] | None): the namespaces declared on the element
+            reverse (dict[str, str]): the prefix (with its colon) of each namespace in scope
+        """
+        if XSI_TYPE in elem.attrib:
+            raise _Unsupported("xsi:type is not supported")
+
+        plan = self._plan(declaration.xsd_type)
+        attributes = self._decode_attributes(elem, plan, reverse)
+        content: list[tuple[str, typing.Any, bool]] = []
+
+        if plan.simple_type is not None:
+            text = elem.text
+            if declaration.fixed is not None:
+                if not text:
+                    text = declaration.fixed
+            elif not text and declaration.default is not None:
+                text = declaration.default
+            value = self._decode_text(plan.simple_type, text) if text else None
+        else:
+            value = None
+            for child in elem:
+                tag = child.tag
+                if not isinstance(tag, str):
+                    continue  # a comment or a processing instruction
+
+                child_declaration = plan.children.get(tag)
+                if child_declaration is None:
+                    match = self._match_wildcard(plan, tag)
+                    if match is _SKIPPED:
+                        continue
+                    child_declaration = typing.cast(_ElementDeclaration, match)
+
+                child_xmlns = self._declarations(child)
+                child_reverse = reverse
+                if child_xmlns:
+                    child_reverse = dict(reverse)
+                    child_reverse.update(
+                        (uri, prefix and prefix + ":") for prefix, uri in child_xmlns
+                    )
+
+                content.append(
+                    (
+                        _map_qname(tag, child_reverse),
+                        self._decode(
+                            child, child_declaration, child_xmlns, child_reverse
+                        ),
+                        child_declaration.single,
+                    )
+                )
+
+            if not content and plan.cdata and elem.text is not None:
+                value = elem.text.strip() or None
+
+        result: dict[str, typing.Any] = {}
+        if xmlns:
+            result.update(
+                (f"@xmlns:{prefix}" if prefix else "@xmlns", uri)
+                for prefix, uri in xmlns
+            )
+        result.update(attributes)
+
+        if not plan.has_group or not content:
+            if attributes or self._keep_xmlns(elem, plan, value, xmlns):
+                if value is not None:
+                    result["$"] = value
+                return result
+            return value
+
+        for name, child_value, single in content:
+            try:
+                existing = result[name]
+            except KeyError:
+                result[name] = child_value if single else [child_value]
+            else:
+                if not isinstance(existing, list) or not existing:
+                    result[name] = [existing, child_value]
+                elif isinstance(existing[0], list) or not isinstance(child_value, list):
+                    existing.append(child_value)
+                else:
+                    result[name] = [existing, child_value]
+
+        return result or None
+
+    def _keep_xmlns(
+        self,
+        elem: etree._Element,
+        plan: _TypePlan,
+        value: typing.Any,
+        xmlns: list[tuple[str, str]] | None,
+    ) -> bool:
+        """
+        Returns True if an element with simple content is kept as a dict because of its namespace declarations.
+        """
+        if not xmlns:
+            return False
+
+        namespace = etree.QName(elem).namespace or ""
+        if any(uri == namespace for _, uri in xmlns):
+            return True
+
+        if plan.is_qname and isinstance(value, str):
+            prefix = value.split(":")[0]
+            return any(declared == prefix for declared, _ in xmlns)
+
+        return False
+
+    def _decode_attributes(
+        self, elem: etree._Element, plan: _TypePlan, reverse: dict[str, str]
+    ) -> list[tuple[str, typing.Any]]:
+        """
+        Decodes the attributes of an element, followed by the defaults of any that are missing.
+        """
+        attributes: list[tuple[str, typing.Any]] = []
+        if len(elem.attrib) == 0 and len(plan.defaults) == 0:
+            return attributes
+
+        maps = self.schema_xsd.maps
+        for name, raw_value in elem.attrib.items():
+            xsd_attribute = plan.attributes.get(name)
+            if xsd_attribute is None:
+                if name.startswith("{" + XSI_NAMESPACE + "}"):
+                    xsd_attribute = maps.attributes.get(name)
+                if xsd_attribute is None:
+                    if (
+                        plan.any_attribute is None
+                        or plan.any_attribute.process_contents == "skip"
+                    ):
+                        continue
+                    xsd_attribute = maps.attributes.get(name)
+                    if xsd_attribute is None:
+                        attributes.append(("@" + _map_qname(name, reverse), raw_value))
+                        continue
+
+            attributes.append(
+                (
+                    "@" + _map_qname(name, reverse),
+                    self._decode_attribute(xsd_attribute, raw_value),
+                )
+            )
+
+        for name, xsd_attribute in plan.defaults:
+            if name not in elem.attrib:
+                attributes.append(
+                    (
+                        "@" + _map_qname(name, reverse),
+                        self._decode_attribute(xsd_attribute, None),
+                    )
+                )
+
+        return attributes
+
+    def _decode_attribute(
+        self, xsd_attribute: typing.Any, raw_value: str | None
+    ) -> typing.Any:
+        if raw_value is None:
+            raw_value = (
+                xsd_attribute.fixed
+                if xsd_attribute.fixed is not None
+                else xsd_attribute.default
+            )
+        return self._decode_text(xsd_attribute.type, typing.cast(str, raw_value))
+
+    def _decode_text(self, simple_type: typing.Any, text: str) -> typing.Any:
+        """
+        Decodes the text of a simple value the way xmlschema does. Strings are only normalized, other values are
+        decoded by xmlschema once and memoized, since building a decoding context for each value is slow.
+        """
+        is_string = self._string_types.get(id(simple_type))
+        if is_string is None:
+            primitive_type = getattr(simple_type, "primitive_type", None)
+            is_string = bool(
+                simple_type.is_atomic()
+                and primitive_type is not None
+                and primitive_type.local_name in _STRING_PRIMITIVES
+            )
+            self._string_types[id(simple_type)] = is_string
+            self._components.append(simple_type)
+
+        if is_string:
+            return simple_type.normalize(text)
+
+        key = (id(simple_type), text)
+        try:
+            return self._values[key]
+        except KeyError:
+            pass
+
+        value = simple_type.decode(text, validation="skip")
+        if value is None:
+            pass
+        elif isinstance(value, str):
+            if value[:1] == "{" and simple_type.is_qname():
+                value = text
+        elif isinstance(value, (AbstractDateTime, Duration)):
+            value = text.strip()
+        elif not isinstance(value, _KEPT_TYPES):
+            value = str(value)
+
+        self._values[key] = value
+        return value
+
+    def _plan(self, xsd_type: typing.Any) -> _TypePlan:
+        try:
+            return self._plans[id(xsd_type)]
+        except KeyError:
+            pass
+
+        if id(xsd_type) in self._unsupported_types:
+            raise _Unsupported(f"type {xsd_type.name} is not supported")
+
+        self._components.append(xsd_type)
+        try:
+            plan = _TypePlan(xsd_type)
+        except _Unsupported:
+            self._unsupported_types.add(id(xsd_type))
+            raise
+
+        self._plans[id(xsd_type)] = plan
+        return plan
+
+    def _match_wildcard(
+        self, plan: _TypePlan, tag: str
+    ) -> _ElementDeclaration | _Skipped:
+        """
+        Returns how an element matched by one of the wildcards of a type is decoded. Like xmlschema, a wildcard
+        decodes an element with its global declaration if there is one and as xs:anyType otherwise.
+        """
+        key = (id(plan), tag)
+        try:
+            return self._wildcard_matches[key]
+        except KeyError:
+            pass
+
+        for wildcard, single in plan.wildcards:
+            if not wildcard.is_matching(tag):
+                continue
+
+            match: _ElementDeclaration | _Skipped
+            if wildcard.process_contents == "skip":
+                match = _SKIPPED
+            else:
+                xsd_element = self.schema_xsd.maps.elements.get(tag)
+                if xsd_element is not None:
+                    match = _ElementDeclaration(
+                        xsd_type=xsd_element.type,
+                        default=xsd_element.default,
+                        fixed=xsd_element.fixed,
+                        single=single,
+                    )
+                else:
+                    match = _ElementDeclaration(
+                        xsd_type=self.schema_xsd.maps.any_type,
+                        default=None,
+                        fixed=None,
+                        single=single,
+                    )
+            self._wildcard_matches[key] = match
+            return match
+
+        # The element isn't allowed here. Let to_dict() report it.
+        raise _Unsupported(f"unexpected element {tag}")
+
+    @staticmethod
+    def _declarations(elem: etree._Element) -> list[tuple[str, str]] | None:
+        """
+        Returns the namespaces declared on an element, that weren't already in scope on its parent.
+        """
+        parent_nsmap = typing.cast(etree._Element, elem.getparent()).nsmap
+        nsmap = elem.nsmap
+        if nsmap == parent_nsmap:
+            return None
+        return [
+            (prefix or "", uri)
+            for prefix, uri in nsmap.items()
+            if prefix not in parent_nsmap or parent_nsmap[prefix] != uri
+        ]
+
+
+def _map_qname(name: str, reverse: dict[str, str]) -> str:
+    """
+    Converts a {namespace}name to prefix:name (or just name for the default namespace), like xmlschema does.
+    """
+    if name[0] != "{":
+        return name
+    namespace, local_name = name[1:].split("}")
+    try:
+        return reverse[namespace] + local_name
+    except KeyError:
+        return name
@@ -0,0 +1,282 @@
+"""
+The fingerprint module calculates a content hash for each definition in a metaschema set, for change detection.
+
+A definition's content hash covers what is written in it: its attributes, documentation, constraints and inline
+definitions, and the definitions its references resolve to, by name. Its fingerprint also covers the fingerprints of
+those definitions, bottom-up like a Merkle tree, so it changes when anything the definition depends on changes. A
+cache of generated code, compiled metapaths or validation results can be keyed by the fingerprint of what it was
+built from, and diff() tells an incremental build what to rebuild.
+
+Definitions that reference each other (e.g. an assembly that contains itself) can't be hashed bottom-up. The
+definitions of such a cycle share the hash of all of their contents, so a change to any of them changes them all.
+
+The documentation is hashed as parsed, so a set parsed in lean mode has different fingerprints than the full set.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import json
+import typing
+
+from .graph import ChoiceEdge, DefinitionGraph, DefinitionNode, InstanceEdge
+
+if typing.TYPE_CHECKING:
+    from .schemaparse import MetaSchemaSet
+
+# The schema file, kind and name of a top-level definition
+DefinitionKey = tuple[str, str, str]
+
+# The attributes hashed through the definition graph rather than as values
+_GRAPH_ATTRIBUTES = frozenset({"flags", "model", "constraints"})
+
+
+@dataclasses.dataclass(frozen=True)
+class Fingerprint:
+    """
+    The hashes of a top-level definition.
+
+    Attributes:
+        content (str): the hash of the definition itself, its inline definitions included
+        fingerprint (str): the hash of the definition and of every definition it depends on
+        constraints (tuple[str, ...]): the hash of each of the definition's own constraints, in order
+    """
+
+    content: str
+    fingerprint: str
+    constraints: tuple[str, ...]
+
+
+@dataclasses.dataclass(frozen=True)
+class FingerprintDiff:
+    """
+    The differences between the definitions of two metaschema sets.
+
+    Attributes:
+        added (list[DefinitionKey]): the definitions only in the new set
+        removed (list[DefinitionKey]): the definitions only in the old set
+        changed (list[DefinitionKey]): the definitions whose fingerprint changed, because they or a definition
+            they depend on changed
+        modified (list[DefinitionKey]): the changed definitions whose own content changed
+    """
+
+    added: list[DefinitionKey]
+    removed: list[DefinitionKey]
+    changed: list[DefinitionKey]
+    modified: list[DefinitionKey]
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+
+class Fingerprints:
+    """
+    The fingerprints of the top-level definitions of a metaschema set.
+
+    Attributes:
+        definitions (dict[DefinitionKey, Fingerprint]): the fingerprints, by definition
+        datatypes (dict[str, str]): the hash of each datatype, by datatype name
+    """
+
+    def __init__(self, graph: DefinitionGraph) -> None:
+        """
+        Calculates the fingerprints of every top-level definition in a definition graph. Usually accessed through
+        MetaSchemaSet.fingerprints.
+
+        Args:
+            graph (DefinitionGraph): the resolved definitions, see MetaSchemaSet.graph
+        """
+        self.graph = graph
+        self.definitions: dict[DefinitionKey, Fingerprint] = {}
+        self.datatypes = {
+            datatype.name: _hash(_canonical(datatype)) for datatype in graph.datatypes
+        }
+        self._contents: dict[int, str] = {}
+        self._fingerprints: dict[int, str] = {}
+
+        nodes = [node for module in graph.modules.values() for node in module]
+        for node in nodes:
+            self._contents[id(node)] = _hash(self._node_content(node))
+
+        self._fingerprint_components(nodes)
+
+        for node in nodes:
+            self.definitions[_key(node)] = Fingerprint(
+                content=self._contents[id(node)],
+                fingerprint=self._fingerprints[id(node)],
+                constraints=_constraint_hashes(node),
+            )
+
+    def __getitem__(self, key: DefinitionKey) -> Fingerprint:
+        return self.definitions[key]
+
+    def node_fingerprint(self, node: DefinitionNode) -> str:
+        """
+        Returns the fingerprint of a top-level definition's node.
+        """
+        return self._fingerprints[id(node)]
+
+    def _node_content(self, node: DefinitionNode) -> typing.Any:
+        """
+        Returns the canonical content of a node: its definition without the flags and model, which are replaced by
+        their resolved edges, and with its constraints replaced by their hashes.
+        """
+        definition = node.definition
+        content = _canonical(definition, exclude=_GRAPH_ATTRIBUTES)
+        content["constraints"] = list(_constraint_hashes(node))
+        content["flags"] = [self._edge_content(edge) for edge in node.flags]
+        content["model"] = [
+            (
+                ["choice", [self._edge_content(edge) for edge in item.instances]]
+                if isinstance(item, ChoiceEdge)
+                else self._edge_content(item)
+            )
+            for item in node.model
+        ]
+        return content
+
+    def _edge_content(self, edge: InstanceEdge) -> typing.Any:
+        if edge.target.inline:
+            return self._node_content(edge.target)
+        return [_canonical(edge.instance), list(_key(edge.target))]
+
+    def _fingerprint_components(self, nodes: list[DefinitionNode]) -> None:
+        """
+        Calculates the fingerprints of the nodes, a strongly connected component at a time (Tarjan's algorithm), so
+        that the fingerprints of the definitions a component depends on are known before its own.
+        """
+        index: dict[int, int] = {}
+        lowlink: dict[int, int] = {}
+        stack: list[DefinitionNode] = []
+        on_stack: set[int] = set()
+
+        def visit(node: DefinitionNode) -> None:
+            index[id(node)] = lowlink[id(node)] = len(index)
+            stack.append(node)
+            on_stack.add(id(node))
+
+            for target in _dependencies(node):
+                if id(target) not in index:
+                    visit(target)
+                    lowlink[id(node)] = min(lowlink[id(node)], lowlink[id(target)])
+                elif id(target) in on_stack:
+                    lowlink[id(node)] = min(lowlink[id(node)], index[id(target)])
+
+            if lowlink[id(node)] == index[id(node)]:
+                component: list[DefinitionNode] = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(id(member))
+                    component.append(member)
+                    if member is node:
+                        break
+                self._fingerprint_component(component)
+
+        for node in nodes:
+            if id(node) not in index:
+                visit(node)
+
+    def _fingerprint_component(self, component: list[DefinitionNode]) -> None:
+        """
+        Calculates the fingerprints of a strongly connected component. The definitions of a cycle each depend on all
+        of the others, so they share their contents and the fingerprints of what any of them depends on.
+        """
+        if len(component) == 1 and not any(
+            target is component[0] for target in _dependencies(component[0])
+        ):
+            node = component[0]
+            self._fingerprints[id(node)] = _hash(
+                [
+                    self._contents[id(node)],
+                    [self._fingerprints[id(target)] for target in _dependencies(node)],
+                ]
+            )
+            return
+
+        members = {id(node) for node in component}
+        shared = [
+            sorted(self._contents[id(node)] for node in component),
+            sorted(
+                {
+                    self._fingerprints[id(target)]
+                    for node in component
+                    for target in _dependencies(node)
+                    if id(target) not in members
+                }
+            ),
+        ]
+        for node in component:
+            self._fingerprints[id(node)] = _hash([self._contents[id(node)], shared])
+
+
+def diff(old_set: MetaSchemaSet, new_set: MetaSchemaSet) -> FingerprintDiff:
+    """
+    Returns the definitions that were added, removed or changed between two parses of a metaschema set.
+
+    Args:
+        old_set (MetaSchemaSet): the earlier parse
+        new_set (MetaSchemaSet): the later parse
+    """
+    old = old_set.fingerprints.definitions
+    new = new_set.fingerprints.definitions
+
+    changed = [
+        key
+        for key, fingerprint in new.items()
+        if key in old and old[key].fingerprint != fingerprint.fingerprint
+    ]
+    return FingerprintDiff(
+        added=[key for key in new if key not in old],
+        removed=[key for key in old if key not in new],
+        changed=changed,
+        modified=[key for key in changed if old[key].content != new[key].content],
+    )
+
+
+def _key(node: DefinitionNode) -> DefinitionKey:
+    return (node.schema, node.kind, node.definition.name)
+
+
+def _dependencies(node: DefinitionNode) -> typing.Iterator[DefinitionNode]:
+    """
+    Yields the top-level definitions a node references, directly or through its inline definitions, in order.
+    """
+    for edge in node.instances():
+        if edge.target.inline:
+            yield from _dependencies(edge.target)
+        else:
+            yield edge.target
+
+
+def _constraint_hashes(node: DefinitionNode) -> tuple[str, ...]:
+    return tuple(
+        _hash(_canonical(constraint)) for constraint in node.definition.constraints
+    )
+
+
+def _canonical(value: typing.Any, exclude: frozenset[str] = frozenset()) -> typing.Any:
+    """
+    Returns a value as JSON-compatible data, with the class and attributes of dataclasses, e.g. the model classes.
+    """
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    if isinstance(value, dict):
+        return {str(key): _canonical(item) for key, item in value.items()}
+    if dataclasses.is_dataclass(value):
+        content = {
+            field.name: _canonical(getattr(value, field.name))
+            for field in dataclasses.fields(value)
+            if field.name not in exclude
+        }
+        content["class"] = type(value).__name__
+        return content
+    return str(value)
+
+
+def _hash(content: typing.Any) -> str:
+    return hashlib.sha256(
+        json.dumps(content, sort_keys=True, separators=(",", ":")).encode()
+    ).hexdigest()
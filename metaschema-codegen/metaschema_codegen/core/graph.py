@@ -0,0 +1,431 @@
+"""
+The graph module resolves a parsed metaschema set into a graph of definitions.
+
+The definitions in the model refer to each other by name: a flag, field or assembly instance names its definition in
+"@ref", and what it resolves to depends on the metaschema it is in and on that metaschema's imports. The
+DefinitionGraph resolves every reference once, with the SymbolTable, so that each instance points directly at the
+node of its definition. The names, JSON keys, cardinalities and datatype classes that code generation needs are
+calculated once, on the nodes, and every generator reads them from the same graph.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import logging
+import typing
+
+from .model import (
+    AssemblyDefinition,
+    Choice,
+    Definition,
+    FieldDefinition,
+    FlagDefinition,
+    FlagReference,
+    GroupAs,
+    InstanceReference,
+    ModelInstance,
+    pythonize_name,
+)
+from .symbols import DEFINITION_KINDS, SymbolTable
+
+if typing.TYPE_CHECKING:
+    from .datatypes import DataType
+    from .schemaparse import MetaSchemaSet
+
+
+@dataclasses.dataclass(eq=False)
+class DefinitionNode:
+    """
+    A flag, field or assembly definition in the graph.
+
+    Attributes:
+        kind (str): "flag", "field" or "assembly"
+        definition (Definition): the definition
+        schema (str): the file of the metaschema with the definition
+        module_name (str): the python module of the metaschema with the definition
+        inline (bool): whether the definition is inline, in a field or assembly
+        datatype_class (str | None): the class of the datatype of a flag or field, None for an assembly or an
+            unknown datatype
+        flags (list[InstanceEdge]): the flags of a field or assembly
+        model (list[InstanceEdge | ChoiceEdge]): the fields and assemblies an assembly contains
+    """
+
+    __slots__ = (
+        "kind",
+        "definition",
+        "schema",
+        "module_name",
+        "inline",
+        "datatype_class",
+        "flags",
+        "model",
+    )
+
+    kind: str
+    definition: Definition
+    schema: str
+    module_name: str
+    inline: bool
+    datatype_class: str | None
+    flags: list[InstanceEdge]
+    model: list[InstanceEdge | ChoiceEdge]
+
+    @property
+    def class_name(self) -> str:
+        return self.definition.class_name
+
+    def instances(self) -> list[InstanceEdge]:
+        """
+        Returns the flags and model instances of the node, with the instances of choices, in order.
+        """
+        edges = list(self.flags)
+        for item in self.model:
+            edges.extend(item.instances if isinstance(item, ChoiceEdge) else [item])
+        return edges
+
+
+@dataclasses.dataclass(eq=False)
+class InstanceEdge:
+    """
+    A flag, field or assembly instance, resolved to the node of its definition.
+
+    Attributes:
+        instance (FlagReference | InstanceReference | Definition): the instance, which is the definition itself for
+            an inline definition
+        target (DefinitionNode): the node of the definition
+        effective_name (str): the name of the instance, its use-name or else the effective name of the definition
+        python_name (str): the name of the python property for the instance
+        json_key (str): the JSON property name of the instance, the group-as name for a repeatable instance
+        min_occurs (int): the minimum number of occurrences
+        max_occurs (int | None): the maximum number of occurrences, None if unbounded
+        required (bool): whether the instance is required
+        multiple (bool): whether more than one occurrence is allowed
+        group_as (GroupAs | None): how multiple occurrences are grouped
+    """
+
+    __slots__ = (
+        "instance",
+        "target",
+        "effective_name",
+        "python_name",
+        "json_key",
+        "min_occurs",
+        "max_occurs",
+        "required",
+        "multiple",
+        "group_as",
+    )
+
+    instance: FlagReference | InstanceReference | Definition
+    target: DefinitionNode
+    effective_name: str
+    python_name: str
+    json_key: str
+    min_occurs: int
+    max_occurs: int | None
+    required: bool
+    multiple: bool
+    group_as: GroupAs | None
+
+    @property
+    def definition(self) -> Definition:
+        return self.target.definition
+
+    @property
+    def datatype_class(self) -> str | None:
+        return self.target.datatype_class
+
+
+@dataclasses.dataclass(eq=False)
+class ChoiceEdge:
+    """
+    A choice between instances in a model.
+    """
+
+    __slots__ = ("instances",)
+
+    instances: list[InstanceEdge]
+
+
+@dataclasses.dataclass(eq=False)
+class Reachable:
+    """
+    The definitions and datatypes reachable from a selection of root assemblies.
+
+    Attributes:
+        roots (list[DefinitionNode]): the root assemblies
+        nodes (list[DefinitionNode]): the reachable top-level and inline definitions, the roots included
+        datatypes (list[DataType]): the datatypes of the reachable flags and fields, and the datatypes they are
+            derived from, in the order of MetaSchemaSet.datatypes
+    """
+
+    __slots__ = ("roots", "nodes", "datatypes", "_ids")
+
+    roots: list[DefinitionNode]
+    nodes: list[DefinitionNode]
+    datatypes: list[DataType]
+    _ids: set[int]
+
+    def __contains__(self, node: DefinitionNode) -> bool:
+        return id(node) in self._ids
+
+    @property
+    def schemas(self) -> set[str]:
+        """
+        The files of the metaschemas with a reachable top-level definition.
+        """
+        return {node.schema for node in self.nodes if not node.inline}
+
+
+class DefinitionGraphException(Exception):
+    pass
+
+
+@dataclasses.dataclass(frozen=True)
+class UnresolvedReference:
+    """
+    A reference to a definition that isn't visible from the metaschema with the reference.
+    """
+
+    schema: str
+    kind: str
+    ref: str
+
+
+class DefinitionGraph:
+    """
+    The definitions of a metaschema set, with every reference resolved.
+
+    Attributes:
+        symbols (SymbolTable): the symbol table the references were resolved with
+        datatypes (list[DataType]): the datatypes of the metaschema set
+        datatype_classes (dict[str, str]): the class of each datatype, by the pythonized datatype name
+        modules (dict[str, list[DefinitionNode]]): the top-level definitions of each metaschema, by file, flags first,
+            then fields, then assemblies
+        unresolved (list[UnresolvedReference]): the references that could not be resolved, which have no edge
+    """
+
+    def __init__(self, metaschema_set: MetaSchemaSet) -> None:
+        """
+        Resolves the definitions of a metaschema set. Usually accessed through MetaSchemaSet.graph, so that it is
+        built once and shared.
+
+        Args:
+            metaschema_set (MetaSchemaSet): the parsed metaschemas
+        """
+        self.symbols: SymbolTable = metaschema_set.symbols
+        self.datatypes: list[DataType] = metaschema_set.datatypes
+        self.datatype_classes: dict[str, str] = {
+            pythonize_name(datatype.ref_name): pythonize_name(datatype.name)
+            for datatype in metaschema_set.datatypes
+            if datatype.ref_name is not None
+        }
+        self.modules: dict[str, list[DefinitionNode]] = {}
+        self.unresolved: list[UnresolvedReference] = []
+        self._nodes: dict[int, DefinitionNode] = {}
+
+        # Create the nodes of the top-level definitions first, so that references resolve regardless of order
+        metaschemas = metaschema_set.metaschema_list()
+        for metaschema in metaschemas:
+            module_name = pythonize_name(metaschema.short_name)
+            self.modules[metaschema.file] = [
+                self._add_node(definition, metaschema.file, module_name, inline=False)
+                for definition in metaschema.definitions or []
+            ]
+
+        for metaschema in metaschemas:
+            for node in self.modules[metaschema.file]:
+                self._resolve(node)
+
+        for reference in self.unresolved:
+            logging.warning(
+                f"{reference.schema}: {reference.kind} {reference.ref} is not defined"
+            )
+
+    def node(self, definition: Definition) -> DefinitionNode:
+        """
+        Returns the node of a top-level or inline definition.
+        """
+        return self._nodes[id(definition)]
+
+    def root_names(self) -> dict[str, DefinitionNode]:
+        """
+        Returns the assemblies that can be the root of a document, by root name.
+        """
+        return {
+            typing.cast(str, node.definition.root_name): node
+            for module in self.modules.values()
+            for node in module
+            if isinstance(node.definition, AssemblyDefinition)
+            and node.definition.root_name is not None
+        }
+
+    def reachable(self, root_names: list[str]) -> Reachable:
+        """
+        Returns the definitions reachable from root assemblies through their flags and models, and the datatypes
+        they use. Code generated for just these can read and write documents with the selected roots.
+
+        Args:
+            root_names (list[str]): the root names of the assemblies, e.g. ["catalog", "profile"]
+        """
+        roots = self.root_names()
+        unknown = [name for name in root_names if name not in roots]
+        if len(unknown) > 0:
+            raise DefinitionGraphException(
+                f"{', '.join(unknown)} is not a root assembly, the roots are {', '.join(sorted(roots))}"
+            )
+
+        ids: set[int] = set()
+        nodes: list[DefinitionNode] = []
+        pending = [roots[name] for name in root_names]
+        while len(pending) > 0:
+            node = pending.pop()
+            if id(node) in ids:
+                continue
+            ids.add(id(node))
+            nodes.append(node)
+            pending.extend(edge.target for edge in node.instances())
+
+        # A datatype can be derived from another, whose class has to be generated too
+        by_name = {
+            pythonize_name(datatype.name): datatype for datatype in self.datatypes
+        }
+        datatype_names: set[str] = set()
+        pending_names = [
+            node.datatype_class for node in nodes if node.datatype_class is not None
+        ]
+        while len(pending_names) > 0:
+            name = pending_names.pop()
+            if name in datatype_names or name not in by_name:
+                continue
+            datatype_names.add(name)
+            base_type = getattr(by_name[name], "base_type", None)
+            if base_type is not None:
+                pending_names.append(pythonize_name(base_type))
+
+        return Reachable(
+            roots=[roots[name] for name in root_names],
+            nodes=nodes,
+            datatypes=[
+                datatype
+                for datatype in self.datatypes
+                if pythonize_name(datatype.name) in datatype_names
+            ],
+            _ids=ids,
+        )
+
+    def nodes(self) -> list[DefinitionNode]:
+        """
+        Returns the nodes of every definition, the top-level ones and then the inline ones.
+        """
+        return list(self._nodes.values())
+
+    def _add_node(
+        self, definition: Definition, schema: str, module_name: str, inline: bool
+    ) -> DefinitionNode:
+        datatype_class = None
+        if isinstance(definition, (FlagDefinition, FieldDefinition)):
+            datatype_class = self.datatype_classes.get(
+                pythonize_name(definition.as_type)
+            )
+
+        node = DefinitionNode(
+            kind=DEFINITION_KINDS[type(definition)],
+            definition=definition,
+            schema=schema,
+            module_name=module_name,
+            inline=inline,
+            datatype_class=datatype_class,
+            flags=[],
+            model=[],
+        )
+        self._nodes[id(definition)] = node
+        return node
+
+    def _resolve(self, node: DefinitionNode) -> None:
+        """
+        Adds the edges of a node's flags and model, creating and resolving the nodes of inline definitions.
+        """
+        definition = node.definition
+        if isinstance(definition, (FieldDefinition, AssemblyDefinition)):
+            for flag in definition.flags:
+                edge = self._edge(node, flag)
+                if edge is not None:
+                    node.flags.append(edge)
+
+        if isinstance(definition, AssemblyDefinition):
+            for instance in definition.model:
+                if isinstance(instance, Choice):
+                    node.model.append(
+                        ChoiceEdge(
+                            instances=[
+                                edge
+                                for edge in (
+                                    self._edge(node, choice_instance)
+                                    for choice_instance in instance.instances
+                                )
+                                if edge is not None
+                            ]
+                        )
+                    )
+                else:
+                    edge = self._edge(node, instance)
+                    if edge is not None:
+                        node.model.append(edge)
+
+    def _edge(
+        self,
+        parent: DefinitionNode,
+        instance: FlagReference | FlagDefinition | ModelInstance,
+    ) -> InstanceEdge | None:
+        if isinstance(instance, (FlagReference, InstanceReference)):
+            kind = "flag" if isinstance(instance, FlagReference) else instance.kind
+            symbol = self.symbols.resolve(parent.schema, kind, instance.ref)
+            if symbol is None:
+                self.unresolved.append(
+                    UnresolvedReference(
+                        schema=parent.schema, kind=kind, ref=instance.ref
+                    )
+                )
+                return None
+            target = self._nodes[id(symbol.definition)]
+            use_name = instance.use_name
+        else:
+            definition = typing.cast(Definition, instance)
+            target = self._add_node(
+                definition, parent.schema, parent.module_name, inline=True
+            )
+            self._resolve(target)
+            use_name = None
+
+        effective_name = (
+            use_name if use_name is not None else target.definition.effective_name
+        )
+
+        if isinstance(instance, (FlagReference, FlagDefinition)):
+            required = instance.required
+            min_occurs, max_occurs, multiple, group_as = int(required), 1, False, None
+        else:
+            model_instance = typing.cast(InstanceReference, instance)
+            required = model_instance.required
+            min_occurs = model_instance.min_occurs
+            max_occurs = model_instance.max_occurs
+            multiple = model_instance.multiple
+            group_as = model_instance.group_as
+
+        return InstanceEdge(
+            instance=typing.cast(
+                typing.Union[FlagReference, InstanceReference, Definition], instance
+            ),
+            target=target,
+            effective_name=effective_name,
+            python_name=pythonize_name(effective_name),
+            json_key=(
+                group_as.name if multiple and group_as is not None else effective_name
+            ),
+            min_occurs=min_occurs,
+            max_occurs=max_occurs,
+            required=required,
+            multiple=multiple,
+            group_as=group_as,
+        )
@@ -0,0 +1,90 @@
+"""
+The layout module decides the attributes of the objects of the flag, field and assembly classes of a metaschema.
+
+The code generator writes the layout into the generated classes, and the runtime bindings give it to the classes
+they create, so an object has the same attributes whichever way its class was made. The base classes read the
+optional and grouped attributes of a class to fill in their defaults.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import typing
+
+# The class attributes of the base classes, generated classes and binding classes, which no attribute of an object
+# may shadow. A slot can't have the name of a class attribute.
+_CLASS_ATTRIBUTES = frozenset(
+    [
+        "name",
+        "type",
+        "constraints",
+        "instances",
+        "choices",
+        "root_name",
+        "OPTIONAL_ATTRIBUTES",
+        "GROUPED_ATTRIBUTES",
+    ]
+)
+
+
+@dataclasses.dataclass
+class AttributeLayout:
+    """
+    The attributes of the objects of a flag, field or assembly class.
+
+    Attributes:
+        attributes (list[str]): the attribute of each flag, field and assembly instance, in order
+        slots (tuple[str, ...]): every attribute, for __slots__: "value" first for a flag or field, then the
+            attributes of the instances
+        optional (tuple[str, ...]): the attributes of the optional instances that occur at most once, which default
+            to None
+        grouped (tuple[str, ...]): the attributes of the instances that can occur more than once, which hold a list
+            and default to an empty one
+    """
+
+    __slots__ = ("attributes", "slots", "optional", "grouped")
+
+    attributes: list[str]
+    slots: tuple[str, ...]
+    optional: tuple[str, ...]
+    grouped: tuple[str, ...]
+
+
+def attribute_layout(
+    kind: str, instances: typing.Iterable[tuple[str, bool, bool]]
+) -> AttributeLayout:
+    """
+    Returns the attributes of the objects of a flag, field or assembly class. The attribute of an instance is its
+    python name, with a "_" appended while it is taken, e.g. by "value" or a class attribute such as "name".
+
+    Args:
+        kind (str): "flag", "field" or "assembly"
+        instances (typing.Iterable[tuple[str, bool, bool]]): the python name of each flag, field and assembly
+            instance, whether it is required and whether it can occur more than once
+    """
+    taken = set(_CLASS_ATTRIBUTES)
+    slots = []
+    if kind != "assembly":
+        taken.add("value")
+        slots.append("value")
+
+    attributes = []
+    optional = []
+    grouped = []
+    for python_name, required, multiple in instances:
+        attribute = python_name
+        while attribute in taken:
+            attribute += "_"
+        taken.add(attribute)
+        attributes.append(attribute)
+        if multiple:
+            grouped.append(attribute)
+        elif not required:
+            optional.append(attribute)
+
+    return AttributeLayout(
+        attributes=attributes,
+        slots=(*slots, *attributes),
+        optional=tuple(optional),
+        grouped=tuple(grouped),
+    )
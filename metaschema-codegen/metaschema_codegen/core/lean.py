@@ -0,0 +1,138 @@
+"""
+The lean module makes a parsed schema_dict smaller, for parses that don't need the documentation.
+
+Descriptions, remarks and examples are markup subtrees that make up most of a schema_dict, but code generation for a
+runtime package doesn't use them. In lean mode they are replaced by DocumentationRefs, which record where the
+documentation is (the file, the line of the element and its path in the schema_dict) so it can be reloaded on demand.
+The strings that remain (names, namespaces, datatypes and the keys of every dict) repeat across definitions and
+metaschemas, and are interned so that each is stored once.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import sys
+import typing
+from pathlib import Path
+
+import xmlschema
+from lxml import etree
+
+if typing.TYPE_CHECKING:
+    from .extract import ElementExtractor
+
+# The elements whose contents are documentation
+DOCUMENTATION_KEYS = frozenset({"description", "remarks", "example"})
+
+
+@dataclasses.dataclass(frozen=True)
+class DocumentationRef:
+    """
+    Stands in for documentation that was left out of a lean schema_dict.
+
+    A DocumentationRef is falsy, so code that checks for documentation (e.g. the templates) treats it as absent.
+
+    Attributes:
+        file (str): the metaschema file the documentation is in
+        line (int | None): the line of the (first) documentation element in the file
+        path (tuple[str | int, ...]): the keys and list indexes from the schema_dict to the documentation
+    """
+
+    file: str
+    line: int | None
+    path: tuple[str | int, ...]
+
+    def __bool__(self) -> bool:
+        return False
+
+    def load(
+        self,
+        schema_xsd: xmlschema.XMLSchema,
+        extractor: ElementExtractor | None = None,
+    ) -> typing.Any:
+        """
+        Reloads the documentation from the file, decoded as it would be in a full schema_dict.
+
+        Args:
+            schema_xsd (xmlschema.XMLSchema): the compiled metaschema xsd
+            extractor (ElementExtractor | None, optional): decodes the file instead of schema_xsd.to_dict()
+        """
+        metaschema_etree = etree.parse(
+            self.file, parser=etree.XMLParser(resolve_entities=True)
+        )
+        if extractor is not None:
+            value: typing.Any = extractor.extract(metaschema_etree)
+        else:
+            value = schema_xsd.to_dict(
+                typing.cast(xmlschema.XMLResource, metaschema_etree)
+            )
+        for key in self.path:
+            value = value[key]
+        return value
+
+
+def make_lean(
+    schema_dict: dict, metaschema_etree: etree._ElementTree, file: Path
+) -> dict:
+    """
+    Returns a lean copy of a schema_dict: documentation is replaced by DocumentationRefs and strings are interned.
+
+    Args:
+        schema_dict (dict): the schema_dict decoded from the etree
+        metaschema_etree (etree._ElementTree): the tree the schema_dict was decoded from, for the line numbers
+        file (Path): the metaschema file
+    """
+    return _make_lean(schema_dict, metaschema_etree.getroot(), str(file), ())
+
+
+def _make_lean(
+    value: typing.Any,
+    element: etree._Element | None,
+    file: str,
+    path: tuple[str | int, ...],
+) -> typing.Any:
+    if type(value) is str:
+        return sys.intern(value)
+
+    if isinstance(value, list):
+        return [_make_lean(item, element, file, path) for item in value]
+
+    if not isinstance(value, dict):
+        return value
+
+    # The elements of a dict are decoded from the children with the same name, repeated ones into a list in order
+    children: dict[str, list[etree._Element]] = {}
+    if element is not None:
+        for child in element.iterchildren(tag=etree.Element):
+            children.setdefault(etree.QName(child).localname, []).append(child)
+
+    lean: dict = {}
+    for key, item in value.items():
+        key_path = (*path, key)
+        named_children = children.get(key, [])
+
+        if key in DOCUMENTATION_KEYS:
+            lean[sys.intern(key)] = DocumentationRef(
+                file=file,
+                line=named_children[0].sourceline if len(named_children) > 0 else None,
+                path=key_path,
+            )
+        elif isinstance(item, list):
+            lean[sys.intern(key)] = [
+                _make_lean(
+                    list_item,
+                    named_children[index] if index < len(named_children) else None,
+                    file,
+                    (*key_path, index),
+                )
+                for index, list_item in enumerate(item)
+            ]
+        else:
+            lean[sys.intern(key)] = _make_lean(
+                item,
+                named_children[0] if len(named_children) > 0 else None,
+                file,
+                key_path,
+            )
+
+    return lean
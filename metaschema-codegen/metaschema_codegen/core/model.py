@@ -0,0 +1,778 @@
+"""
+The model module provides a typed object model for the definitions in a parsed metaschema.
+
+The parser decodes each metaschema into a schema_dict, with "@"-prefixed attribute keys, metaschema defaults filled in
+and lists or single values depending on the xsd. The classes in this module are built from a schema_dict once, when a
+metaschema is parsed, so that consumers such as the code generators read attributes instead of string keys. Names
+(the effective name, and the python names of the property and the class) and cardinalities are calculated once here.
+
+The classes use __slots__, since a large metaschema set holds tens of thousands of these objects. Because slots and
+dataclass defaults don't mix, every attribute is passed to the initializer, which is normally done by from_dict().
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import typing
+
+
+def pythonize_name(name: str) -> str:
+    """
+    Returns the name of the class or variable for a defined assembly, field or flag in a module.
+    Makes the name python safe by stripping spaces and converts dashes to underscores.
+    This is provided to ensure consistent names when translating from fields to anything else.
+    """
+    # Some variables have a leading "@" which we don't want
+    name = name.removeprefix("@")
+    # Strip spaces, convert dashes to underscores
+    return f'{name.replace(" ", "").replace("-","_")}'
+
+
+def _text(value: typing.Any) -> typing.Any:
+    """
+    Returns the text of a simple element. An element with attributes is decoded as a dict with the text under "$".
+    """
+    if isinstance(value, dict):
+        return value.get("$")
+    return value
+
+
+def _as_list(value: typing.Any) -> list:
+    """
+    Returns a list for an element that may be decoded as a single value or a list, depending on the xsd.
+    """
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return value
+    return [value]
+
+
+def _occurs(value: typing.Any, default: int | None) -> int | None:
+    """
+    Returns an occurrence count, with None for "unbounded".
+    """
+    if value is None:
+        return default
+    if value == "unbounded":
+        return None
+    return int(value)
+
+
+#
+# Supporting classes
+#
+
+
+@dataclasses.dataclass
+class Prop:
+    """
+    A property (prop) of a definition.
+    """
+
+    __slots__ = ("name", "value", "namespace")
+
+    name: str
+    value: str
+    namespace: str | None
+
+    @classmethod
+    def from_dict(cls, prop_dict: dict) -> Prop:
+        return cls(
+            name=prop_dict["@name"],
+            value=prop_dict["@value"],
+            namespace=prop_dict.get("@namespace"),
+        )
+
+
+@dataclasses.dataclass
+class GroupAs:
+    """
+    How the instances of a repeatable field or assembly are grouped (group-as).
+
+    Attributes:
+        name (str): the name of the group
+        in_json (str): ARRAY, SINGLETON_OR_ARRAY or BY_KEY
+        in_xml (str): GROUPED or UNGROUPED
+        python_name (str): the name of the python property for the group
+    """
+
+    __slots__ = ("name", "in_json", "in_xml", "python_name")
+
+    name: str
+    in_json: str
+    in_xml: str
+    python_name: str
+
+    @classmethod
+    def from_dict(cls, group_as_dict: dict) -> GroupAs:
+        return cls(
+            name=group_as_dict["@name"],
+            in_json=group_as_dict.get("@in-json", "SINGLETON_OR_ARRAY"),
+            in_xml=group_as_dict.get("@in-xml", "UNGROUPED"),
+            python_name=pythonize_name(group_as_dict["@name"]),
+        )
+
+
+@dataclasses.dataclass
+class KeyField:
+    """
+    A key-field of an index, index-has-key or is-unique constraint.
+    """
+
+    __slots__ = ("target", "pattern")
+
+    target: str
+    pattern: str | None
+
+    @classmethod
+    def from_dict(cls, key_field_dict: dict) -> KeyField:
+        return cls(
+            target=key_field_dict["@target"], pattern=key_field_dict.get("@pattern")
+        )
+
+
+@dataclasses.dataclass
+class AllowedValue:
+    """
+    An enum of an allowed-values constraint. The description is markup, as parsed.
+    """
+
+    __slots__ = ("value", "deprecated", "description")
+
+    value: str
+    deprecated: str | None
+    description: typing.Any
+
+    @classmethod
+    def from_dict(cls, enum_dict: dict) -> AllowedValue:
+        if "$" in enum_dict:
+            description = enum_dict["$"]
+        else:
+            description = {
+                key: value for key, value in enum_dict.items() if key[0] != "@"
+            } or None
+
+        return cls(
+            value=enum_dict["@value"],
+            deprecated=enum_dict.get("@deprecated"),
+            description=description,
+        )
+
+
+#
+# Constraints
+#
+
+
+@dataclasses.dataclass
+class Constraint:
+    """
+    A constraint on a definition. Constraint types that don't have their own class are represented by this class.
+
+    Attributes:
+        kind (str): the constraint type as named in metaschema, e.g. "allowed-values"
+        id (str | None): the id of the constraint
+        level (str): the severity of a violation, e.g. "ERROR"
+        target (str): a metapath selecting the nodes the constraint applies to
+        description: markup, as parsed
+        remarks: markup, as parsed
+    """
+
+    __slots__ = ("kind", "id", "level", "target", "description", "remarks")
+
+    kind: str
+    id: str | None
+    level: str
+    target: str
+    description: typing.Any
+    remarks: typing.Any
+
+    @staticmethod
+    def _common(kind: str, constraint_dict: dict) -> dict[str, typing.Any]:
+        return {
+            "kind": kind,
+            "id": constraint_dict.get("@id"),
+            "level": constraint_dict.get("@level", "ERROR"),
+            "target": constraint_dict.get("@target", "."),
+            "description": constraint_dict.get("description"),
+            "remarks": constraint_dict.get("remarks"),
+        }
+
+    @classmethod
+    def from_dict(cls, kind: str, constraint_dict: dict) -> Constraint:
+        return cls(**cls._common(kind, constraint_dict))
+
+
+@dataclasses.dataclass
+class AllowedValuesConstraint(Constraint):
+    __slots__ = ("allow_other", "extensible", "values")
+
+    allow_other: bool
+    extensible: str
+    values: list[AllowedValue]
+
+    @classmethod
+    def from_dict(cls, kind: str, constraint_dict: dict) -> AllowedValuesConstraint:
+        return cls(
+            **cls._common(kind, constraint_dict),
+            allow_other=constraint_dict.get("@allow-other", "no") == "yes",
+            extensible=constraint_dict.get("@extensible", "model"),
+            values=[
+                AllowedValue.from_dict(enum)
+                for enum in _as_list(constraint_dict.get("enum"))
+            ],
+        )
+
+
+@dataclasses.dataclass
+class ExpectConstraint(Constraint):
+    __slots__ = ("test", "message")
+
+    test: str
+    message: str | None
+
+    @classmethod
+    def from_dict(cls, kind: str, constraint_dict: dict) -> ExpectConstraint:
+        return cls(
+            **cls._common(kind, constraint_dict),
+            test=constraint_dict["@test"],
+            message=_text(constraint_dict.get("message")),
+        )
+
+
+@dataclasses.dataclass
+class MatchesConstraint(Constraint):
+    __slots__ = ("datatype", "regex")
+
+    datatype: str | None
+    regex: str | None
+
+    @classmethod
+    def from_dict(cls, kind: str, constraint_dict: dict) -> MatchesConstraint:
+        return cls(
+            **cls._common(kind, constraint_dict),
+            datatype=constraint_dict.get("@datatype"),
+            regex=constraint_dict.get("@regex"),
+        )
+
+
+@dataclasses.dataclass
+class IndexConstraint(Constraint):
+    """
+    An index or index-has-key constraint. kind tells them apart.
+    """
+
+    __slots__ = ("name", "key_fields")
+
+    name: str
+    key_fields: list[KeyField]
+
+    @classmethod
+    def from_dict(cls, kind: str, constraint_dict: dict) -> IndexConstraint:
+        return cls(
+            **cls._common(kind, constraint_dict),
+            name=constraint_dict["@name"],
+            key_fields=[
+                KeyField.from_dict(key_field)
+                for key_field in _as_list(constraint_dict.get("key-field"))
+            ],
+        )
+
+
+@dataclasses.dataclass
+class IsUniqueConstraint(Constraint):
+    __slots__ = ("key_fields",)
+
+    key_fields: list[KeyField]
+
+    @classmethod
+    def from_dict(cls, kind: str, constraint_dict: dict) -> IsUniqueConstraint:
+        return cls(
+            **cls._common(kind, constraint_dict),
+            key_fields=[
+                KeyField.from_dict(key_field)
+                for key_field in _as_list(constraint_dict.get("key-field"))
+            ],
+        )
+
+
+@dataclasses.dataclass
+class HasCardinalityConstraint(Constraint):
+    __slots__ = ("min_occurs", "max_occurs")
+
+    min_occurs: int
+    max_occurs: int | None
+
+    @classmethod
+    def from_dict(cls, kind: str, constraint_dict: dict) -> HasCardinalityConstraint:
+        return cls(
+            **cls._common(kind, constraint_dict),
+            min_occurs=typing.cast(int, _occurs(constraint_dict.get("@min-occurs"), 0)),
+            max_occurs=_occurs(constraint_dict.get("@max-occurs"), None),
+        )
+
+
+CONSTRAINT_CLASSES: dict[str, type[Constraint]] = {
+    "allowed-values": AllowedValuesConstraint,
+    "expect": ExpectConstraint,
+    "matches": MatchesConstraint,
+    "index": IndexConstraint,
+    "index-has-key": IndexConstraint,
+    "is-unique": IsUniqueConstraint,
+    "has-cardinality": HasCardinalityConstraint,
+}
+
+
+def parse_constraints(constraint_dict: dict | None) -> list[Constraint]:
+    """
+    Returns the constraints in the "constraint" element of a definition, grouped by type in the order the types
+    first appear.
+    """
+    constraints: list[Constraint] = []
+    for kind, constraints_of_kind in (constraint_dict or {}).items():
+        if kind[0] == "@":
+            continue
+        constraint_class = CONSTRAINT_CLASSES.get(kind, Constraint)
+        for constraint in _as_list(constraints_of_kind):
+            constraints.append(constraint_class.from_dict(kind, constraint))
+
+    return constraints
+
+
+#
+# Definitions
+#
+
+
+@dataclasses.dataclass
+class Definition:
+    """
+    The attributes common to flag, field and assembly definitions.
+
+    Attributes:
+        name (str): the name of the definition
+        formal_name (str | None): the formal name of the definition
+        description: markup, as parsed
+        remarks: markup, as parsed
+        props (list[Prop]): the properties of the definition
+        deprecated (str | None): the version the definition was deprecated in
+        scope (str): "global" if the definition can be referenced from other metaschemas, otherwise "local"
+        use_name (str | None): the name used in instances, if it differs from the name
+        effective_name (str): the name used in instances, the use_name or else the name
+        python_name (str): the name of the python property for the definition (the pythonized effective name)
+        class_name (str): the name of the python class for the definition (the pythonized formal name)
+        constraints (list[Constraint]): the constraints of the definition
+    """
+
+    __slots__ = (
+        "name",
+        "formal_name",
+        "description",
+        "remarks",
+        "props",
+        "deprecated",
+        "scope",
+        "use_name",
+        "effective_name",
+        "python_name",
+        "class_name",
+        "constraints",
+    )
+
+    name: str
+    formal_name: str | None
+    description: typing.Any
+    remarks: typing.Any
+    props: list[Prop]
+    deprecated: str | None
+    scope: str
+    use_name: str | None
+    effective_name: str
+    python_name: str
+    class_name: str
+    constraints: list[Constraint]
+
+    @staticmethod
+    def _common(definition_dict: dict, inline: bool) -> dict[str, typing.Any]:
+        name = definition_dict["@name"]
+        formal_name = definition_dict.get("formal-name")
+        use_name = _text(definition_dict.get("use-name"))
+        effective_name = use_name if use_name is not None else name
+
+        return {
+            "name": name,
+            "formal_name": formal_name,
+            "description": definition_dict.get("description"),
+            "remarks": definition_dict.get("remarks"),
+            "props": [
+                Prop.from_dict(prop) for prop in _as_list(definition_dict.get("prop"))
+            ],
+            "deprecated": definition_dict.get("@deprecated"),
+            # Inline definitions can't be referenced, so they are always local
+            "scope": "local" if inline else definition_dict.get("@scope", "global"),
+            "use_name": use_name,
+            "effective_name": effective_name,
+            "python_name": pythonize_name(effective_name),
+            "class_name": pythonize_name(
+                formal_name if formal_name is not None else name
+            ),
+            "constraints": parse_constraints(definition_dict.get("constraint")),
+        }
+
+
+@dataclasses.dataclass
+class FlagDefinition(Definition):
+    """
+    A flag definition (define-flag).
+
+    Attributes:
+        as_type (str): the metaschema datatype of the flag, e.g. "token"
+        default (str | None): the default value of the flag
+        required (bool): whether the flag is required, for an inline definition
+    """
+
+    __slots__ = ("as_type", "default", "required")
+
+    as_type: str
+    default: str | None
+    required: bool
+
+    @classmethod
+    def from_dict(cls, flag_dict: dict, inline: bool = False) -> FlagDefinition:
+        return cls(
+            **cls._common(flag_dict, inline),
+            as_type=flag_dict.get("@as-type", "string"),
+            default=flag_dict.get("@default"),
+            required=flag_dict.get("@required", "no") == "yes",
+        )
+
+
+@dataclasses.dataclass
+class FlagReference:
+    """
+    A reference to a flag definition (flag).
+
+    Attributes:
+        ref (str): the name of the referenced definition
+        use_name (str | None): the name used for this instance, if it differs from the name of the definition
+        python_name (str): the name of the python property for the instance
+        required (bool): whether the flag is required
+    """
+
+    __slots__ = (
+        "ref",
+        "formal_name",
+        "description",
+        "remarks",
+        "deprecated",
+        "use_name",
+        "python_name",
+        "required",
+    )
+
+    ref: str
+    formal_name: str | None
+    description: typing.Any
+    remarks: typing.Any
+    deprecated: str | None
+    use_name: str | None
+    python_name: str
+    required: bool
+
+    @classmethod
+    def from_dict(cls, flag_dict: dict) -> FlagReference:
+        use_name = _text(flag_dict.get("use-name"))
+        return cls(
+            ref=flag_dict["@ref"],
+            formal_name=flag_dict.get("formal-name"),
+            description=flag_dict.get("description"),
+            remarks=flag_dict.get("remarks"),
+            deprecated=flag_dict.get("@deprecated"),
+            use_name=use_name,
+            python_name=pythonize_name(
+                use_name if use_name is not None else flag_dict["@ref"]
+            ),
+            required=flag_dict.get("@required", "no") == "yes",
+        )
+
+
+class ModelInstance:
+    """
+    A field or assembly instance in a model: a reference or an inline definition. The subclasses declare the
+    cardinality attributes, since only one base class of a slotted class can have slots.
+
+    Attributes:
+        min_occurs (int): the minimum number of occurrences
+        max_occurs (int | None): the maximum number of occurrences, None if unbounded
+        required (bool): whether at least one occurrence is required
+        multiple (bool): whether more than one occurrence is allowed
+        group_as (GroupAs | None): how multiple occurrences are grouped
+    """
+
+    __slots__ = ()
+
+    @staticmethod
+    def _cardinality(instance_dict: dict) -> dict[str, typing.Any]:
+        min_occurs = typing.cast(int, _occurs(instance_dict.get("@min-occurs"), 0))
+        max_occurs = _occurs(instance_dict.get("@max-occurs"), 1)
+        group_as = instance_dict.get("group-as")
+
+        return {
+            "min_occurs": min_occurs,
+            "max_occurs": max_occurs,
+            "required": min_occurs > 0,
+            "multiple": max_occurs is None or max_occurs > 1,
+            "group_as": GroupAs.from_dict(group_as) if group_as is not None else None,
+        }
+
+
+_CARDINALITY_SLOTS = ("min_occurs", "max_occurs", "required", "multiple", "group_as")
+
+
+@dataclasses.dataclass
+class InstanceReference(ModelInstance):
+    """
+    A reference to a field (field) or assembly (assembly) definition in a model.
+
+    Attributes:
+        kind (str): "field" or "assembly"
+        ref (str): the name of the referenced definition
+        use_name (str | None): the name used for this instance, if it differs from the name of the definition
+        python_name (str): the name of the python property for the instance
+        in_xml (str | None): how a field instance is represented in XML, e.g. "WRAPPED"
+    """
+
+    __slots__ = (
+        "kind",
+        "ref",
+        "formal_name",
+        "description",
+        "remarks",
+        "deprecated",
+        "use_name",
+        "python_name",
+        "in_xml",
+    ) + _CARDINALITY_SLOTS
+
+    kind: str
+    ref: str
+    formal_name: str | None
+    description: typing.Any
+    remarks: typing.Any
+    deprecated: str | None
+    use_name: str | None
+    python_name: str
+    in_xml: str | None
+    min_occurs: int
+    max_occurs: int | None
+    required: bool
+    multiple: bool
+    group_as: GroupAs | None
+
+    @classmethod
+    def from_dict(cls, kind: str, instance_dict: dict) -> InstanceReference:
+        use_name = _text(instance_dict.get("use-name"))
+        return cls(
+            **cls._cardinality(instance_dict),
+            kind=kind,
+            ref=instance_dict["@ref"],
+            formal_name=instance_dict.get("formal-name"),
+            description=instance_dict.get("description"),
+            remarks=instance_dict.get("remarks"),
+            deprecated=instance_dict.get("@deprecated"),
+            use_name=use_name,
+            python_name=pythonize_name(
+                use_name if use_name is not None else instance_dict["@ref"]
+            ),
+            in_xml=instance_dict.get("@in-xml"),
+        )
+
+
+@dataclasses.dataclass
+class Choice:
+    """
+    A choice between instances in a model. Exactly one of the instances may occur.
+    """
+
+    __slots__ = ("instances",)
+
+    instances: list[ModelInstance]
+
+
+@dataclasses.dataclass
+class FieldDefinition(Definition, ModelInstance):
+    """
+    A field definition (define-field). The cardinality and group_as only apply to an inline definition.
+
+    Attributes:
+        as_type (str): the metaschema datatype of the field value, e.g. "markup-line"
+        default (str | None): the default value of the field
+        collapsible (bool): whether fields with the same flag values can be collapsed in JSON
+        in_xml (str | None): how an inline field is represented in XML, e.g. "WRAPPED"
+        json_value_key (str | None): the JSON property name of the value
+        json_value_key_flag (str | None): the flag whose value is the JSON property name of the value
+        flags (list[FlagDefinition | FlagReference]): the flags of the field
+    """
+
+    __slots__ = (
+        "as_type",
+        "default",
+        "collapsible",
+        "in_xml",
+        "json_value_key",
+        "json_value_key_flag",
+        "flags",
+    ) + _CARDINALITY_SLOTS
+
+    as_type: str
+    default: str | None
+    collapsible: bool
+    in_xml: str | None
+    json_value_key: str | None
+    json_value_key_flag: str | None
+    flags: list[FlagDefinition | FlagReference]
+    min_occurs: int
+    max_occurs: int | None
+    required: bool
+    multiple: bool
+    group_as: GroupAs | None
+
+    @classmethod
+    def from_dict(cls, field_dict: dict, inline: bool = False) -> FieldDefinition:
+        json_value_key_flag = field_dict.get("json-value-key-flag")
+        return cls(
+            **cls._common(field_dict, inline),
+            **cls._cardinality(field_dict),
+            as_type=field_dict.get("@as-type", "string"),
+            default=field_dict.get("@default"),
+            collapsible=field_dict.get("@collapsible", "no") == "yes",
+            in_xml=field_dict.get("@in-xml"),
+            json_value_key=_text(field_dict.get("json-value-key")),
+            json_value_key_flag=(
+                json_value_key_flag.get("@flag-ref")
+                if isinstance(json_value_key_flag, dict)
+                else None
+            ),
+            flags=_flags(field_dict),
+        )
+
+
+@dataclasses.dataclass
+class AssemblyDefinition(Definition, ModelInstance):
+    """
+    An assembly definition (define-assembly). The cardinality and group_as only apply to an inline definition.
+
+    Attributes:
+        root_name (str | None): the name of the assembly when it is the root of a document
+        flags (list[FlagDefinition | FlagReference]): the flags of the assembly
+        model (list[ModelInstance | Choice]): the fields and assemblies the assembly contains
+    """
+
+    __slots__ = ("root_name", "flags", "model") + _CARDINALITY_SLOTS
+
+    root_name: str | None
+    flags: list[FlagDefinition | FlagReference]
+    model: list[ModelInstance | Choice]
+    min_occurs: int
+    max_occurs: int | None
+    required: bool
+    multiple: bool
+    group_as: GroupAs | None
+
+    @classmethod
+    def from_dict(cls, assembly_dict: dict, inline: bool = False) -> AssemblyDefinition:
+        return cls(
+            **cls._common(assembly_dict, inline),
+            **cls._cardinality(assembly_dict),
+            root_name=_text(assembly_dict.get("root-name")),
+            flags=_flags(assembly_dict),
+            model=_model(assembly_dict.get("model")),
+        )
+
+
+def _flags(definition_dict: dict) -> list[FlagDefinition | FlagReference]:
+    """
+    Returns the flag references and inline flag definitions of a field or assembly.
+    """
+    flags: list[FlagDefinition | FlagReference] = []
+    for key, value in definition_dict.items():
+        if key == "flag":
+            flags.extend(FlagReference.from_dict(flag) for flag in _as_list(value))
+        elif key == "define-flag":
+            flags.extend(
+                FlagDefinition.from_dict(flag, inline=True) for flag in _as_list(value)
+            )
+
+    return flags
+
+
+def _model(model_dict: dict | None) -> list[ModelInstance | Choice]:
+    """
+    Returns the instances in a model (or a choice). The schema_dict groups the instances by type, so the instances
+    are in the order of their types, and in document order within a type.
+    """
+    instances: list[ModelInstance | Choice] = []
+    for key, value in (model_dict or {}).items():
+        if key in ("field", "assembly"):
+            instances.extend(
+                InstanceReference.from_dict(key, instance)
+                for instance in _as_list(value)
+            )
+        elif key == "define-field":
+            instances.extend(
+                FieldDefinition.from_dict(field, inline=True)
+                for field in _as_list(value)
+            )
+        elif key == "define-assembly":
+            instances.extend(
+                AssemblyDefinition.from_dict(assembly, inline=True)
+                for assembly in _as_list(value)
+            )
+        elif key == "choice":
+            instances.extend(
+                Choice(instances=typing.cast(list[ModelInstance], _model(choice)))
+                for choice in _as_list(value)
+            )
+
+    return instances
+
+
+@dataclasses.dataclass
+class MetaschemaDefinitions:
+    """
+    The top-level definitions of a metaschema, and its schema version.
+    """
+
+    __slots__ = ("schema_version", "assemblies", "fields", "flags")
+
+    schema_version: str | None
+    assemblies: list[AssemblyDefinition]
+    fields: list[FieldDefinition]
+    flags: list[FlagDefinition]
+
+    @classmethod
+    def from_dict(cls, schema_dict: dict) -> MetaschemaDefinitions:
+        return cls(
+            schema_version=schema_dict.get("schema-version"),
+            assemblies=[
+                AssemblyDefinition.from_dict(assembly)
+                for assembly in _as_list(schema_dict.get("define-assembly"))
+            ],
+            fields=[
+                FieldDefinition.from_dict(field)
+                for field in _as_list(schema_dict.get("define-field"))
+            ],
+            flags=[
+                FlagDefinition.from_dict(flag)
+                for flag in _as_list(schema_dict.get("define-flag"))
+            ],
+        )
+
+    def __iter__(self) -> typing.Iterator[Definition]:
+        """
+        Iterates over all of the top-level definitions: flags, then fields, then assemblies.
+        """
+        yield from self.flags
+        yield from self.fields
+        yield from self.assemblies
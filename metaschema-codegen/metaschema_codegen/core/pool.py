@@ -0,0 +1,157 @@
+"""
+The pool module provides a pool of persistent HTTP(S) connections, used to fetch remote files.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import http.client
+import threading
+from email.message import Message
+from urllib import parse
+
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+MAX_REDIRECTS = 5
+
+
+@dataclasses.dataclass
+class HTTPResult:
+    """
+    The response to a GET request. The body is read in full, so the connection can be reused.
+
+    Attributes:
+        url (str): the URL of the response, after any redirects
+        status (int): the HTTP status code
+        headers (Message): the response headers
+        body (bytes): the response body
+    """
+
+    url: str
+    status: int
+    headers: Message
+    body: bytes
+
+
+class ConnectionPool:
+    """
+    A thread-safe pool of persistent HTTP(S) connections, keyed by scheme, host and port.
+
+    A connection is returned to the pool after each request unless the server closes it, so a series of requests to
+    the same server shares a few connections instead of opening one per request. A request on a pooled connection
+    that the server has closed in the meantime is retried once on a new connection.
+    """
+
+    def __init__(self, max_idle_per_host: int = 8, timeout: float = 30) -> None:
+        """
+        Args:
+            max_idle_per_host (int, optional): The number of idle connections kept for each server. Defaults to 8.
+            timeout (float, optional): The socket timeout in seconds. Defaults to 30.
+        """
+        self.max_idle_per_host = max_idle_per_host
+        self.timeout = timeout
+        self._idle: dict[tuple[str, str, int], list[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+        # The number of connections opened, for diagnostics and tests
+        self.connections_opened = 0
+
+    def get(self, url: str, headers: dict[str, str] | None = None) -> HTTPResult:
+        """
+        Sends a GET request and returns the response, following redirects.
+
+        Args:
+            url (str): an http or https URL
+            headers (dict[str, str] | None, optional): request headers
+
+        Raises:
+            OSError, http.client.HTTPException: if the server can't be reached or the response is malformed
+        """
+        for _ in range(MAX_REDIRECTS + 1):
+            result = self._get(url, headers or {})
+            location = result.headers.get("Location")
+            if result.status not in REDIRECT_CODES or location is None:
+                return result
+            url = parse.urljoin(url, location)
+
+        raise http.client.HTTPException(f"Too many redirects fetching {url}")
+
+    def close(self) -> None:
+        """
+        Closes the idle connections.
+        """
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for connection in connections:
+                connection.close()
+
+    def _get(self, url: str, headers: dict[str, str]) -> HTTPResult:
+        url_parts = parse.urlsplit(url)
+        if url_parts.scheme not in ("http", "https") or url_parts.hostname is None:
+            raise http.client.InvalidURL(f"Not an http(s) URL: {url}")
+
+        default_port = 443 if url_parts.scheme == "https" else 80
+        key = (url_parts.scheme, url_parts.hostname, url_parts.port or default_port)
+        path = url_parts.path or "/"
+        if url_parts.query:
+            path = f"{path}?{url_parts.query}"
+
+        connection, reused = self._acquire(key)
+        try:
+            response = self._request(connection, path, headers)
+        except (http.client.HTTPException, OSError):
+            connection.close()
+            if not reused:
+                raise
+            # The server closed an idle connection, try once more on a new one
+            connection, reused = self._new_connection(key), False
+            try:
+                response = self._request(connection, path, headers)
+            except BaseException:
+                connection.close()
+                raise
+
+        status, response_headers, body, will_close = response
+        if will_close:
+            connection.close()
+        else:
+            self._release(key, connection)
+
+        return HTTPResult(url=url, status=status, headers=response_headers, body=body)
+
+    def _request(
+        self,
+        connection: http.client.HTTPConnection,
+        path: str,
+        headers: dict[str, str],
+    ) -> tuple[int, Message, bytes, bool]:
+        connection.request("GET", path, headers=headers)
+        response = connection.getresponse()
+        body = response.read()
+        return response.status, response.headers, body, response.will_close
+
+    def _acquire(
+        self, key: tuple[str, str, int]
+    ) -> tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop(), True
+        return self._new_connection(key), False
+
+    def _release(
+        self, key: tuple[str, str, int], connection: http.client.HTTPConnection
+    ) -> None:
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle_per_host:
+                idle.append(connection)
+                return
+        connection.close()
+
+    def _new_connection(self, key: tuple[str, str, int]) -> http.client.HTTPConnection:
+        scheme, host, port = key
+        with self._lock:
+            self.connections_opened += 1
+        if scheme == "https":
+            return http.client.HTTPSConnection(host, port, timeout=self.timeout)
+        return http.client.HTTPConnection(host, port, timeout=self.timeout)
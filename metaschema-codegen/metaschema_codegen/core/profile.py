@@ -0,0 +1,158 @@
+"""
+The profile module records where the time (and memory) of a metaschema parse goes.
+
+A Profiler collects the wall time of named phases (e.g. compiling the xsd, or parsing the metaschemas), the time
+spent on each file, and the peak memory allocated while it was running. When profiling is disabled the parser uses
+NULL_PROFILER, whose phases are a shared no-op context manager, so the instrumentation costs next to nothing.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import dataclasses
+import time
+import tracemalloc
+import typing
+
+
+@dataclasses.dataclass
+class FileTiming:
+    """
+    The time spent parsing one metaschema file.
+
+    Attributes:
+        file (str): the metaschema file
+        parse_seconds (float): reading the file into an etree
+        decode_seconds (float): decoding the etree into a schema_dict, with to_dict() or an ElementExtractor
+        model_seconds (float): building the definitions, globals and roots from the schema_dict
+    """
+
+    file: str
+    parse_seconds: float = 0.0
+    decode_seconds: float = 0.0
+    model_seconds: float = 0.0
+
+    @property
+    def total_seconds(self) -> float:
+        return self.parse_seconds + self.decode_seconds + self.model_seconds
+
+
+@dataclasses.dataclass
+class ParseReport:
+    """
+    The result of profiling a parse.
+
+    Attributes:
+        phases (dict[str, float]): the wall time of each phase, in the order the phases first ran
+        files (list[FileTiming]): the time spent on each parsed file
+        peak_memory (int | None): the peak memory allocated by python during the parse in bytes, from tracemalloc.
+            None if tracemalloc was already tracing when the parse started, since the peak would not be the parse's.
+            Only the main process is measured.
+    """
+
+    phases: dict[str, float] = dataclasses.field(default_factory=dict)
+    files: list[FileTiming] = dataclasses.field(default_factory=list)
+    peak_memory: int | None = None
+
+    def __str__(self) -> str:
+        lines = ["Phase                          Seconds"]
+        for phase, seconds in self.phases.items():
+            lines.append(f"{phase:<30} {seconds:>7.3f}")
+
+        if len(self.files) > 0:
+            lines.append("")
+            lines.append(
+                "File                                         Parse  Decode   Model   Total"
+            )
+            for file_timing in sorted(
+                self.files, key=lambda timing: timing.total_seconds, reverse=True
+            ):
+                lines.append(
+                    f"{file_timing.file:<42} {file_timing.parse_seconds:>7.3f} "
+                    f"{file_timing.decode_seconds:>7.3f} {file_timing.model_seconds:>7.3f} "
+                    f"{file_timing.total_seconds:>7.3f}"
+                )
+
+        if self.peak_memory is not None:
+            lines.append("")
+            lines.append(f"Peak memory: {self.peak_memory / 2**20:.1f} MiB")
+
+        return "\n".join(lines)
+
+
+class Profiler:
+    """
+    Records the phases and files of a parse into a ParseReport.
+    """
+
+    enabled = True
+
+    def __init__(self, trace_memory: bool = True) -> None:
+        """
+        Args:
+            trace_memory (bool, optional): Whether to trace the peak memory with tracemalloc. Tracing memory slows
+                the parse down considerably, so the timings are less accurate with it. Defaults to True.
+        """
+        self.report = ParseReport()
+        self._owns_tracing = trace_memory and not tracemalloc.is_tracing()
+        if self._owns_tracing:
+            tracemalloc.start()
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> typing.Iterator[None]:
+        """
+        Times a phase. The time of a phase that runs more than once is added up.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.report.phases[name] = (
+                self.report.phases.get(name, 0.0) + time.perf_counter() - start
+            )
+
+    def add_phase(self, name: str, seconds: float) -> None:
+        """
+        Records the time of a phase that was measured elsewhere, e.g. by the schema cache.
+        """
+        self.report.phases[name] = self.report.phases.get(name, 0.0) + seconds
+
+    def add_file(self, file_timing: FileTiming | None) -> None:
+        if file_timing is not None:
+            self.report.files.append(file_timing)
+
+    def stop(self) -> ParseReport:
+        """
+        Stops tracing memory, and returns the report.
+        """
+        if self._owns_tracing:
+            self.report.peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            self._owns_tracing = False
+        return self.report
+
+
+class _NullProfiler(Profiler):
+    """
+    A Profiler that records nothing.
+    """
+
+    enabled = False
+
+    def __init__(self) -> None:
+        self._null_phase = contextlib.nullcontext()
+
+    def phase(self, name: str) -> typing.ContextManager[None]:  # type: ignore[override]
+        return self._null_phase
+
+    def add_phase(self, name: str, seconds: float) -> None:
+        pass
+
+    def add_file(self, file_timing: FileTiming | None) -> None:
+        pass
+
+    def stop(self) -> ParseReport:
+        return ParseReport()
+
+
+NULL_PROFILER: Profiler = _NullProfiler()
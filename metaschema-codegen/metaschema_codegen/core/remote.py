@@ -0,0 +1,127 @@
+"""
+The remote module loads metaschemas over HTTP(S).
+
+Remote metaschemas are mirrored into the cache directory before they are parsed, so parsing, refresh() and snapshots
+work on local files whether the metaschemas came from disk or from a server. Mirroring fetches the imports of each
+metaschema as soon as they are discovered, on a small thread pool. Each file goes through the SchemaCache, which
+reuses persistent connections and revalidates cached files, so a warm mirror costs one conditional request per file
+and downloads nothing.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path, PurePosixPath
+from urllib import parse
+
+from lxml import etree
+
+from .cache import SchemaCache, SchemaCacheException
+
+logger = logging.getLogger(__name__)
+
+METASCHEMA_NAMESPACE = "http://csrc.nist.gov/ns/oscal/metaschema/1.0"
+
+
+def is_remote(location: str) -> bool:
+    """
+    Returns True if a location is an http or https URL.
+    """
+    return parse.urlparse(location).scheme in ("http", "https")
+
+
+def mirror_directory(cache: SchemaCache, location: str) -> Path:
+    """
+    Returns the directory that the metaschemas relative to a remote location are mirrored to.
+    """
+    base_url = parse.urljoin(location, ".")
+    key = hashlib.sha256(base_url.encode()).hexdigest()
+    return cache.cache_dir.joinpath("metaschemas", key)
+
+
+def mirror_metaschemas(
+    cache: SchemaCache,
+    location: str,
+    chase_imports: bool = True,
+    jobs: int = 8,
+) -> tuple[Path, str]:
+    """
+    Fetches a remote metaschema and (optionally) the metaschemas it imports, and mirrors them into the cache
+    directory with the same relative paths. The imports are fetched concurrently, each as soon as the metaschema
+    importing it has arrived.
+
+    Files are only rewritten when their contents change, so that the mirror looks unchanged to refresh() and to
+    snapshots when the server has nothing new.
+
+    Args:
+        cache (SchemaCache): the cache used to fetch, revalidate and store the files
+        location (str): the URL of the base metaschema
+        chase_imports (bool, optional): whether to fetch the imported metaschemas. Defaults to True.
+        jobs (int, optional): the number of files fetched at the same time. Defaults to 8.
+
+    Returns:
+        tuple[Path, str]: the mirror directory, and the base metaschema file relative to it
+    """
+    base_url = parse.urljoin(location, ".")
+    directory = mirror_directory(cache, location)
+    start_file = PurePosixPath(parse.urlparse(location).path).name
+
+    def fetch(file: str) -> list[str]:
+        resource = cache.fetch(parse.urljoin(base_url, file))
+        mirrored_file = directory.joinpath(file)
+        try:
+            unchanged = mirrored_file.read_bytes() == resource.contents
+        except OSError:
+            unchanged = False
+        if not unchanged:
+            cache._write_atomic(mirrored_file, resource.contents)
+
+        if not chase_imports:
+            return []
+        return _relative_imports(resource.contents, file)
+
+    fetched = {start_file}
+    with ThreadPoolExecutor(max_workers=max(jobs, 1)) as executor:
+        pending: dict[Future, str] = {executor.submit(fetch, start_file): start_file}
+        while len(pending) > 0:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.pop(future)
+                for imported in future.result():
+                    if imported not in fetched:
+                        fetched.add(imported)
+                        pending[executor.submit(fetch, imported)] = imported
+
+    logger.info(f"Mirrored {len(fetched)} metaschemas from {base_url} to {directory}")
+    return directory, start_file
+
+
+def _relative_imports(contents: bytes, file: str) -> list[str]:
+    """
+    Returns the imports of a metaschema, relative to the base metaschema. Imports must stay inside the directory of
+    the base metaschema, since they are mirrored below it.
+    """
+    try:
+        tree = etree.fromstring(contents)
+    except etree.XMLSyntaxError as e:
+        raise SchemaCacheException(f"{file} is not a well-formed metaschema: {e}")
+
+    imports = []
+    for element in tree.iterchildren(f"{{{METASCHEMA_NAMESPACE}}}import"):
+        href = element.get("href")
+        if href is None:
+            continue
+        imported = str(PurePosixPath(file).parent.joinpath(href))
+        if (
+            parse.urlparse(href).scheme
+            or PurePosixPath(href).is_absolute()
+            or ".." in PurePosixPath(imported).parts
+        ):
+            raise SchemaCacheException(
+                f"Refusing to mirror a metaschema import outside of the base directory: {href}"
+            )
+        imports.append(imported)
+
+    return imports
@@ -1,73 +1,53 @@
 from __future__ import annotations
 
-from urllib import request, parse
+from urllib import parse
 import xmlschema
 from lxml import etree
 from pathlib import Path
-from typing import cast
+from typing import Callable, Iterator, cast
+from collections.abc import Mapping
 import logging
-import re
 import dataclasses
-
-# relative import below because we need to fix the translator
-import elementpath
+import hashlib
+import pickle
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+
+from .cache import CachedSchema, SchemaCache
+from .constraints import ConstraintTable
+from .datatypes import (  # noqa: F401 the datatypes are part of the parser's interface
+    DEFAULT_SCHEMA_BASE_URL,
+    DEFAULT_SCHEMA_LOCATION,
+    SIMPLE_TYPE_MAP,
+    ComplexDataType,
+    DataType,
+    SimpleRestrictionDatatype,
+    SimpleUnionDatatype,
+    introspect_datatypes,
+    packaged_datatype_table,
+)
+from .extract import ElementExtractor
+from .fingerprint import Fingerprints
+from .graph import DefinitionGraph
+from .lean import make_lean
+from .model import MetaschemaDefinitions
+from .pool import ConnectionPool
+from .profile import NULL_PROFILER, FileTiming, ParseReport, Profiler
+from .remote import is_remote, mirror_metaschemas
+from .symbols import SymbolTable
+from .snapshot import Snapshot, input_fingerprint, load_snapshot, save_snapshot
 
 logging.basicConfig(level=logging.DEBUG)
 
-# FIXME: This dict is necessary because of a bug in the metaschema xsd. This should be something we can calculate.
-SIMPLE_TYPE_MAP: dict[str, str] = {
-    "Base64Datatype": "base64",
-    "BooleanDatatype": "boolean",
-    "DateDatatype": "date",
-    "DateTimeDatatype": "date-time",
-    "DateTimeWithTimezoneDatatype": "date-time-with-timezone",
-    "DateWithTimezoneDatatype": "date-with-timezone",
-    "DayTimeDurationDatatype": "day-time-duration",
-    "DecimalDatatype": "decimal",
-    "EmailAddressDatatype": "email-address",
-    "HostnameDatatype": "hostname",
-    "IntegerDatatype": "integer",
-    "IPV4AddressDatatype": "ip-v4-address",
-    "IPV6AddressDatatype": "ip-v6-address",
-    "NonNegativeIntegerDatatype": "non-negative-integer",
-    "PositiveIntegerDatatype": "positive-integer",
-    "StringDatatype": "string",
-    "TokenDatatype": "token",
-    "URIDatatype": "uri",
-    "URIReferenceDatatype": "uri-reference",
-    "UUIDDatatype": "uuid",
-    "MarkupLineDatatype": "markup-line",
-    "MarkupMultilineDatatype": "markup-multiline",
-}
-
-
-#  utility classes to simplify data passing
-@dataclasses.dataclass
-class DataType:
-    ref_name: str
-    name: str
-    documentation: str | None
-
-    def __repr__(self) -> str:
-        return str(dataclasses.asdict(self))
-
-
-@dataclasses.dataclass
-class SimpleRestrictionDatatype(DataType):
-    # HACK: ref_name is how this datatype is referenced in a metaschema specification
-    # The schema is busted so we have a dictionary in the class (simple_type_map)
-    base_type: str
-    patterns: dict[str, list[str]]
-
-
-@dataclasses.dataclass
-class SimpleUnionDatatype(DataType):
-    member_types: list[str]
-
+# The ways a metaschema document can be decoded into a schema_dict. "xmlschema" validates each document with
+# xmlschema's to_dict(), "lxml" decodes the lxml tree directly with an ElementExtractor, without validating it.
+EXTRACTION_ENGINES = ("xmlschema", "lxml")
 
-@dataclasses.dataclass
-class ComplexDataType(DataType):
-    elements: list[str]
+# How strictly metaschema documents are validated against the xsd. "strict" raises on the first invalid element,
+# "lax" logs the errors and decodes what it can, "skip" trusts the documents (e.g. because CI already validates them)
+# and decodes them with an ElementExtractor, the cheapest way to get the same schema_dict.
+VALIDATION_MODES = ("strict", "lax", "skip")
 
 
 @dataclasses.dataclass
@@ -91,12 +71,208 @@ class Metaschema:
     globals: dict[str, str]
     roots: list[str]
     schema_dict: dict
+    # The typed definitions, built from schema_dict if not provided
+    definitions: MetaschemaDefinitions | None = None
+
+    def __post_init__(self):
+        if self.definitions is None:
+            self.definitions = MetaschemaDefinitions.from_dict(self.schema_dict)
 
 
 @dataclasses.dataclass
 class MetaSchemaSet:
     datatypes: list[DataType] = dataclasses.field(default_factory=list)
-    metaschemas: list[Metaschema] = dataclasses.field(default_factory=list)
+    # A LazyMetaschemas mapping if the set was parsed with MetaschemaSetParser(lazy=True)
+    metaschemas: list[Metaschema] | LazyMetaschemas = dataclasses.field(
+        default_factory=list
+    )
+    # The root metaschema files the set was parsed from, in the order they were given
+    root_files: list[str] = dataclasses.field(default_factory=list)
+    # The roots that reach each metaschema file through their imports. Not recorded for a lazy set.
+    reached_by: dict[str, list[str]] = dataclasses.field(default_factory=dict)
+
+    # The caches of the properties below. They are rebuilt on first use, so they aren't pickled with the set: a
+    # snapshot stays small, and the parsed metapaths hold classes elementpath creates at runtime, which can't be
+    # pickled.
+    _CACHES = ("_symbols", "_graph", "_fingerprints", "_constraints")
+
+    def __getstate__(self) -> dict:
+        return {
+            name: value
+            for name, value in self.__dict__.items()
+            if name not in MetaSchemaSet._CACHES
+        }
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+
+    def metaschema_list(self) -> list[Metaschema]:
+        """
+        Returns the metaschemas in import order. For a lazy set, this parses every metaschema in the import closure
+        that hasn't been parsed yet.
+        """
+        if isinstance(self.metaschemas, LazyMetaschemas):
+            return self.metaschemas.closure()
+        return self.metaschemas
+
+    def closure(self, root_file: str) -> list[Metaschema]:
+        """
+        Returns the metaschemas a root reaches, the root itself included, in import order. A set parsed from several
+        roots holds each shared metaschema once, this selects the ones that belong to one model.
+        """
+        if isinstance(self.metaschemas, LazyMetaschemas):
+            return self.metaschemas.closure(root_file)
+        return [
+            metaschema
+            for metaschema in self.metaschemas
+            if root_file in self.reached_by.get(metaschema.file, [])
+        ]
+
+    @property
+    def symbols(self) -> SymbolTable:
+        """
+        The symbol table for the metaschemas. It is built on first use, and rebuilt if the metaschemas change, e.g.
+        after MetaschemaSetParser.refresh().
+        """
+        metaschemas = self.metaschema_list()
+        cached = getattr(self, "_symbols", None)
+        if cached is not None:
+            indexed, symbol_table = cached
+            if len(indexed) == len(metaschemas) and all(
+                a is b for a, b in zip(indexed, metaschemas)
+            ):
+                return symbol_table
+
+        symbol_table = SymbolTable(metaschemas)
+        self._symbols = (tuple(metaschemas), symbol_table)
+        return symbol_table
+
+    @property
+    def graph(self) -> DefinitionGraph:
+        """
+        The definitions of the metaschemas, with every reference resolved, for code generation. It is built on first
+        use, and rebuilt when the symbol table is.
+        """
+        symbol_table = self.symbols
+        cached = getattr(self, "_graph", None)
+        if cached is not None and cached.symbols is symbol_table:
+            return cached
+
+        self._graph = DefinitionGraph(self)
+        return self._graph
+
+    @property
+    def fingerprints(self) -> Fingerprints:
+        """
+        The fingerprints of the top-level definitions, for change detection, see fingerprint.diff(). They are
+        calculated on first use, and recalculated when the definition graph is rebuilt.
+        """
+        graph = self.graph
+        cached = getattr(self, "_fingerprints", None)
+        if cached is not None and cached.graph is graph:
+            return cached
+
+        self._fingerprints = Fingerprints(graph)
+        return self._fingerprints
+
+    @property
+    def constraints(self) -> ConstraintTable:
+        """
+        The constraints of every definition, with their metapaths parsed. The table is built on first use, and
+        rebuilt when the definition graph is.
+        """
+        graph = self.graph
+        cached = getattr(self, "_constraints", None)
+        if cached is not None and cached.graph is graph:
+            return cached
+
+        self._constraints = ConstraintTable(graph)
+        return self._constraints
+
+
+class LazyMetaschemas(Mapping):
+    """
+    A mapping of metaschema files to parsed metaschemas, that parses each metaschema the first time it is accessed.
+    The files are relative to the base metaschema, as they are in an import.
+
+    Looking up a file parses only that file. closure() parses a file and its imports, and iterating over the mapping
+    parses the import closure of the root metaschemas, since that is what determines the keys.
+    """
+
+    def __init__(
+        self,
+        parse: Callable[[str], Metaschema],
+        start_files: list[str],
+        chase_imports: bool,
+    ) -> None:
+        """
+        Args:
+            parse (Callable[[str], Metaschema]): parses a metaschema file, raises KeyError if the file doesn't exist
+            start_files (list[str]): the root metaschemas
+            chase_imports (bool): whether the imports of the root metaschemas are part of the mapping
+        """
+        self._parse = parse
+        self.start_files = start_files
+        self.chase_imports = chase_imports
+        self.parsed: dict[str, Metaschema] = {}
+
+    def __getitem__(self, file: str) -> Metaschema:
+        metaschema = self.parsed.get(file)
+        if metaschema is None:
+            metaschema = self.parsed[file] = self._parse(file)
+        return metaschema
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._closure_files(self.start_files))
+
+    def __len__(self) -> int:
+        return len(self._closure_files(self.start_files))
+
+    def closure(self, file: str | None = None) -> list[Metaschema]:
+        """
+        Returns a metaschema and the metaschemas it imports, directly or indirectly, in import order. Only these
+        metaschemas are parsed.
+
+        Args:
+            file (str | None, optional): the metaschema file. Defaults to all of the root metaschemas.
+        """
+        return [
+            self[closure_file]
+            for closure_file in self._closure_files(
+                [file] if file is not None else self.start_files
+            )
+        ]
+
+    def invalidate(self, files: set[str]) -> None:
+        """
+        Forgets the parsed metaschemas for the given files (by Metaschema.file), so they are parsed again when next
+        accessed.
+        """
+        for key, metaschema in list(self.parsed.items()):
+            if metaschema.file in files or key in files:
+                del self.parsed[key]
+
+    def _closure_files(self, start_files: list[str]) -> list[str]:
+        # Breadth first, with the imports of each metaschema in the order they are declared, like an eager parse
+        files = list(dict.fromkeys(start_files))
+        if not self.chase_imports and set(files) <= set(self.start_files):
+            return files
+
+        seen = set(files)
+        for closure_file in files:
+            for imported in self[closure_file].imports:
+                if imported not in seen:
+                    seen.add(imported)
+                    files.append(imported)
+
+        return files
+
+
+@dataclasses.dataclass
+class FileState:
+    mtime_ns: int
+    size: int
+    digest: str
 
 
 @dataclasses.dataclass
@@ -116,198 +292,665 @@ class MetaschemaSetParser:
 
     def __init__(
         self,
-        metaschema_location: str | Path,
+        metaschema_location: str | Path | list[str | Path],
         chase_imports: bool = True,
-        schema_location: str = "https://raw.githubusercontent.com/usnistgov/metaschema/main/schema/xml/metaschema.xsd",
-        schema_base_url: (
-            str | None
-        ) = "https://raw.githubusercontent.com/usnistgov/metaschema/main/schema/xml/",
+        schema_location: str = DEFAULT_SCHEMA_LOCATION,
+        schema_base_url: str | None = DEFAULT_SCHEMA_BASE_URL,
+        cache_dir: Path | None = None,
+        offline: bool = False,
+        jobs: int = 1,
+        use_snapshot: bool = True,
+        engine: str = "xmlschema",
+        lazy: bool = False,
+        profile: bool = False,
+        validation: str | None = None,
+        lean: bool = False,
     ):
-
-        # Parse the XML Schema
-        xsd_contents = request.urlopen(schema_location).read()
-        metaschema_schema = xmlschema.XMLSchema(
-            source=xsd_contents, base_url=schema_base_url
+        """
+        Args:
+            metaschema_location (str | Path | list[str | Path]): The location of the base metaschema file, or a list of root metaschema files in the same directory. The metaschemas imported by several roots are parsed once, and metaschema_set.reached_by records which roots reach each metaschema.
+            chase_imports (bool, optional): Whether to parse the metaschemas imported by the root metaschemas. Defaults to True.
+            schema_location (str, optional): A URL or local path for the metaschema xsd.
+            schema_base_url (str | None, optional): The location the files included by the metaschema xsd are relative to.
+            cache_dir (Path | None, optional): The directory used to cache the xsd and the compiled schema. Defaults to the user cache directory.
+            offline (bool, optional): If True, the xsd is only loaded from the cache (or a bundled copy), never from the network.
+            jobs (int, optional): The number of worker processes used to parse imported metaschemas. 0 uses one per CPU. Defaults to 1 (no workers).
+            use_snapshot (bool, optional): Whether to load (and save) a snapshot of the parsed set in the cache directory. A snapshot is only loaded if none of its inputs have changed. Defaults to True.
+            engine (str, optional): How each metaschema document is decoded, one of EXTRACTION_ENGINES. "lxml" is several times faster but doesn't validate the documents. Both produce the same schema_dict. Defaults to "xmlschema".
+            lazy (bool, optional): If True, metaschema_set.metaschemas is a LazyMetaschemas mapping, and each metaschema is parsed the first time it is accessed. Only the datatypes are parsed up front. jobs is ignored and no snapshot is saved, but a snapshot is still loaded if there is one. Defaults to False.
+            profile (bool, optional): If True, the time spent in each phase of the parse and on each file, and the peak memory, are recorded in the report attribute. Files parsed later, by refresh() or a lazy set, are added to the report's files. Defaults to False.
+            validation (str | None, optional): How the metaschema documents are validated, one of VALIDATION_MODES. "skip" decodes them without validation, with the lxml engine. Defaults to "strict" for the xmlschema engine and "skip" for the lxml engine, which can't validate.
+            lean (bool, optional): If True, the descriptions, remarks and examples in each schema_dict are replaced by DocumentationRefs that can reload them, and the remaining strings are interned. This saves most of the memory of a parsed set, and the generated code has no documentation. Defaults to False.
+        """
+        if engine not in EXTRACTION_ENGINES:
+            raise SchemaParseException(
+                f"Unknown extraction engine {engine}, expected one of {', '.join(EXTRACTION_ENGINES)}."
+            )
+        if validation is None:
+            validation = "skip" if engine == "lxml" else "strict"
+        if validation not in VALIDATION_MODES:
+            raise SchemaParseException(
+                f"Unknown validation mode {validation}, expected one of {', '.join(VALIDATION_MODES)}."
+            )
+        if engine == "lxml" and validation != "skip":
+            raise SchemaParseException(
+                f"The lxml engine doesn't validate, it can't be used with validation={validation}."
+            )
+        if validation == "skip":
+            # Decoding with the extractor is the cheapest way to skip validation
+            engine = "lxml"
+
+        self.schema_cache = SchemaCache(cache_dir=cache_dir, offline=offline)
+        self.schema_location = schema_location
+        self.schema_base_url = schema_base_url
+        self.chase_imports = chase_imports
+        self.use_snapshot = use_snapshot
+        self.engine = engine
+        self.validation = validation
+        self.lean = lean
+        self.extractor: ElementExtractor | None = None
+
+        # schema_load stays None if the parsed set is loaded from a snapshot, until the xsd is needed by refresh()
+        self.schema_load: CachedSchema | None = None
+
+        # The URLs of the root metaschemas, if they are remote. Remote metaschemas are parsed from a mirror in the cache.
+        self.remote_locations: list[str] = []
+
+        # Profiling is off by default, in which case the null profiler makes the instrumentation close to free
+        self.profiler: Profiler = Profiler() if profile else NULL_PROFILER
+        self.report: ParseReport | None = None
+        self.jobs = jobs
+
+        try:
+            with self.profiler.phase("total"):
+                self._parse_set(metaschema_location, lazy)
+        finally:
+            if profile:
+                self.report = self.profiler.stop()
+
+    def _parse_set(
+        self, metaschema_location: str | Path | list[str | Path], lazy: bool
+    ) -> None:
+        """
+        Parses the metaschema set, or loads it from a snapshot. Called by the initializer.
+        """
+        chase_imports = self.chase_imports
+        use_snapshot = self.use_snapshot
+        jobs = self.jobs
+
+        start_paths = self._process_input_paths(metaschema_location)
+        self.base = start_paths[0].base
+        self.start_files = [start_path.file for start_path in start_paths]
+        # The first root, for code that only deals with a single base metaschema
+        self.start_file = self.start_files[0]
+        self.snapshot_file = self._snapshot_file(
+            start_paths=start_paths,
+            schema_location=self.schema_location,
+            chase_imports=chase_imports,
+            lean=self.lean,
         )
 
+        # The import graph maps each parsed file to the files it imports. With the state of each file when it was
+        # parsed, it lets refresh() re-parse only what changed.
+        self.import_graph: dict[str, list[str]] = {}
+        self.file_states: dict[str, FileState] = {}
+
+        # If exactly the same inputs were parsed before, load the result instead of parsing them again
+        if use_snapshot:
+            with self.profiler.phase("snapshot load"):
+                loaded = self._load_snapshot()
+            if loaded:
+                self._update_import_graph()
+                return
+
         # Initialize a metaschema set for the parser
-        self.metaschema_set = MetaSchemaSet()
-
-        # Parse simple types only if they are one of the types used in the OSCAL metaschema
-        self.metaschema_set.datatypes.extend(
-            self._parse_simple_datatypes(
-                [
-                    datatype
-                    for datatype in metaschema_schema.simple_types
-                    if datatype.local_name in SIMPLE_TYPE_MAP.keys()
-                ]
+        self.metaschema_set = MetaSchemaSet(root_files=list(self.start_files))
+        metaschema_schema = self._metaschema_schema()
+
+        # A compiled schema loaded from the cache has lost its annotations, so the datatypes are cached separately,
+        # parsed from a freshly compiled schema.
+        schema_load = cast(CachedSchema, self.schema_load)
+        with self.profiler.phase("datatypes"):
+            metaschema_schema = self._load_datatypes(schema_load, metaschema_schema)
+
+        if lazy:
+            self.metaschema_set.metaschemas = LazyMetaschemas(
+                parse=self._parse_lazily,
+                start_files=self.start_files,
+                chase_imports=chase_imports,
             )
+            return
+
+        # Start parsing the metaschema itself
+        if jobs == 0:
+            jobs = os.cpu_count() or 1
+
+        with self.profiler.phase("metaschemas"):
+            parsed_schemas = self._parse_metaschemas(metaschema_schema, jobs)
+
+        # The order the files were parsed in depends on scheduling, so add them to the set in import order
+        self.metaschema_set.metaschemas.extend(
+            self._import_order(parsed_schemas, self.start_files)
         )
-        self.metaschema_set.datatypes.extend(
-            self._parse_complex_datatypes(
-                [
-                    datatype
-                    for datatype in metaschema_schema.complex_types
-                    if datatype.local_name in SIMPLE_TYPE_MAP.keys()
-                ]
+        self._update_import_graph()
+        self.metaschema_set.reached_by = self._reached_by(self.start_files)
+
+        if use_snapshot:
+            with self.profiler.phase("snapshot save"):
+                self._save_snapshot()
+
+    def _load_datatypes(
+        self, schema_load: CachedSchema, metaschema_schema: xmlschema.XMLSchema
+    ) -> xmlschema.XMLSchema:
+        """
+        Adds the datatypes to the metaschema set, from the table shipped with the package or from the cache if
+        possible. Returns the compiled xsd, which is compiled again if the datatypes had to be parsed from a schema
+        that was loaded from the cache.
+        """
+        # The packaged table covers the xsd it was built from, so only a different or changed xsd is introspected
+        packaged_table = packaged_datatype_table()
+        if packaged_table is not None and packaged_table.matches(
+            self.schema_location, schema_load.digest
+        ):
+            self.metaschema_set.datatypes.extend(packaged_table.datatypes)
+            return metaschema_schema
+
+        cached_datatypes = self.schema_cache.load_artifact(
+            schema_load.digest, "datatypes.pickle"
+        )
+        if cached_datatypes is not None:
+            self.metaschema_set.datatypes.extend(pickle.loads(cached_datatypes))
+            return metaschema_schema
+
+        if schema_load.warm:
+            self.schema_load = schema_load = self.schema_cache.load_schema(
+                schema_location=self.schema_location,
+                schema_base_url=self.schema_base_url,
+                use_compiled=False,
             )
+            self._profile_schema_load(schema_load)
+            metaschema_schema = self._metaschema_schema()
+
+        self.metaschema_set.datatypes.extend(introspect_datatypes(metaschema_schema))
+        self.schema_cache.store_artifact(
+            schema_load.digest,
+            "datatypes.pickle",
+            pickle.dumps(self.metaschema_set.datatypes),
         )
 
-        # Start parsing the metaschema itself
-        start_path = self._process_input_path(metaschema_location)
-        base = start_path.base
+        return metaschema_schema
 
-        # Create a list to track the metaschemas we have to evaluate
-        schemas_to_parse: set[str] = set()
-        schemas_to_parse.add(start_path.file)
+    def _parse_metaschemas(
+        self, metaschema_schema: xmlschema.XMLSchema, jobs: int
+    ) -> dict[str, Metaschema]:
+        """
+        Parses the root metaschemas and (optionally) their imports, serially or in worker processes. A metaschema
+        imported by several roots is parsed once.
+        """
+        if jobs > 1:
+            parsed_schemas = self._parse_concurrently(
+                base=self.base,
+                start_files=self.start_files,
+                metaschema_schema=metaschema_schema,
+                chase_imports=self.chase_imports,
+                jobs=jobs,
+                engine=self.engine,
+                validation=self.validation,
+                lean=self.lean,
+            )
+        else:
+            parsed_schemas = self._parse_serially(
+                base=self.base,
+                start_files=self.start_files,
+                metaschema_schema=metaschema_schema,
+                chase_imports=self.chase_imports,
+            )
 
-        # Create a list of metaschemas we've already processed
-        parsed_schemas = set()
+        return parsed_schemas
 
-        # Parse all of the schemas
-        while len(schemas_to_parse) > 0:
-            next_schema = (
-                schemas_to_parse.pop()
-            )  # removes the schema from the list and returns it
-            metaschema = MetaSchemaParser(
-                schema_xsd=metaschema_schema, file=Path(base, next_schema)
-            ).metaschema
-            self.metaschema_set.metaschemas.append(metaschema)
+    def refresh(self) -> set[str]:
+        """
+        Re-parses only the metaschemas whose files have changed since they were parsed. Files that are newly imported
+        are parsed, and files that are no longer imported are dropped from the set. The set is updated in place.
 
-            # Add the schema we just parsed to the list of schemas we've already parsed
-            parsed_schemas.add(next_schema)
+        A file is considered changed if its contents changed, so touching a file costs a stat and a hash, not a parse.
+        Remote metaschemas are revalidated with the server first, which only downloads the files that changed.
 
-            if chase_imports:
-                # Get the set of imported schemas from the metaschema that are not in the "parsed_schema" set
-                new_schemas = set(metaschema.imports).difference(parsed_schemas)
+        Returns:
+            set[str]: the files whose definitions may have changed. These are the re-parsed files and every file that
+            imports them, directly or indirectly, since the definitions visible to an importer have changed.
+        """
+        for remote_location in self.remote_locations:
+            mirror_metaschemas(
+                cache=self.schema_cache,
+                location=remote_location,
+                chase_imports=self.chase_imports,
+            )
 
-                # add the new_schemas to the schemas_to_parse
-                schemas_to_parse.update(new_schemas)
+        changed_files = set()
+        for file, state in self.file_states.items():
+            current_state = self._file_state(file)
+            if current_state is None or current_state.digest != state.digest:
+                changed_files.add(file)
+            else:
+                # Remember the new mtime of a touched file so it isn't hashed again next time
+                self.file_states[file] = current_state
+
+        if len(changed_files) == 0:
+            return set()
+
+        importers = self.importers_of(changed_files)
+
+        metaschemas = self.metaschema_set.metaschemas
+        if isinstance(metaschemas, LazyMetaschemas):
+            # A lazy set parses the changed files again when they are next accessed
+            metaschemas.invalidate(changed_files)
+            for file in changed_files:
+                self.file_states.pop(file, None)
+                self.import_graph.pop(file, None)
+            return changed_files | importers
+
+        metaschema_schema = self._metaschema_schema()
+
+        parsed_schemas = {
+            metaschema.file: metaschema
+            for metaschema in self.metaschema_set.metaschemas
+        }
+        for file in sorted(changed_files):
+            if not Path(self.base, file).exists():
+                # A deleted file must no longer be imported. If it still is, parsing it will raise an exception.
+                del parsed_schemas[file]
+                continue
+            parsed_schemas[file] = self._parse_file(
+                metaschema_schema, Path(self.base, file)
+            )
 
-    def _parse_datatype_documentation(
-        self,
-        datatype: (
-            xmlschema.validators.XsdSimpleType | xmlschema.validators.XsdComplexType
-        ),
-    ):
+        # Parse any files that are imported for the first time
+        if self.chase_imports:
+            new_files = {
+                imported
+                for metaschema in parsed_schemas.values()
+                for imported in metaschema.imports
+                if imported not in parsed_schemas
+            }
+            self._parse_serially(
+                base=self.base,
+                start_files=sorted(new_files),
+                metaschema_schema=metaschema_schema,
+                chase_imports=True,
+                parsed_schemas=parsed_schemas,
+            )
+            changed_files.update(new_files)
+
+        # Rebuilding the list in import order also drops files that are no longer imported
+        self.metaschema_set.metaschemas[:] = self._import_order(
+            parsed_schemas, self.start_files
+        )
+        self._update_import_graph()
+        self.metaschema_set.reached_by = self._reached_by(self.start_files)
+
+        if self.use_snapshot:
+            self._save_snapshot()
+
+        return (changed_files | importers) & set(self.import_graph.keys())
+
+    def importers_of(self, files: set[str]) -> set[str]:
+        """
+        Returns every file that imports one of the given files, directly or indirectly.
+        """
+        imported_by: dict[str, set[str]] = {}
+        for file, imports in self.import_graph.items():
+            for imported in imports:
+                imported_by.setdefault(imported, set()).add(file)
+
+        importers: set[str] = set()
+        to_visit = list(files)
+        while len(to_visit) > 0:
+            for importer in imported_by.get(to_visit.pop(), set()):
+                if importer not in importers:
+                    importers.add(importer)
+                    to_visit.append(importer)
+
+        return importers
+
+    def _metaschema_schema(self) -> xmlschema.XMLSchema:
+        """
+        Returns the compiled metaschema xsd, loading it on first use.
+        """
+        if self.schema_load is None:
+            # Load the XML Schema. The cache avoids downloading and compiling it again on every run.
+            self.schema_load = self.schema_cache.load_schema(
+                schema_location=self.schema_location,
+                schema_base_url=self.schema_base_url,
+            )
+            logging.info(str(self.schema_load))
+            self._profile_schema_load(self.schema_load)
+
+        if self.engine == "lxml" and (
+            self.extractor is None
+            or self.extractor.schema_xsd is not self.schema_load.schema
+        ):
+            self.extractor = ElementExtractor(
+                self.schema_load.schema, validation=self.validation
+            )
+
+        return self.schema_load.schema
+
+    def _profile_schema_load(self, schema_load: CachedSchema) -> None:
+        # The schema cache times the xsd load itself, so its timings are added to the report as phases
+        self.profiler.add_phase("xsd fetch", schema_load.fetch_seconds)
+        self.profiler.add_phase(
+            "xsd load" if schema_load.warm else "xsd compile",
+            schema_load.compile_seconds,
+        )
+
+    def _update_import_graph(self) -> None:
+        """
+        Rebuilds the import graph from the parsed metaschemas, and records the state of any file not seen before.
+        """
+        metaschemas = self.metaschema_set.metaschemas
+        if isinstance(metaschemas, LazyMetaschemas):
+            # Only the metaschemas parsed so far are part of the graph
+            metaschemas = list(metaschemas.parsed.values())
+
+        self.import_graph = {
+            metaschema.file: list(metaschema.imports) for metaschema in metaschemas
+        }
+
+        for file in list(self.file_states.keys()):
+            if file not in self.import_graph:
+                del self.file_states[file]
+
+        for file in self.import_graph.keys():
+            current_state = self._file_state(file)
+            if current_state is not None:
+                self.file_states[file] = current_state
+
+    def _reached_by(self, start_files: list[str]) -> dict[str, list[str]]:
+        """
+        Returns the roots that reach each file in the import graph, the root itself included.
+        """
+        reached_by: dict[str, list[str]] = {}
+        for start_file in start_files:
+            to_visit = [start_file]
+            seen = {start_file}
+            while len(to_visit) > 0:
+                file = to_visit.pop()
+                reached_by.setdefault(file, []).append(start_file)
+                if not self.chase_imports:
+                    continue
+                for imported in self.import_graph.get(file, []):
+                    if imported in self.import_graph and imported not in seen:
+                        seen.add(imported)
+                        to_visit.append(imported)
+
+        return reached_by
+
+    def _file_state(self, file: str) -> FileState | None:
+        """
+        Returns the current state of a metaschema file, or None if it doesn't exist. The file is only hashed if its
+        mtime or size differ from the recorded state.
+        """
+        path = Path(self.base, file)
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+
+        previous_state = self.file_states.get(file)
         if (
-            datatype.annotation is not None
-            and datatype.annotation.documentation is not None
+            previous_state is not None
+            and previous_state.mtime_ns == stat.st_mtime_ns
+            and previous_state.size == stat.st_size
         ):
-            doc_strings = [
-                str(documentation.text)
-                for documentation in datatype.annotation.documentation
-            ]
-            documentation = "".join(doc_strings)
-
-            # replace "\n" with " " and get rid of "\t"
-            documentation = documentation.replace("\n", " ").replace("\t", "")
-        else:
-            documentation = None
-
-        return documentation
-
-    def _parse_simple_datatypes(
-        self, datatypes: list[xmlschema.validators.XsdSimpleType]
-    ) -> list[DataType]:
-        simple_datatypes = []
-
-        for simple_datatype in datatypes:
-            if isinstance(simple_datatype, xmlschema.validators.XsdList):
-                # process as XsdList - none of these in the
-                # current metaschema so we're ignoring them
-                pass
-            elif isinstance(simple_datatype, xmlschema.validators.XsdUnion):
-                # Metaschema defines union types, but they don't appear to be used in oscal. ignoring.
-                pass
-            elif isinstance(
-                simple_datatype, xmlschema.validators.XsdAtomicRestriction
-            ):  # simple_datatype.variety == "atomic"
-                simple_datatypes.append(
-                    self._parse_simple_atomicrestrictions(simple_datatype)
-                )
-            else:
-                raise SchemaParseException(
-                    f"Unrecognized simple data type {type(simple_datatype)}"
-                )
+            return previous_state
 
-        return simple_datatypes
+        return FileState(
+            mtime_ns=stat.st_mtime_ns,
+            size=stat.st_size,
+            digest=hashlib.sha256(path.read_bytes()).hexdigest(),
+        )
 
-    def _parse_simple_atomicrestrictions(
-        self, datatype: xmlschema.validators.XsdAtomicRestriction
-    ) -> SimpleRestrictionDatatype:
-        if datatype.local_name is not None:
-            name = datatype.local_name  # local_name excludes the namespace
+    def _load_snapshot(self) -> bool:
+        """
+        Loads the parsed set from a snapshot if there is one and none of its inputs have changed.
 
-        if name in SIMPLE_TYPE_MAP.keys():
-            ref_name = SIMPLE_TYPE_MAP[name]
-        else:
-            raise SchemaParseException(
-                "Couldn't map " + name + " to any of the expected Metaschema types."
-            )
+        Returns:
+            bool: True if the set was loaded
+        """
+        xsd_digest = self.schema_cache.schema_digest(
+            schema_location=self.schema_location, schema_base_url=self.schema_base_url
+        )
+        if xsd_digest is None:
+            return False
+
+        snapshot = load_snapshot(self.snapshot_file)
+        if snapshot is None or snapshot.fingerprint != input_fingerprint(
+            self.base, snapshot.files, xsd_digest
+        ):
+            return False
+
+        logging.info(f"Loaded parsed metaschemas from snapshot {self.snapshot_file}")
+        self.metaschema_set = snapshot.metaschema_set
+        return True
 
-        if datatype.base_type is not None and datatype.base_type.local_name is not None:
-            base_type = datatype.base_type.local_name
-
-        documentation = self._parse_datatype_documentation(datatype=datatype)
-
-        patterns = {}
-        if datatype.patterns is not None:
-            # We take advantage of the fact that there's only one regex in this particular schema
-            xml_pattern = datatype.patterns.regexps[0]
-            pcre_pattern = elementpath.regex.translate_pattern(xml_pattern)
-            patterns.update(
-                {
-                    "xml": xml_pattern,
-                    "pcre": pcre_pattern,
-                }
+    def _save_snapshot(self) -> None:
+        files = [metaschema.file for metaschema in self.metaschema_set.metaschemas]
+        fingerprint = input_fingerprint(
+            self.base, files, cast(CachedSchema, self.schema_load).digest
+        )
+        if fingerprint is not None:
+            save_snapshot(
+                self.snapshot_file,
+                Snapshot(
+                    fingerprint=fingerprint,
+                    files=files,
+                    metaschema_set=self.metaschema_set,
+                ),
             )
 
-        return SimpleRestrictionDatatype(
-            ref_name=ref_name,
-            name=name,
-            base_type=base_type,
-            documentation=documentation,
-            patterns=patterns,
+    def _parse_file(
+        self, metaschema_schema: xmlschema.XMLSchema, file: Path
+    ) -> Metaschema:
+        """
+        Parses a single metaschema file in this process, and records its timing if profiling.
+        """
+        metaschema_parser = MetaSchemaParser(
+            schema_xsd=metaschema_schema,
+            file=file,
+            extractor=self.extractor,
+            profile=self.profiler.enabled,
+            validation=self.validation,
+            lean=self.lean,
         )
+        self.profiler.add_file(metaschema_parser.timing)
+        return metaschema_parser.metaschema
 
-    def _parse_simple_union(self, datatype: xmlschema.validators.XsdUnion):
-        # There are some in metaschema, but none are used in OSCAL. Skipping....
-        pass
+    def _parse_lazily(self, file: str) -> Metaschema:
+        """
+        Parses a metaschema for a LazyMetaschemas mapping, and records it in the import graph.
+        """
+        path = Path(self.base, file)
+        if not path.exists():
+            raise KeyError(file)
 
-    def _parse_complex_datatypes(
-        self, datatypes: list[xmlschema.validators.XsdComplexType]
-    ) -> list[ComplexDataType]:
-        complex_datatypes: list[ComplexDataType] = []
+        metaschema = self._parse_file(self._metaschema_schema(), path)
 
-        for complex_datatype in datatypes:
-            if complex_datatype.local_name is not None:
-                name = complex_datatype.local_name
+        self.import_graph[metaschema.file] = list(metaschema.imports)
+        file_state = self._file_state(metaschema.file)
+        if file_state is not None:
+            self.file_states[metaschema.file] = file_state
 
-            if name in SIMPLE_TYPE_MAP.keys():
-                ref_name = SIMPLE_TYPE_MAP[name]
-            else:
-                raise SchemaParseException(
-                    "Couldn't map " + name + " to any of the expected Metaschema types."
-                )
+        return metaschema
+
+    def _snapshot_file(
+        self,
+        start_paths: list[SchemaPath],
+        schema_location: str,
+        chase_imports: bool,
+        lean: bool,
+    ) -> Path:
+        """
+        Returns the file a snapshot of this parse is stored in. It is named after the parse options rather than the
+        inputs, so that a changed input replaces the old snapshot instead of adding another.
+        """
+        roots = "\n".join(
+            str(Path(start_path.base, start_path.file).resolve())
+            for start_path in start_paths
+        )
+        key = hashlib.sha256(
+            f"{roots}\n{schema_location}\n{chase_imports}\n{lean}".encode()
+        ).hexdigest()
+        return self.schema_cache.cache_dir.joinpath("snapshots", f"{key}.snapshot")
+
+    def _parse_serially(
+        self,
+        base: Path,
+        start_files: list[str],
+        metaschema_schema: xmlschema.XMLSchema,
+        chase_imports: bool,
+        parsed_schemas: dict[str, Metaschema] | None = None,
+    ) -> dict[str, Metaschema]:
+        """
+        Parses the given metaschemas and (optionally) their imports one at a time.
+
+        Args:
+            parsed_schemas (dict[str, Metaschema] | None, optional): metaschemas that are already parsed. The newly
+                parsed metaschemas are added to it.
+
+        Returns:
+            dict[str, Metaschema]: the parsed metaschemas keyed by file name
+        """
+        # Create a list to track the metaschemas we have to evaluate
+        schemas_to_parse: set[str] = set(start_files)
+
+        # Create a dict of metaschemas we've already processed
+        if parsed_schemas is None:
+            parsed_schemas = {}
+
+        # Parse all of the schemas
+        while len(schemas_to_parse) > 0:
+            next_schema = (
+                schemas_to_parse.pop()
+            )  # removes the schema from the list and returns it
+            metaschema = self._parse_file(metaschema_schema, Path(base, next_schema))
+
+            # Add the schema we just parsed to the list of schemas we've already parsed
+            parsed_schemas[next_schema] = metaschema
+
+            if chase_imports:
+                # Get the set of imported schemas from the metaschema that are not in the "parsed_schema" set
+                new_schemas = set(metaschema.imports).difference(parsed_schemas)
+
+                # add the new_schemas to the schemas_to_parse
+                schemas_to_parse.update(new_schemas)
 
-            documentation = self._parse_datatype_documentation(complex_datatype)
+        return parsed_schemas
 
-            elements = []
-            if isinstance(complex_datatype.content, xmlschema.validators.XsdGroup):
-                for element in complex_datatype.content.iter_elements():
-                    elements.append(element.local_name)
+    def _parse_concurrently(
+        self,
+        base: Path,
+        start_files: list[str],
+        metaschema_schema: xmlschema.XMLSchema,
+        chase_imports: bool,
+        jobs: int,
+        engine: str,
+        validation: str,
+        lean: bool,
+    ) -> dict[str, Metaschema]:
+        """
+        Parses the root metaschemas and (optionally) their imports in a pool of worker processes. Each import is
+        submitted as soon as it is discovered, so a wide set of imports parses in about the time of the slowest file.
+        The compiled xsd is sent to each worker once, when the worker starts.
 
-            complex_datatypes.append(
-                ComplexDataType(
-                    ref_name=ref_name,
-                    name=name,
-                    documentation=documentation,
-                    elements=elements,
+        Returns:
+            dict[str, Metaschema]: the parsed metaschemas keyed by file name
+        """
+        parsed_schemas: dict[str, Metaschema] = {}
+
+        with ProcessPoolExecutor(
+            max_workers=jobs,
+            initializer=_initialize_parse_worker,
+            initargs=(
+                metaschema_schema,
+                engine,
+                validation,
+                lean,
+                self.profiler.enabled,
+            ),
+        ) as executor:
+            pending: dict[Future, str] = {
+                executor.submit(_parse_in_worker, Path(base, start_file)): start_file
+                for start_file in start_files
+            }
+            submitted = set(start_files)
+
+            while len(pending) > 0:
+                done, _ = wait(pending.keys(), return_when=FIRST_COMPLETED)
+                for future in done:
+                    schema_file = pending.pop(future)
+                    metaschema, timing = future.result()
+                    self.profiler.add_file(timing)
+                    parsed_schemas[schema_file] = metaschema
+
+                    if chase_imports:
+                        for new_schema in sorted(
+                            set(metaschema.imports).difference(submitted)
+                        ):
+                            pending[
+                                executor.submit(
+                                    _parse_in_worker, Path(base, new_schema)
+                                )
+                            ] = new_schema
+                            submitted.add(new_schema)
+
+        return parsed_schemas
+
+    def _import_order(
+        self, parsed_schemas: dict[str, Metaschema], start_files: list[str]
+    ) -> list[Metaschema]:
+        """
+        Returns the parsed metaschemas in a deterministic order: breadth first from the root metaschemas, with the
+        imports of each metaschema in the order they are declared.
+        """
+        ordered: list[Metaschema] = []
+        queue = list(dict.fromkeys(start_files))
+        seen = set(queue)
+
+        while len(queue) > 0:
+            metaschema = parsed_schemas[queue.pop(0)]
+            ordered.append(metaschema)
+            for imported in metaschema.imports:
+                if imported in parsed_schemas and imported not in seen:
+                    seen.add(imported)
+                    queue.append(imported)
+
+        return ordered
+
+    def _process_input_paths(
+        self, input_paths: str | Path | list[str | Path]
+    ) -> list[SchemaPath]:
+        """
+        Processes the location, or list of root locations, provided to the initializer. The roots must be in the same
+        directory (or under the same base URL), since imports are keyed by their path relative to it.
+        """
+        if not isinstance(input_paths, list):
+            input_paths = [input_paths]
+        if len(input_paths) == 0:
+            raise SchemaParseException("At least one metaschema location is required.")
+
+        start_paths = [
+            self._process_input_path(input_path) for input_path in input_paths
+        ]
+        base = start_paths[0].base.resolve()
+        for start_path in start_paths[1:]:
+            if start_path.base.resolve() != base:
+                raise SchemaParseException(
+                    f"The root metaschemas must be in the same directory, {start_path.file} is in "
+                    f"{start_path.base} rather than {start_paths[0].base}."
                 )
-            )
 
-        return complex_datatypes
+        return start_paths
 
     def _process_input_path(self, input_path: str | Path) -> SchemaPath:
         """
@@ -338,11 +981,19 @@ class MetaschemaSetParser:
                 if not base_path.is_absolute():
                     base_path.resolve()
                 file = path.name
-            elif base_url_parts.scheme == "http":
-                # TODO: handle http urls
-                pass
+            elif is_remote(input_path):
+                # Mirror the metaschema and its imports into the cache, and parse the local copies
+                self.remote_locations.append(input_path)
+                with self.profiler.phase("mirror"):
+                    base_path, file = mirror_metaschemas(
+                        cache=self.schema_cache,
+                        location=input_path,
+                        chase_imports=self.chase_imports,
+                    )
             else:
-                pass
+                raise SchemaParseException(
+                    f"Unsupported metaschema location {input_path}, expected a path or an http(s) URL."
+                )
         else:
             raise SchemaParseException(
                 f"Base must be a str or a Path. You provided a {type(input_path)}."
@@ -351,6 +1002,47 @@ class MetaschemaSetParser:
         return SchemaPath(base=base_path, file=file)
 
 
+# Connections for MetaSchemaParser._read_remote_metaschema
+_remote_pool = ConnectionPool()
+
+
+# The compiled xsd (and the extractor, for the lxml engine, the validation mode, lean mode and whether to profile) for a parse worker process. They are
+# set once per process by _initialize_parse_worker.
+_worker_schema_xsd: xmlschema.XMLSchema | None = None
+_worker_extractor: ElementExtractor | None = None
+_worker_validation = "strict"
+_worker_lean = False
+_worker_profile = False
+
+
+def _initialize_parse_worker(
+    schema_xsd: xmlschema.XMLSchema,
+    engine: str,
+    validation: str,
+    lean: bool,
+    profile: bool,
+) -> None:
+    global _worker_schema_xsd, _worker_extractor, _worker_validation, _worker_lean, _worker_profile
+    _worker_schema_xsd = schema_xsd
+    _worker_validation = validation
+    _worker_lean = lean
+    _worker_profile = profile
+    if engine == "lxml":
+        _worker_extractor = ElementExtractor(schema_xsd, validation=validation)
+
+
+def _parse_in_worker(file: Path) -> tuple[Metaschema, FileTiming | None]:
+    metaschema_parser = MetaSchemaParser(
+        schema_xsd=cast(xmlschema.XMLSchema, _worker_schema_xsd),
+        file=file,
+        extractor=_worker_extractor,
+        profile=_worker_profile,
+        validation=_worker_validation,
+        lean=_worker_lean,
+    )
+    return metaschema_parser.metaschema, metaschema_parser.timing
+
+
 class MetaSchemaParser:
     """
     This class represents a parsed metaschema.
@@ -369,29 +1061,80 @@ class MetaSchemaParser:
         a list of importable elements (by formal-name)
     schema_dict: dict
         a dictionary containing the full, parsed metaschema
+    definitions: MetaschemaDefinitions
+        the typed definitions built from schema_dict
     """
 
-    def __init__(self, schema_xsd: xmlschema.XMLSchema, file: Path):
+    def __init__(
+        self,
+        schema_xsd: xmlschema.XMLSchema,
+        file: Path,
+        extractor: ElementExtractor | None = None,
+        profile: bool = False,
+        validation: str = "strict",
+        lean: bool = False,
+    ):
         """
         Initializer for a MetaSchema instance
 
         Args:
             file (Path): A Path representing a local file.
             schema_xsd (xmlschema.XMLSchema): A parsed xml schema which can be passed in to prevent the same xsd from being parsed multiple times
+            extractor (ElementExtractor | None, optional): If provided, the file is decoded with the extractor instead of being validated with schema_xsd.to_dict().
+            profile (bool, optional): If True, the time spent in each step is recorded in the timing attribute. Defaults to False.
+            validation (str, optional): One of VALIDATION_MODES. With "lax", validation errors are logged instead of raised. With "skip", the file is decoded with an ElementExtractor, which is built for this file if one isn't provided. Defaults to "strict".
+            lean (bool, optional): If True, the documentation in schema_dict is replaced by DocumentationRefs and the strings are interned, see make_lean(). Defaults to False.
         """
+        if validation not in VALIDATION_MODES:
+            raise SchemaParseException(
+                f"Unknown validation mode {validation}, expected one of {', '.join(VALIDATION_MODES)}."
+            )
+
+        self.timing: FileTiming | None = None
+        if profile:
+            self.timing = FileTiming(file=file.name)
+            start = time.perf_counter()
+
         # Parse the file
         parser = etree.XMLParser(resolve_entities=True)
 
         # TODO: process URLs or local paths - consider reading the bytes and passing them to etree instead of a file location
         metaschema_etree = etree.parse(file, parser=parser)
 
+        if self.timing is not None:
+            parsed = time.perf_counter()
+            self.timing.parse_seconds = parsed - start
+
         # Extract the relevant data from the etree
-        self.schema_dict = (
-            cast(  # cast doesn't do anything, just shuts up the type checker
-                dict,
-                schema_xsd.to_dict(cast(xmlschema.XMLResource, metaschema_etree)),
+        if extractor is None and validation == "skip":
+            extractor = ElementExtractor(schema_xsd, validation=validation)
+
+        if extractor is not None:
+            self.schema_dict = extractor.extract(metaschema_etree)
+        elif validation == "lax":
+            schema_dict, errors = schema_xsd.to_dict(
+                cast(xmlschema.XMLResource, metaschema_etree), validation="lax"
+            )
+            for error in errors:
+                logging.warning(f"{file.name} is not valid: {error.reason}")
+            self.schema_dict = cast(dict, schema_dict)
+        else:
+            self.schema_dict = (
+                cast(  # cast doesn't do anything, just shuts up the type checker
+                    dict,
+                    schema_xsd.to_dict(cast(xmlschema.XMLResource, metaschema_etree)),
+                )
             )
-        )
+
+        if lean:
+            self.schema_dict = make_lean(self.schema_dict, metaschema_etree, file)
+
+        if self.timing is not None:
+            decoded = time.perf_counter()
+            self.timing.decode_seconds = decoded - parsed
+
+        # Build the typed definitions once, the globals and roots are read from them
+        self.definitions = MetaschemaDefinitions.from_dict(self.schema_dict)
 
         self.metaschema = Metaschema(
             file=file.name,
@@ -400,8 +1143,12 @@ class MetaSchemaParser:
             globals=self._get_globals(),
             roots=self._get_root_elements(),
             schema_dict=self.schema_dict,
+            definitions=self.definitions,
         )
 
+        if self.timing is not None:
+            self.timing.model_seconds = time.perf_counter() - decoded
+
     def _read_local_metaschema(
         self, metaschema: str | Path, basepath: Path | None = None
     ) -> str:
@@ -424,7 +1171,8 @@ class MetaSchemaParser:
 
     def _read_remote_metaschema(self, metaschema: str, baseurl: str) -> str:
         """
-        NOT YET IMPLEMENTED: Gets a schema if it is not stored locally, e.g. on a web site.
+        Gets a schema if it is not stored locally, e.g. on a web site. MetaschemaSetParser mirrors remote schemas
+        into its cache instead, so this is only for reading a single file.
 
         Args:
             baseurl (str): The base URL where the schema can be found
@@ -433,8 +1181,13 @@ class MetaSchemaParser:
         Returns:
             str: The contents of the file.
         """
-        # TODO: implement
-        return ""
+        location = parse.urljoin(baseurl, metaschema)
+        response = _remote_pool.get(location)
+        if response.status != 200:
+            raise SchemaParseException(
+                f"Unable to fetch {location}: HTTP {response.status}"
+            )
+        return response.body.decode()
 
     def _get_globals(self) -> dict[str, str]:
         """
@@ -443,36 +1196,18 @@ class MetaSchemaParser:
         """
         globals = {}
 
-        for assembly in self.schema_dict.get("define-assembly", []):
-            if assembly.get("@scope") != "local":
-                globals.update(self._ref_name(instance=assembly))
-        # return empty list if key does not exist
-        for field in self.schema_dict.get("define-field", []):
-            if field.get("@scope") != "local":
-                globals.update(self._ref_name(instance=field))
-        # return empty list if key does not exist
-        for flag in self.schema_dict.get("define-flag", []):
-            if flag.get("@scope") != "local":
-                globals.update(self._ref_name(instance=flag))
+        # Assemblies, then fields, then flags, so a flag wins if definitions of different kinds share a name
+        definitions = [
+            *self.definitions.assemblies,
+            *self.definitions.fields,
+            *self.definitions.flags,
+        ]
+        for definition in definitions:
+            if definition.scope != "local":
+                globals[definition.effective_name] = definition.formal_name
 
         return globals
 
-    def _ref_name(self, instance: dict) -> dict[str, str]:
-        """
-        calculates the names of the references
-
-        Args:
-            instance (dict): dictionary representing a flag, field or assembly
-
-        Returns:
-            dict[str, str]: a dictionary with a key of the reference name and a value of the formal name
-        """
-        use_name = instance.get("use-name")
-        if use_name is not None:
-            return {use_name: instance["formal-name"]}
-        else:
-            return {instance["@name"]: instance["formal-name"]}
-
     def _get_root_elements(self) -> list[str]:
         """
         Get a list of assemblies in this metaschema that have the "root-name" attribute, and can be a top level element of a document.
@@ -481,9 +1216,9 @@ class MetaSchemaParser:
             list[str]: list of elements with "root-name"
         """
         root_elements = [
-            assembly["formal-name"]
-            for assembly in self.schema_dict.get("define-assembly", [])
-            if assembly.get("root-name") is not None
+            assembly.formal_name
+            for assembly in self.definitions.assemblies
+            if assembly.root_name is not None
         ]
 
         return root_elements
@@ -0,0 +1,115 @@
+"""
+The snapshot module saves and loads parsed MetaSchemaSets.
+
+A snapshot is a zlib compressed pickle with a short header. It records the fingerprint of the inputs it was parsed
+from: every metaschema file in the import closure, the metaschema XSD and the library version. A snapshot is only
+used when the fingerprint of the current inputs matches, so loading one is safe and takes milliseconds instead of a
+multi-second parse.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+import typing
+import zlib
+from pathlib import Path
+
+from .. import __version__
+
+if typing.TYPE_CHECKING:
+    from .schemaparse import MetaSchemaSet
+
+# Increment this whenever the classes in a MetaSchemaSet change, so snapshots pickled from older classes are ignored
+SNAPSHOT_FORMAT_VERSION = 4
+SNAPSHOT_MAGIC = b"MSSNAP"
+
+
+@dataclasses.dataclass
+class Snapshot:
+    """
+    A parsed MetaSchemaSet and the inputs it was parsed from.
+
+    Attributes:
+        fingerprint (str): the fingerprint of the inputs, see input_fingerprint()
+        files (list[str]): the metaschema files in the import closure, relative to the base metaschema
+        metaschema_set (MetaSchemaSet): the parsed metaschemas
+    """
+
+    fingerprint: str
+    files: list[str]
+    metaschema_set: MetaSchemaSet
+
+
+def input_fingerprint(base: Path, files: list[str], xsd_digest: str) -> str | None:
+    """
+    Returns a fingerprint of the inputs to a parse, or None if one of the files can no longer be read.
+
+    Args:
+        base (Path): The directory containing the metaschema files
+        files (list[str]): The metaschema files in the import closure
+        xsd_digest (str): The digest of the metaschema XSD, from SchemaCache
+    """
+    fingerprint = hashlib.sha256(
+        f"{__version__}:{SNAPSHOT_FORMAT_VERSION}:{xsd_digest}\n".encode()
+    )
+    for file in sorted(files):
+        try:
+            contents = Path(base, file).read_bytes()
+        except OSError:
+            return None
+        fingerprint.update(f"{file}:{hashlib.sha256(contents).hexdigest()}\n".encode())
+
+    return fingerprint.hexdigest()
+
+
+def save_snapshot(path: Path, snapshot: Snapshot) -> None:
+    """
+    Writes a snapshot to a file. The file is replaced atomically so a concurrent reader never sees a partial snapshot.
+    """
+    contents = (
+        SNAPSHOT_MAGIC
+        + SNAPSHOT_FORMAT_VERSION.to_bytes(2, "big")
+        + zlib.compress(pickle.dumps(snapshot, protocol=pickle.HIGHEST_PROTOCOL))
+    )
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as tmp_file:
+            tmp_file.write(contents)
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def load_snapshot(path: Path) -> Snapshot | None:
+    """
+    Reads a snapshot from a file. Returns None if the file does not exist, or was written by a different version
+    of the snapshot format, or cannot be read.
+    """
+    try:
+        contents = path.read_bytes()
+    except OSError:
+        return None
+
+    header_length = len(SNAPSHOT_MAGIC) + 2
+    if (
+        contents[: len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC
+        or int.from_bytes(contents[len(SNAPSHOT_MAGIC) : header_length], "big")
+        != SNAPSHOT_FORMAT_VERSION
+    ):
+        return None
+
+    try:
+        snapshot = pickle.loads(zlib.decompress(contents[header_length:]))
+    except Exception as e:
+        logging.warning(f"Ignoring unreadable snapshot {path}: {e}")
+        return None
+
+    return snapshot if isinstance(snapshot, Snapshot) else None
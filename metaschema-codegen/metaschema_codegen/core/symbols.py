@@ -0,0 +1,225 @@
+"""
+The symbols module provides a symbol table for the definitions in a set of parsed metaschemas.
+
+In metaschema, a flag, field or assembly reference ("@ref") names a definition of the same kind, either defined in
+the same metaschema or defined with global scope in a metaschema it imports, directly or indirectly. A local
+definition shadows an imported one with the same name. The SymbolTable calculates the definitions visible from each
+metaschema once, so that a reference is resolved with a single dictionary lookup.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import logging
+import typing
+from pathlib import Path
+
+from .model import (
+    AssemblyDefinition,
+    Definition,
+    FieldDefinition,
+    FlagDefinition,
+)
+
+if typing.TYPE_CHECKING:
+    from .schemaparse import Metaschema
+
+# The kinds of definitions. Each kind has its own namespace, so a flag and a field can have the same name.
+DEFINITION_KINDS: dict[type[Definition], str] = {
+    FlagDefinition: "flag",
+    FieldDefinition: "field",
+    AssemblyDefinition: "assembly",
+}
+
+
+@dataclasses.dataclass(frozen=True)
+class Symbol:
+    """
+    A top-level definition in a metaschema.
+
+    Attributes:
+        schema (str): the file of the metaschema with the definition
+        module_name (str): the short name of the metaschema with the definition
+        kind (str): "flag", "field" or "assembly"
+        definition (Definition): the definition
+    """
+
+    schema: str
+    module_name: str
+    kind: str
+    definition: Definition = dataclasses.field(compare=False, repr=False)
+
+    @property
+    def name(self) -> str:
+        return self.definition.name
+
+    @property
+    def key(self) -> tuple[str, str]:
+        return (self.kind, self.definition.name)
+
+
+@dataclasses.dataclass(frozen=True)
+class SymbolConflict:
+    """
+    A name that resolves to more than one definition in a metaschema.
+
+    A shadowed symbol is an imported definition hidden by a definition in the metaschema itself, which is allowed.
+    A conflict is a name that two imported metaschemas define differently, so a reference to it is ambiguous.
+
+    Attributes:
+        schema (str): the file of the metaschema where the name is visible
+        symbol (Symbol): the definition a reference resolves to
+        other (Symbol): the definition that is shadowed, or that conflicts with symbol
+    """
+
+    schema: str
+    symbol: Symbol
+    other: Symbol
+
+
+class SymbolTable:
+    """
+    An index of the definitions in a set of metaschemas, by schema and name, by module and by formal name.
+
+    Attributes:
+        symbols (dict[str, dict[tuple[str, str], Symbol]]): the definitions in each metaschema, by (kind, name)
+        modules (dict[str, list[Symbol]]): the definitions in each metaschema, by short name
+        formal_names (dict[str, list[Symbol]]): the definitions with each formal name
+        shadowed (list[SymbolConflict]): imported definitions hidden by a local definition
+        conflicts (list[SymbolConflict]): names defined differently by two imported metaschemas
+    """
+
+    def __init__(self, metaschemas: list[Metaschema]) -> None:
+        """
+        Indexes the definitions of the metaschemas, and calculates the definitions visible from each one.
+
+        Args:
+            metaschemas (list[Metaschema]): the parsed metaschemas, e.g. MetaSchemaSet.metaschemas
+        """
+        self.metaschemas = {metaschema.file: metaschema for metaschema in metaschemas}
+        self.symbols: dict[str, dict[tuple[str, str], Symbol]] = {}
+        self.modules: dict[str, list[Symbol]] = {}
+        self.formal_names: dict[str, list[Symbol]] = {}
+        self.shadowed: list[SymbolConflict] = []
+        self.conflicts: list[SymbolConflict] = []
+
+        for metaschema in metaschemas:
+            schema_symbols: dict[tuple[str, str], Symbol] = {}
+            for definition in metaschema.definitions or []:
+                symbol = Symbol(
+                    schema=metaschema.file,
+                    module_name=metaschema.short_name,
+                    kind=DEFINITION_KINDS[type(definition)],
+                    definition=definition,
+                )
+                schema_symbols[symbol.key] = symbol
+                if definition.formal_name is not None:
+                    self.formal_names.setdefault(definition.formal_name, []).append(
+                        symbol
+                    )
+
+            self.symbols[metaschema.file] = schema_symbols
+            self.modules[metaschema.short_name] = list(schema_symbols.values())
+
+        self._exported: dict[str, dict[tuple[str, str], Symbol]] = {}
+        self._visible: dict[str, dict[tuple[str, str], Symbol]] = {}
+        for file in self.metaschemas:
+            self._visible[file] = self._visible_from(file)
+
+        for conflict in self.shadowed:
+            logging.debug(
+                f"{conflict.schema}: {conflict.symbol.kind} {conflict.symbol.name} shadows the definition in "
+                f"{conflict.other.schema}"
+            )
+        for conflict in self.conflicts:
+            logging.warning(
+                f"{conflict.schema}: {conflict.symbol.kind} {conflict.symbol.name} is defined in both "
+                f"{conflict.symbol.schema} and {conflict.other.schema}"
+            )
+
+    def resolve(self, schema: str, kind: str, ref: str) -> Symbol | None:
+        """
+        Returns the definition that a reference in a metaschema refers to.
+
+        Args:
+            schema (str): the file of the metaschema with the reference
+            kind (str): "flag", "field" or "assembly"
+            ref (str): the name in the "@ref"
+
+        Returns:
+            Symbol | None: the definition, or None if no definition with the name is visible from the metaschema
+        """
+        return self._visible[schema].get((kind, ref))
+
+    def visible(self, schema: str) -> dict[tuple[str, str], Symbol]:
+        """
+        Returns the definitions visible from a metaschema by (kind, name): its own definitions, and the global
+        definitions of the metaschemas it imports.
+        """
+        return self._visible[schema]
+
+    def imported(self, schema: str) -> dict[tuple[str, str], Symbol]:
+        """
+        Returns the global definitions a metaschema imports by (kind, name), including the ones it shadows.
+        """
+        imported: dict[tuple[str, str], Symbol] = {}
+        for imported_file in self._imports(schema):
+            for key, symbol in self._exported_from(imported_file, set()).items():
+                imported.setdefault(key, symbol)
+
+        return imported
+
+    def _imports(self, schema: str) -> list[str]:
+        # Imports are relative to the importing metaschema, and Metaschema.file is the file name
+        return [
+            Path(imported).name
+            for imported in self.metaschemas[schema].imports
+            if Path(imported).name in self.metaschemas
+        ]
+
+    def _exported_from(
+        self, schema: str, visiting: set[str]
+    ) -> dict[tuple[str, str], Symbol]:
+        """
+        Returns the global definitions of a metaschema and of the metaschemas it imports, which are visible to any
+        metaschema that imports it.
+        """
+        exported = self._exported.get(schema)
+        if exported is not None:
+            return exported
+
+        exported = {}
+        # An import cycle is allowed, the metaschemas in it see each other's definitions
+        if schema not in visiting:
+            visiting.add(schema)
+            for imported_file in self._imports(schema):
+                for key, symbol in self._exported_from(imported_file, visiting).items():
+                    exported.setdefault(key, symbol)
+            visiting.discard(schema)
+
+        for key, symbol in self.symbols[schema].items():
+            if symbol.definition.scope != "local":
+                exported[key] = symbol
+
+        self._exported[schema] = exported
+        return exported
+
+    def _visible_from(self, schema: str) -> dict[tuple[str, str], Symbol]:
+        visible: dict[tuple[str, str], Symbol] = {}
+        for imported_file in self._imports(schema):
+            for key, symbol in self._exported_from(imported_file, set()).items():
+                existing = visible.setdefault(key, symbol)
+                if existing is not symbol:
+                    self.conflicts.append(
+                        SymbolConflict(schema=schema, symbol=existing, other=symbol)
+                    )
+
+        for key, symbol in self.symbols[schema].items():
+            imported = visible.get(key)
+            if imported is not None:
+                self.shadowed.append(
+                    SymbolConflict(schema=schema, symbol=symbol, other=imported)
+                )
+            visible[key] = symbol
+
+        return visible
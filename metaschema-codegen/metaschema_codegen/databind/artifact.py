@@ -0,0 +1,389 @@
+"""
+The artifact module loads a compiled schema artifact, for validating documents at runtime.
+
+A schema artifact is written by metaschema_codegen.core.artifact from a parsed metaschema set. It holds what
+validation needs: the definitions with their resolved instances and cardinalities, the datatypes with their patterns
+and the constraints with their metapaths already parsed. This module only uses the standard library, so a
+validation worker can load an artifact in milliseconds without xmlschema, lxml or elementpath.
+
+The file is a short header (a magic number, the format version and the sha256 digest of the payload) followed by the
+zlib compressed JSON payload. The digest is checked before the payload is read.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import json
+import re
+import typing
+import zlib
+from pathlib import Path
+
+# Increment this whenever the layout of the payload changes, so artifacts written by older versions are rejected
+ARTIFACT_FORMAT_VERSION = 2
+ARTIFACT_MAGIC = b"MSARTF"
+ARTIFACT_HEADER_LENGTH = len(ARTIFACT_MAGIC) + 2 + hashlib.sha256().digest_size
+
+
+class ArtifactException(Exception):
+    pass
+
+
+@dataclasses.dataclass(eq=False)
+class ArtifactDatatype:
+    """
+    A datatype, e.g. DateTimeDatatype.
+
+    Attributes:
+        name (str): the name of the datatype class
+        ref_name (str | None): the name of the datatype in metaschema, e.g. "date-time"
+        kind (str): "simple-restriction" or "complex"
+        base_type (str | None): the xml type or datatype a simple datatype is derived from
+        pattern (str | None): the python regular expression values of a simple datatype match
+        elements (list[str]): the elements allowed in a complex (markup) datatype
+    """
+
+    __slots__ = (
+        "name",
+        "ref_name",
+        "kind",
+        "base_type",
+        "pattern",
+        "elements",
+        "_regex",
+    )
+
+    name: str
+    ref_name: str | None
+    kind: str
+    base_type: str | None
+    pattern: str | None
+    elements: list[str]
+    _regex: re.Pattern | None
+
+    def matches(self, value: str) -> bool:
+        """
+        Returns whether a value matches the pattern of the datatype. The pattern is compiled on first use.
+        """
+        if self.pattern is None:
+            return True
+        if self._regex is None:
+            self._regex = re.compile(self.pattern)
+        return self._regex.fullmatch(value) is not None
+
+
+@dataclasses.dataclass(eq=False)
+class ArtifactMetapath:
+    """
+    A parsed metapath expression.
+
+    Attributes:
+        expression (str): the expression, as written in the metaschema
+        tree (tuple | None): the parse tree, None if the expression is invalid. Each node is a tuple of the symbol,
+            the value of a name or literal (otherwise None) and a tuple of the child nodes.
+    """
+
+    __slots__ = ("expression", "tree")
+
+    expression: str
+    tree: tuple | None
+
+
+@dataclasses.dataclass(eq=False)
+class ArtifactConstraint:
+    """
+    A constraint on a definition.
+
+    Attributes:
+        kind (str): the constraint type, e.g. "allowed-values"
+        id (str | None): the id of the constraint
+        level (str): the severity of a violation, e.g. "ERROR"
+        target (ArtifactMetapath): the nodes the constraint applies to
+        parameters (dict[str, typing.Any]): the attributes of the constraint type. A test is an ArtifactMetapath,
+            and key fields are (ArtifactMetapath, pattern) pairs.
+    """
+
+    __slots__ = ("kind", "id", "level", "target", "parameters")
+
+    kind: str
+    id: str | None
+    level: str
+    target: ArtifactMetapath
+    parameters: dict[str, typing.Any]
+
+
+@dataclasses.dataclass(eq=False)
+class ArtifactInstance:
+    """
+    A flag, field or assembly instance, with the definition it resolves to.
+
+    Attributes:
+        definition (ArtifactDefinition): the definition
+        name (str): the effective name of the instance
+        python_name (str): the name of the python property for the instance
+        json_key (str): the JSON property name of the instance
+        min_occurs (int): the minimum number of occurrences
+        max_occurs (int | None): the maximum number of occurrences, None if unbounded
+        group_as (dict[str, str | None] | None): the name, in_json and in_xml of the grouping of a repeatable instance
+    """
+
+    __slots__ = (
+        "definition",
+        "name",
+        "python_name",
+        "json_key",
+        "min_occurs",
+        "max_occurs",
+        "group_as",
+    )
+
+    definition: ArtifactDefinition
+    name: str
+    python_name: str
+    json_key: str
+    min_occurs: int
+    max_occurs: int | None
+    group_as: dict[str, str | None] | None
+
+
+@dataclasses.dataclass(eq=False)
+class ArtifactChoice:
+    """
+    A choice between instances in a model.
+    """
+
+    __slots__ = ("instances",)
+
+    instances: list[ArtifactInstance]
+
+
+@dataclasses.dataclass(eq=False)
+class ArtifactDefinition:
+    """
+    A flag, field or assembly definition.
+
+    Attributes:
+        kind (str): "flag", "field" or "assembly"
+        name (str): the name of the definition
+        python_name (str): the effective name of the definition, as a python name
+        schema (str): the file of the metaschema with the definition
+        module_name (str): the python module of the metaschema with the definition
+        class_name (str): the name of the generated class
+        inline (bool): whether the definition is inline
+        root_name (str | None): the root name of a root assembly
+        datatype (ArtifactDatatype | None): the datatype of a flag or field
+        flags (list[ArtifactInstance]): the flags of a field or assembly
+        model (list[ArtifactInstance | ArtifactChoice]): the model of an assembly
+        constraints (list[ArtifactConstraint]): the constraints of the definition
+    """
+
+    __slots__ = (
+        "kind",
+        "name",
+        "python_name",
+        "schema",
+        "module_name",
+        "class_name",
+        "inline",
+        "root_name",
+        "datatype",
+        "flags",
+        "model",
+        "constraints",
+    )
+
+    kind: str
+    name: str
+    python_name: str
+    schema: str
+    module_name: str
+    class_name: str
+    inline: bool
+    root_name: str | None
+    datatype: ArtifactDatatype | None
+    flags: list[ArtifactInstance]
+    model: list[ArtifactInstance | ArtifactChoice]
+    constraints: list[ArtifactConstraint]
+
+
+@dataclasses.dataclass(eq=False)
+class SchemaArtifact:
+    """
+    A loaded schema artifact.
+
+    Attributes:
+        library_version (str): the version of metaschema_codegen that compiled the artifact
+        definitions (list[ArtifactDefinition]): the top-level and inline definitions
+        datatypes (list[ArtifactDatatype]): the datatypes
+        metapaths (list[ArtifactMetapath]): the distinct metapath expressions of the constraints
+        roots (dict[str, ArtifactDefinition]): the root assemblies, by root name
+        top_level (dict[tuple[str, str, str], ArtifactDefinition]): the top-level definitions, by the file of their
+            metaschema, kind and name
+    """
+
+    library_version: str
+    definitions: list[ArtifactDefinition]
+    datatypes: list[ArtifactDatatype]
+    metapaths: list[ArtifactMetapath]
+    roots: dict[str, ArtifactDefinition]
+    top_level: dict[tuple[str, str, str], ArtifactDefinition]
+
+
+def pack_artifact(payload: dict) -> bytes:
+    """
+    Returns the artifact file contents for a payload: the header, then the compressed JSON.
+    """
+    compressed = zlib.compress(
+        json.dumps(payload, separators=(",", ":")).encode(), level=9
+    )
+    return (
+        ARTIFACT_MAGIC
+        + ARTIFACT_FORMAT_VERSION.to_bytes(2, "big")
+        + hashlib.sha256(compressed).digest()
+        + compressed
+    )
+
+
+def load_artifact(source: Path | str | bytes) -> SchemaArtifact:
+    """
+    Loads a schema artifact.
+
+    Args:
+        source (Path | str | bytes): the artifact file, or its contents
+    """
+    contents = source if isinstance(source, bytes) else Path(source).read_bytes()
+
+    if contents[: len(ARTIFACT_MAGIC)] != ARTIFACT_MAGIC:
+        raise ArtifactException("Not a schema artifact")
+    version = int.from_bytes(
+        contents[len(ARTIFACT_MAGIC) : len(ARTIFACT_MAGIC) + 2], "big"
+    )
+    if version != ARTIFACT_FORMAT_VERSION:
+        raise ArtifactException(
+            f"The artifact has format version {version}, expected {ARTIFACT_FORMAT_VERSION}"
+        )
+    compressed = contents[ARTIFACT_HEADER_LENGTH:]
+    if (
+        hashlib.sha256(compressed).digest()
+        != contents[len(ARTIFACT_MAGIC) + 2 : ARTIFACT_HEADER_LENGTH]
+    ):
+        raise ArtifactException("The artifact is corrupt, its digest doesn't match")
+
+    try:
+        payload = json.loads(zlib.decompress(compressed))
+    except (zlib.error, ValueError) as e:
+        raise ArtifactException(f"The artifact can't be read: {e}")
+
+    return _build(payload)
+
+
+def _build(payload: dict) -> SchemaArtifact:
+    datatypes = [
+        ArtifactDatatype(
+            name=datatype["name"],
+            ref_name=datatype["ref_name"],
+            kind=datatype["kind"],
+            base_type=datatype["base_type"],
+            pattern=datatype["pattern"],
+            elements=datatype["elements"],
+            _regex=None,
+        )
+        for datatype in payload["datatypes"]
+    ]
+    metapaths = [
+        ArtifactMetapath(expression=expression, tree=_tree(tree))
+        for expression, tree in payload["metapaths"]
+    ]
+
+    # Create the definitions first, so the instances can point at them regardless of order
+    definitions = [
+        ArtifactDefinition(
+            kind=definition["kind"],
+            name=definition["name"],
+            python_name=definition["python_name"],
+            schema=definition["schema"],
+            module_name=definition["module_name"],
+            class_name=definition["class_name"],
+            inline=definition["inline"],
+            root_name=definition["root_name"],
+            datatype=(
+                datatypes[definition["datatype"]]
+                if definition["datatype"] is not None
+                else None
+            ),
+            flags=[],
+            model=[],
+            constraints=[],
+        )
+        for definition in payload["definitions"]
+    ]
+
+    def instance(instance_list: list) -> ArtifactInstance:
+        index, name, python_name, json_key, min_occurs, max_occurs, group_as = (
+            instance_list
+        )
+        return ArtifactInstance(
+            definition=definitions[index],
+            name=name,
+            python_name=python_name,
+            json_key=json_key,
+            min_occurs=min_occurs,
+            max_occurs=max_occurs,
+            group_as=group_as,
+        )
+
+    def parameter(name: str, value: typing.Any) -> typing.Any:
+        if name == "test":
+            return metapaths[value]
+        if name == "key_fields":
+            return [(metapaths[target], pattern) for target, pattern in value]
+        return value
+
+    for definition, contents in zip(definitions, payload["definitions"]):
+        definition.flags = [instance(flag) for flag in contents["flags"]]
+        definition.model = [
+            (
+                ArtifactChoice(instances=[instance(item) for item in item["choice"]])
+                if isinstance(item, dict)
+                else instance(item)
+            )
+            for item in contents["model"]
+        ]
+        definition.constraints = [
+            ArtifactConstraint(
+                kind=constraint["kind"],
+                id=constraint["id"],
+                level=constraint["level"],
+                target=metapaths[constraint["target"]],
+                parameters={
+                    name: parameter(name, value)
+                    for name, value in constraint["parameters"].items()
+                },
+            )
+            for constraint in contents["constraints"]
+        ]
+
+    return SchemaArtifact(
+        library_version=payload["library_version"],
+        definitions=definitions,
+        datatypes=datatypes,
+        metapaths=metapaths,
+        roots={
+            definition.root_name: definition
+            for definition in definitions
+            if definition.root_name is not None
+        },
+        top_level={
+            (definition.schema, definition.kind, definition.name): definition
+            for definition in definitions
+            if not definition.inline
+        },
+    )
+
+
+def _tree(tree: list | None) -> tuple | None:
+    if tree is None:
+        return None
+    symbol, value, children = tree
+    return (symbol, value, tuple(_tree(child) for child in children))
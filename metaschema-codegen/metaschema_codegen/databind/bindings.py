@@ -0,0 +1,430 @@
+"""
+The bindings module creates binding classes at runtime, as an alternative to generating source code.
+
+The classes are created from a schema artifact, or from a parsed metaschema set, which is compiled into one. They
+subclass the same base_classes runtime as the generated packages, and are laid out the same way: one namespace per
+metaschema module, and a datatypes namespace. A class is only created on first access, e.g. bindings.Catalog or
+bindings.oscal_catalog.Catalog, and is cached, so a service that handles many metaschema versions only pays for the
+classes it uses, without generating, writing and importing a package per version:
+
+    bindings = load_bindings("oscal-1.1.2.msa")
+    catalog_class = bindings.root("catalog")
+
+A class refers to the classes of its flags, fields and assemblies through BindingInstances, which create them when
+they are first read, so creating a class doesn't create the classes it contains. The constraints of a class are the
+constraints of the artifact, with their metapaths already parsed.
+
+An object of a class holds each flag, field and assembly instance in an attribute, and the value of a flag or field
+in "value", see core.layout.attribute_layout(). With slots=True the classes have a __slots__ layout instead of a
+__dict__, which the code generator can also emit, for schemas that load millions of objects.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import datetime
+import importlib.util
+import sys
+import threading
+import types
+import typing
+import urllib.parse
+from pathlib import Path
+
+from ..core.layout import attribute_layout
+from .artifact import (
+    ArtifactChoice,
+    ArtifactDatatype,
+    ArtifactDefinition,
+    ArtifactInstance,
+    SchemaArtifact,
+    load_artifact,
+)
+
+if typing.TYPE_CHECKING:
+    from ..core.schemaparse import MetaSchemaSet
+
+# The package the base_classes runtime is imported into, when no base_classes module is given
+RUNTIME_PACKAGE = "metaschema_codegen.databind.runtime"
+
+# The package resources of the code generator, which contain the runtime modules of a generated package
+_RUNTIME_RESOURCES = Path(__file__).parent.parent.joinpath(
+    "codegen", "python", "pkg_resources"
+)
+
+# Map XML datatypes to python built-in types, as the generated datatypes module does
+_PYTHON_TYPES: dict[str, type] = {
+    "anyURI": urllib.parse.ParseResult,
+    "base64Binary": str,
+    "boolean": bool,
+    "date": datetime.date,
+    "dateTime": datetime.datetime,
+    "decimal": float,
+    "duration": datetime.timedelta,
+    "integer": int,
+    "nonNegativeInteger": int,
+    "positiveInteger": int,
+    "string": str,
+    "token": str,
+}
+
+_BASE_CLASSES = {"flag": "Flag", "field": "Field", "assembly": "Assembly"}
+
+_runtime_lock = threading.Lock()
+
+
+class BindingException(Exception):
+    pass
+
+
+def load_bindings(
+    source: MetaSchemaSet | SchemaArtifact | Path | str | bytes,
+    base_classes: types.ModuleType | None = None,
+    slots: bool = False,
+) -> SchemaBindings:
+    """
+    Returns the bindings of a schema. No classes are created until they are accessed.
+
+    Args:
+        source (MetaSchemaSet | SchemaArtifact | Path | str | bytes): a parsed metaschema set, a loaded schema
+            artifact, or an artifact file or its contents
+        base_classes (types.ModuleType | None, optional): the base_classes module the classes subclass, e.g. the
+            one of a generated package. Defaults to None, which uses the runtime packaged with the code generator.
+        slots (bool, optional): Whether the flag, field and assembly classes have a __slots__ layout. Defaults to
+            False.
+    """
+    if isinstance(source, (Path, str, bytes)):
+        artifact = load_artifact(source)
+    elif isinstance(source, SchemaArtifact):
+        artifact = source
+    else:
+        from ..core.artifact import compile_artifact
+
+        artifact = load_artifact(compile_artifact(source))
+
+    return SchemaBindings(
+        artifact=artifact,
+        base_classes=base_classes if base_classes is not None else load_runtime(),
+        slots=slots,
+    )
+
+
+def load_runtime() -> types.ModuleType:
+    """
+    Returns the base_classes module that generated packages contain, imported from the package resources of the code
+    generator into RUNTIME_PACKAGE. It is imported once.
+    """
+    with _runtime_lock:
+        base_classes = sys.modules.get(f"{RUNTIME_PACKAGE}.base_classes")
+        if base_classes is not None:
+            return base_classes
+
+        package = types.ModuleType(RUNTIME_PACKAGE)
+        package.__path__ = []
+        sys.modules[RUNTIME_PACKAGE] = package
+        # base_classes imports metapath, so it is imported first
+        for module_name in ("metapath", "base_classes"):
+            spec = importlib.util.spec_from_file_location(
+                f"{RUNTIME_PACKAGE}.{module_name}",
+                _RUNTIME_RESOURCES.joinpath(f"pkg.{module_name}.py"),
+            )
+            if spec is None or spec.loader is None:
+                raise BindingException(f"The runtime module {module_name} is missing")
+            module = importlib.util.module_from_spec(spec)
+            sys.modules[spec.name] = module
+            spec.loader.exec_module(module)
+            setattr(package, module_name, module)
+        return package.base_classes
+
+
+@dataclasses.dataclass(eq=False)
+class BindingInstance:
+    """
+    A flag, field or assembly instance of a binding class. The class of the instance is created when it is first
+    read.
+
+    Attributes:
+        name (str): the effective name of the instance
+        attribute (str): the attribute of an object of the class that holds the instance, see attribute_layout()
+        json_key (str): the JSON property name of the instance
+        min_occurs (int): the minimum number of occurrences
+        max_occurs (int | None): the maximum number of occurrences, None if unbounded
+        group_as (dict[str, str | None] | None): the name, in_json and in_xml of the grouping of a repeatable instance
+        definition (ArtifactDefinition): the definition of the instance
+    """
+
+    __slots__ = (
+        "name",
+        "attribute",
+        "json_key",
+        "min_occurs",
+        "max_occurs",
+        "group_as",
+        "definition",
+        "_bindings",
+    )
+
+    name: str
+    attribute: str
+    json_key: str
+    min_occurs: int
+    max_occurs: int | None
+    group_as: dict[str, str | None] | None
+    definition: ArtifactDefinition
+    _bindings: SchemaBindings
+
+    @property
+    def binding(self) -> type:
+        """
+        The class of the instance's definition.
+        """
+        return self._bindings.binding(self.definition)
+
+    @property
+    def required(self) -> bool:
+        return self.min_occurs > 0
+
+    @property
+    def multiple(self) -> bool:
+        return self.max_occurs is None or self.max_occurs > 1
+
+
+class BindingModule:
+    """
+    The classes of the top-level definitions of one metaschema, or of the datatypes, by class name. A class is
+    created on first access and then kept as an attribute.
+    """
+
+    def __init__(
+        self,
+        bindings: SchemaBindings,
+        name: str,
+        members: dict[str, ArtifactDefinition | ArtifactDatatype],
+    ) -> None:
+        self._bindings = bindings
+        self._name = name
+        self._members = members
+
+    def __getattr__(self, name: str) -> type:
+        # only called when the attribute isn't set yet
+        member = self.__dict__["_members"].get(name)
+        if member is None:
+            raise AttributeError(f"Module {self._name} has no class {name}")
+        binding = self._bindings.binding(member)
+        setattr(self, name, binding)
+        return binding
+
+    def __dir__(self) -> list[str]:
+        return list(self._members)
+
+    def __repr__(self) -> str:
+        return f"<bindings module {self._name}>"
+
+
+class SchemaBindings:
+    """
+    The binding classes of a schema artifact, created on first access and cached.
+
+    The modules are attributes, named as in a generated package, e.g. bindings.oscal_catalog and bindings.datatypes.
+    A class can also be read from the bindings directly, e.g. bindings.Catalog, if no other module has a class with
+    the same name.
+    """
+
+    def __init__(
+        self,
+        artifact: SchemaArtifact,
+        base_classes: types.ModuleType,
+        slots: bool = False,
+    ):
+        """
+        Args:
+            artifact (SchemaArtifact): the loaded schema artifact
+            base_classes (types.ModuleType): the base_classes module the classes subclass
+            slots (bool, optional): Whether the flag, field and assembly classes have a __slots__ layout. Defaults
+                to False.
+        """
+        self.artifact = artifact
+        self.base_classes = base_classes
+        self.slots = slots
+
+        # the classes are keyed by the id of their definition or datatype, which the artifact keeps alive
+        self._classes: dict[int, type] = {}
+        # creating a class creates the class of its datatype, and of a datatype's parent, so the lock is reentrant
+        self._lock = threading.RLock()
+
+        self._datatype_names = {
+            datatype.name: datatype for datatype in artifact.datatypes
+        }
+        modules: dict[str, dict[str, ArtifactDefinition | ArtifactDatatype]] = {}
+        for definition in artifact.definitions:
+            if not definition.inline:
+                modules.setdefault(definition.module_name, {})[
+                    definition.class_name
+                ] = definition
+        modules["datatypes"] = dict(self._datatype_names)
+
+        self.modules = {
+            name: BindingModule(bindings=self, name=name, members=members)
+            for name, members in modules.items()
+        }
+        self._class_modules: dict[str, list[str]] = {}
+        for name, members in modules.items():
+            for class_name in members:
+                self._class_modules.setdefault(class_name, []).append(name)
+
+    def __getattr__(self, name: str) -> typing.Any:
+        # only called for names that aren't attributes, i.e. modules and classes
+        modules = self.__dict__.get("modules")
+        if modules is None:
+            raise AttributeError(name)
+        if name in modules:
+            return modules[name]
+        module_names = self._class_modules.get(name)
+        if module_names is None:
+            raise AttributeError(f"The schema has no module or class {name}")
+        if len(module_names) > 1:
+            raise AttributeError(
+                f"{name} is defined in the modules {', '.join(module_names)}, read it from one of them"
+            )
+        return getattr(modules[module_names[0]], name)
+
+    def __dir__(self) -> list[str]:
+        return [*self.modules, *self._class_modules]
+
+    @property
+    def classes(self) -> list[type]:
+        """
+        The classes created so far.
+        """
+        return list(self._classes.values())
+
+    def root(self, root_name: str) -> type:
+        """
+        Returns the class of a root assembly.
+
+        Args:
+            root_name (str): the root name of the assembly, e.g. "catalog"
+        """
+        definition = self.artifact.roots.get(root_name)
+        if definition is None:
+            raise BindingException(f"The schema has no root assembly {root_name}")
+        return self.binding(definition)
+
+    def binding(self, definition: ArtifactDefinition | ArtifactDatatype) -> type:
+        """
+        Returns the class of a definition or datatype, creating it the first time.
+
+        Args:
+            definition (ArtifactDefinition | ArtifactDatatype): a definition or datatype of the artifact
+        """
+        binding = self._classes.get(id(definition))
+        if binding is not None:
+            return binding
+        with self._lock:
+            # another thread may have created it while this one waited
+            binding = self._classes.get(id(definition))
+            if binding is None:
+                if isinstance(definition, ArtifactDatatype):
+                    binding = self._datatype_class(definition)
+                else:
+                    binding = self._definition_class(definition)
+                self._classes[id(definition)] = binding
+        return binding
+
+    def _datatype_class(self, datatype: ArtifactDatatype) -> type:
+        namespace: dict[str, typing.Any] = {"__module__": "datatypes"}
+        if datatype.kind == "complex":
+            namespace["__doc__"] = (
+                f"This class defines the complex {datatype.name} datatype from metaschema."
+            )
+            namespace["ELEMENTS"] = list(datatype.elements)
+            return type(datatype.name, (self.base_classes.ComplexDataType,), namespace)
+
+        namespace["__doc__"] = (
+            f"This class defines the simple type {datatype.name} from the metaschema specification."
+        )
+        if datatype.pattern is not None:
+            namespace["PATTERN"] = datatype.pattern
+        # a datatype derived from another metaschema datatype subclasses it
+        parent = self._datatype_names.get(datatype.base_type or "")
+        if parent is not None:
+            base = self.binding(parent)
+        else:
+            base = self.base_classes.SimpleDatatype
+            if datatype.base_type in _PYTHON_TYPES:
+                namespace["BASE_TYPE"] = _PYTHON_TYPES[datatype.base_type]
+        return type(datatype.name, (base,), namespace)
+
+    def _definition_class(self, definition: ArtifactDefinition) -> type:
+        namespace: dict[str, typing.Any] = {
+            "__module__": definition.module_name,
+            "name": definition.python_name,
+            "constraints": list(definition.constraints),
+        }
+        if definition.datatype is not None:
+            namespace["type"] = self.binding(definition.datatype)
+            namespace["__doc__"] = (
+                f"{definition.class_name} is a {definition.kind} of type {definition.datatype.name}."
+            )
+        else:
+            namespace["__doc__"] = (
+                f"{definition.class_name} is the {definition.kind} {definition.name}."
+            )
+
+        instances = [
+            *definition.flags,
+            *(
+                instance
+                for item in definition.model
+                for instance in (
+                    item.instances if isinstance(item, ArtifactChoice) else [item]
+                )
+            ),
+        ]
+        layout = attribute_layout(
+            definition.kind,
+            (
+                (
+                    instance.python_name,
+                    instance.min_occurs > 0,
+                    instance.max_occurs is None or instance.max_occurs > 1,
+                )
+                for instance in instances
+            ),
+        )
+        if definition.kind != "flag":
+            namespace["instances"] = {
+                instance.python_name: self._instance(instance, attribute)
+                for instance, attribute in zip(instances, layout.attributes)
+            }
+            namespace["choices"] = [
+                [instance.python_name for instance in item.instances]
+                for item in definition.model
+                if isinstance(item, ArtifactChoice)
+            ]
+        if self.slots:
+            namespace["__slots__"] = layout.slots
+        if len(layout.optional) > 0:
+            namespace["OPTIONAL_ATTRIBUTES"] = layout.optional
+        if len(layout.grouped) > 0:
+            namespace["GROUPED_ATTRIBUTES"] = layout.grouped
+        if definition.root_name is not None:
+            namespace["root_name"] = definition.root_name
+
+        return type(
+            definition.class_name,
+            (getattr(self.base_classes, _BASE_CLASSES[definition.kind]),),
+            namespace,
+        )
+
+    def _instance(self, instance: ArtifactInstance, attribute: str) -> BindingInstance:
+        return BindingInstance(
+            name=instance.name,
+            attribute=attribute,
+            json_key=instance.json_key,
+            min_occurs=instance.min_occurs,
+            max_occurs=instance.max_occurs,
+            group_as=instance.group_as,
+            definition=instance.definition,
+            _bindings=self,
+        )
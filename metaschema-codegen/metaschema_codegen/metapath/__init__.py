@@ -0,0 +1,95 @@
+"""
+The metapath package parses the metapath expressions in metaschema constraints.
+
+Metapath is a subset of XPath 3.1 with a few functions of its own, so expressions are parsed with the XPath 3.1
+parser of elementpath (which xmlschema depends on), with the metapath functions declared. The functions can be
+parsed and checked, but not yet evaluated.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import typing
+
+from elementpath.exceptions import ElementPathError
+from elementpath.xpath31 import XPath31Parser
+from elementpath.xpath_tokens import XPathToken
+
+# The functions metapath adds to XPath, with the sequence types of their arguments and result
+METAPATH_FUNCTIONS: dict[str, tuple[str, ...]] = {
+    "has-oscal-namespace": ("xs:string*", "xs:boolean"),
+}
+
+
+class MetapathException(Exception):
+    pass
+
+
+@dataclasses.dataclass(frozen=True)
+class Metapath:
+    """
+    A parsed metapath expression.
+
+    Attributes:
+        expression (str): the expression, as written in the metaschema
+        token (XPathToken | None): the root of the parse tree, None if the expression is invalid
+        error (str | None): why the expression is invalid, None if it is valid
+    """
+
+    expression: str
+    token: XPathToken | None = dataclasses.field(
+        default=None, compare=False, repr=False
+    )
+    error: str | None = None
+
+    @property
+    def valid(self) -> bool:
+        return self.error is None
+
+
+class MetapathCompiler:
+    """
+    Parses metapath expressions, each distinct expression once.
+
+    Attributes:
+        metapaths (dict[str, Metapath]): the expressions parsed so far, by expression
+    """
+
+    def __init__(self) -> None:
+        self.metapaths: dict[str, Metapath] = {}
+        self._parser = XPath31Parser()
+        for name, sequence_types in METAPATH_FUNCTIONS.items():
+            self._parser.external_function(
+                _unsupported(name),
+                name=name,
+                prefix="fn",
+                sequence_types=sequence_types,
+            )
+
+    def compile(self, expression: str) -> Metapath:
+        """
+        Returns the parsed expression. An invalid expression is returned with its error rather than raising, so that
+        one bad constraint doesn't prevent the others from being used.
+
+        Args:
+            expression (str): the metapath expression
+        """
+        metapath = self.metapaths.get(expression)
+        if metapath is None:
+            try:
+                metapath = Metapath(
+                    expression=expression, token=self._parser.parse(expression)
+                )
+            except (ElementPathError, SyntaxError, MetapathException) as e:
+                # a call with literal arguments is evaluated when it is parsed, which raises MetapathException
+                metapath = Metapath(expression=expression, error=str(e))
+            self.metapaths[expression] = metapath
+        return metapath
+
+
+def _unsupported(name: str) -> typing.Callable[[typing.Any], typing.Any]:
+    # elementpath reads the number of arguments from the signature of the callback
+    def evaluate(argument: typing.Any) -> typing.Any:
+        raise MetapathException(f"the metapath function {name}() can't be evaluated")
+
+    return evaluate
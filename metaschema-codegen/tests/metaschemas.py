@@ -0,0 +1,39 @@
+"""
+Builds the small metaschemas the tests run against, without parsing metaschema files.
+"""
+
+from __future__ import annotations
+
+from metaschema_codegen.core.datatypes import SimpleRestrictionDatatype
+from metaschema_codegen.core.schemaparse import Metaschema
+
+
+def metaschema(
+    file: str, schema_dict: dict, imports: list[str] | None = None
+) -> Metaschema:
+    """
+    Returns a metaschema with the definitions of schema_dict. Its short name is the name of its file, e.g. "catalog"
+    for catalog.xml, and its schema_dict has the short-name and schema-version of a parsed metaschema.
+    """
+    short_name = file.removesuffix(".xml")
+    return Metaschema(
+        file=file,
+        short_name=short_name,
+        imports=imports if imports is not None else [],
+        globals={},
+        roots=[],
+        schema_dict={"short-name": short_name, "schema-version": "1.0", **schema_dict},
+    )
+
+
+def string_datatype() -> SimpleRestrictionDatatype:
+    """
+    Returns the string datatype, which flags and fields have by default.
+    """
+    return SimpleRestrictionDatatype(
+        name="StringDatatype",
+        ref_name="string",
+        documentation=None,
+        base_type="string",
+        patterns={"xml": "\\S.*", "pcre": "\\S.*"},
+    )
@@ -0,0 +1,131 @@
+import subprocess
+import sys
+
+import pytest
+
+from metaschema_codegen.core.artifact import compile_artifact, write_artifact
+from metaschema_codegen.core.datatypes import SimpleRestrictionDatatype
+from metaschema_codegen.core.schemaparse import MetaSchemaSet
+from metaschema_codegen.databind.artifact import (
+    ARTIFACT_MAGIC,
+    ArtifactChoice,
+    ArtifactException,
+    load_artifact,
+)
+
+from tests.metaschemas import metaschema
+
+
+def _metaschema_set() -> MetaSchemaSet:
+    return MetaSchemaSet(
+        datatypes=[
+            SimpleRestrictionDatatype(
+                name="TokenDatatype",
+                ref_name="token",
+                documentation=None,
+                base_type="token",
+                patterns={"xml": "[a-z]+", "pcre": "[a-z]+"},
+            )
+        ],
+        metaschemas=[
+            metaschema(
+                "catalog.xml",
+                schema_dict={
+                    "define-flag": [{"@name": "id", "@as-type": "token"}],
+                    "define-assembly": [
+                        {
+                            "@name": "catalog",
+                            "root-name": "catalog",
+                            "flag": [{"@ref": "id", "@required": "yes"}],
+                            "model": {
+                                "assembly": [
+                                    {
+                                        "@ref": "group",
+                                        "@max-occurs": "unbounded",
+                                        "group-as": {"@name": "groups"},
+                                    }
+                                ],
+                                "choice": [{"assembly": [{"@ref": "group"}]}],
+                            },
+                            "constraint": {
+                                "is-unique": [
+                                    {
+                                        "@target": "group",
+                                        "key-field": [{"@target": "@id"}],
+                                    }
+                                ],
+                                "expect": [{"@target": "group", "@test": "@id"}],
+                            },
+                        },
+                        {"@name": "group", "flag": [{"@ref": "id"}]},
+                        {"@name": "unused"},
+                    ],
+                },
+            )
+        ],
+    )
+
+
+class TestSchemaArtifact:
+    def test_round_trip(self):
+        artifact = load_artifact(compile_artifact(_metaschema_set()))
+
+        catalog = artifact.roots["catalog"]
+        (flag,) = catalog.flags
+        assert flag.definition is artifact.top_level[("catalog.xml", "flag", "id")]
+        assert flag.min_occurs == 1
+        assert flag.definition.datatype.matches("abc")
+        assert not flag.definition.datatype.matches("ABC")
+
+        groups, choice = catalog.model
+        assert (
+            groups.definition
+            is artifact.top_level[("catalog.xml", "assembly", "group")]
+        )
+        assert (groups.json_key, groups.max_occurs) == ("groups", None)
+        assert isinstance(choice, ArtifactChoice)
+
+        is_unique, expect = catalog.constraints
+        ((key_field, pattern),) = is_unique.parameters["key_fields"]
+        assert key_field.tree == ("@", None, (("(name)", "id", ()),))
+        # the same expression is stored once
+        assert expect.target is is_unique.target
+        assert expect.parameters["test"] is key_field
+
+    def test_roots(self):
+        artifact = load_artifact(compile_artifact(_metaschema_set(), roots=["catalog"]))
+        assert ("catalog.xml", "assembly", "unused") not in artifact.top_level
+        assert len(artifact.definitions) == 3
+
+    def test_integrity(self, tmp_path):
+        contents = bytearray(compile_artifact(_metaschema_set()))
+        path = tmp_path.joinpath("schema.msa")
+        write_artifact(path, bytes(contents))
+        assert load_artifact(path).library_version
+
+        contents[-1] ^= 0xFF
+        with pytest.raises(ArtifactException, match="corrupt"):
+            load_artifact(bytes(contents))
+
+        contents[len(ARTIFACT_MAGIC) + 1] += 1
+        with pytest.raises(ArtifactException, match="format version"):
+            load_artifact(bytes(contents))
+
+    def test_standard_library_only(self, tmp_path):
+        path = tmp_path.joinpath("schema.msa")
+        write_artifact(path, compile_artifact(_metaschema_set()))
+
+        loaded_modules = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import sys\n"
+                "from metaschema_codegen.databind.artifact import load_artifact\n"
+                f"load_artifact({str(path)!r})\n"
+                "print(sorted(m for m in ('xmlschema', 'lxml', 'elementpath', 'jinja2') if m in sys.modules))",
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        assert loaded_modules == "[]"
@@ -0,0 +1,137 @@
+import pytest
+
+from metaschema_codegen.core.artifact import compile_artifact
+from metaschema_codegen.core.datatypes import SimpleRestrictionDatatype
+from metaschema_codegen.core.schemaparse import MetaSchemaSet
+from metaschema_codegen.databind.bindings import (
+    BindingException,
+    load_bindings,
+)
+
+from tests.metaschemas import metaschema, string_datatype
+
+
+def _metaschema_set() -> MetaSchemaSet:
+    return MetaSchemaSet(
+        datatypes=[
+            string_datatype(),
+            SimpleRestrictionDatatype(
+                name="TokenDatatype",
+                ref_name="token",
+                documentation=None,
+                base_type="StringDatatype",
+                patterns={"xml": "[a-z]+", "pcre": "[a-z]+"},
+            ),
+        ],
+        metaschemas=[
+            metaschema(
+                "catalog.xml",
+                schema_dict={
+                    "define-flag": [
+                        {"@name": "id", "@as-type": "token"},
+                        {"@name": "name", "@as-type": "token"},
+                    ],
+                    "define-assembly": [
+                        {
+                            "@name": "catalog",
+                            "formal-name": "Catalog",
+                            "root-name": "catalog",
+                            "flag": [{"@ref": "id", "@required": "yes"}],
+                            "model": {
+                                "assembly": [
+                                    {
+                                        "@ref": "group",
+                                        "@max-occurs": "unbounded",
+                                        "group-as": {"@name": "groups"},
+                                    }
+                                ]
+                            },
+                        },
+                        {
+                            "@name": "group",
+                            "formal-name": "Group",
+                            "flag": [{"@ref": "id"}, {"@ref": "name"}],
+                        },
+                    ],
+                },
+            ),
+            metaschema(
+                "profile.xml",
+                schema_dict={
+                    "define-assembly": [{"@name": "group", "formal-name": "Group"}]
+                },
+            ),
+        ],
+    )
+
+
+def _concrete(binding: type) -> type:
+    # the base classes don't implement serialization yet, so the abstract methods are filled in to create objects
+    return type(
+        binding.__name__,
+        (binding,),
+        {"__slots__": (), **{name: None for name in binding.__abstractmethods__}},
+    )
+
+
+class TestSchemaBindings:
+    def test_lazy_classes(self):
+        bindings = load_bindings(_metaschema_set())
+        assert bindings.classes == []
+
+        catalog = bindings.Catalog
+        assert issubclass(catalog, bindings.base_classes.Assembly)
+        assert catalog.root_name == "catalog"
+        assert bindings.root("catalog") is catalog
+        assert bindings.catalog.Catalog is catalog
+        # creating a class doesn't create the classes of its instances
+        assert bindings.classes == [catalog]
+
+        groups = catalog.instances["group"]
+        assert (groups.json_key, groups.required, groups.multiple) == (
+            "groups",
+            False,
+            True,
+        )
+        assert groups.binding is bindings.catalog.Group
+        assert groups.binding is not bindings.profile.Group
+
+        id_flag = catalog.instances["id"].binding
+        assert issubclass(id_flag, bindings.base_classes.Flag)
+        assert id_flag.type is bindings.datatypes.TokenDatatype
+        assert issubclass(id_flag.type, bindings.datatypes.StringDatatype)
+        assert id_flag.type.PATTERN == "[a-z]+"
+        assert bindings.datatypes.StringDatatype.BASE_TYPE is str
+
+    def test_lookup_errors(self):
+        bindings = load_bindings(compile_artifact(_metaschema_set()))
+        with pytest.raises(AttributeError, match="catalog, profile"):
+            bindings.Group
+        with pytest.raises(AttributeError, match="no module or class"):
+            bindings.Undefined
+        with pytest.raises(BindingException, match="no root assembly"):
+            bindings.root("profile")
+
+    def test_slots(self):
+        bindings = load_bindings(_metaschema_set(), slots=True)
+        catalog = bindings.Catalog
+        group = catalog.instances["group"].binding
+        id_flag = catalog.instances["id"].binding
+        for binding in (catalog, group, id_flag):
+            assert binding.__dictoffset__ == 0
+        assert catalog.__slots__ == ("id", "group")
+        assert id_flag.__slots__ == ("value",)
+        # the name flag can't shadow the name of the class
+        assert group.__slots__ == ("id", "name_")
+        assert group.instances["name"].attribute == "name_"
+
+        # optional attributes default to None, grouped ones to a new list
+        catalog_object = _concrete(catalog)(id=_concrete(id_flag)(value="cat"))
+        assert catalog_object.group == [] and catalog_object.id.value == "cat"
+        assert _concrete(group)().name_ is None
+        with pytest.raises(AttributeError):
+            catalog_object.undefined = None
+
+        # without slots, the objects have the same attributes in a __dict__
+        catalog_object = _concrete(load_bindings(_metaschema_set()).Catalog)()
+        assert vars(catalog_object) == {"group": []}
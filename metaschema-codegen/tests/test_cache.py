@@ -0,0 +1,99 @@
+import threading
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+from metaschema_codegen.core.cache import SchemaCache, SchemaCacheException
+
+MAIN_XSD = b"""<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema" targetNamespace="urn:test" xmlns="urn:test" elementFormDefault="qualified">
+  <xs:include schemaLocation="types.xsd"/>
+  <xs:element name="root" type="RootType"/>
+</xs:schema>"""
+
+TYPES_XSD = b"""<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema" targetNamespace="urn:test" xmlns="urn:test" elementFormDefault="qualified">
+  <xs:complexType name="RootType"><xs:sequence><xs:element name="a" type="xs:string"/></xs:sequence></xs:complexType>
+</xs:schema>"""
+
+
+class XsdHandler(BaseHTTPRequestHandler):
+    files = {"/xml/main.xsd": MAIN_XSD, "/xml/types.xsd": TYPES_XSD}
+    requests: list[tuple[str, int]] = []
+
+    def do_GET(self):
+        contents = self.files.get(self.path)
+        if contents is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+
+        etag = f'"{hash(contents)}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.requests.append((self.path, 304))
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        self.requests.append((self.path, 200))
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(contents)))
+        self.end_headers()
+        self.wfile.write(contents)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def xsd_server():
+    server = HTTPServer(("127.0.0.1", 0), XsdHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    XsdHandler.requests.clear()
+    yield f"http://127.0.0.1:{server.server_port}/xml/"
+    server.shutdown()
+
+
+class TestSchemaCache:
+    def test_cold_then_warm(self, tmp_path, xsd_server):
+        cold = SchemaCache(cache_dir=tmp_path).load_schema(xsd_server + "main.xsd")
+        warm = SchemaCache(cache_dir=tmp_path).load_schema(xsd_server + "main.xsd")
+
+        assert cold.warm is False and warm.warm is True
+        assert cold.digest == warm.digest
+        assert "RootType" in warm.schema.types
+
+    def test_revalidation(self, tmp_path, xsd_server):
+        SchemaCache(cache_dir=tmp_path).load_schema(xsd_server + "main.xsd")
+        SchemaCache(cache_dir=tmp_path).load_schema(xsd_server + "main.xsd")
+
+        assert XsdHandler.requests.count(("/xml/main.xsd", 304)) == 1
+        assert XsdHandler.requests.count(("/xml/types.xsd", 304)) == 1
+
+    def test_offline(self, tmp_path, xsd_server):
+        SchemaCache(cache_dir=tmp_path).load_schema(xsd_server + "main.xsd")
+        XsdHandler.requests.clear()
+
+        offline = SchemaCache(cache_dir=tmp_path, offline=True).load_schema(
+            xsd_server + "main.xsd"
+        )
+
+        assert offline.warm is True
+        assert XsdHandler.requests == []
+
+    def test_offline_without_cache(self, tmp_path):
+        with pytest.raises(SchemaCacheException):
+            SchemaCache(cache_dir=tmp_path, offline=True).fetch(
+                "http://127.0.0.1:9/xml/metaschema.xsd"
+            )
+
+    def test_local_schema(self, tmp_path):
+        xsd_dir = tmp_path.joinpath("xsd")
+        xsd_dir.mkdir()
+        xsd_dir.joinpath("main.xsd").write_bytes(MAIN_XSD)
+        xsd_dir.joinpath("types.xsd").write_bytes(TYPES_XSD)
+
+        cached = SchemaCache(cache_dir=tmp_path.joinpath("cache")).load_schema(
+            str(xsd_dir.joinpath("main.xsd"))
+        )
+        assert "RootType" in cached.schema.types
@@ -1,6 +1,5 @@
 from metaschema_codegen.codegen.python.codegen import (
     PackageGenerator,
-    MetaschemaModuleGenerator,
     DatatypeModuleGenerator,
     SimpleDatatypeClassGenerator,
 )
@@ -19,13 +18,13 @@ class TestPackageGenerator:
         )
 
     def test_class_generator(self, generated_package):
-        assert isinstance(generated_package.module_generators, list)
+        assert isinstance(generated_package.rendered_modules, list)
 
     def test_classes(self, generated_package):
-        for m_gen in generated_package.module_generators:
-            assert isinstance(m_gen, MetaschemaModuleGenerator) or isinstance(
-                m_gen, DatatypeModuleGenerator
-            )
+        for module_name in generated_package.rendered_modules:
+            assert generated_package.destination.joinpath(
+                generated_package.package_name, f"{module_name}.py"
+            ).is_file()
 
 
 class TestDatatypesGenerator:
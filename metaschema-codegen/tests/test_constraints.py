@@ -0,0 +1,85 @@
+from metaschema_codegen.core.schemaparse import MetaSchemaSet
+from metaschema_codegen.metapath import MetapathCompiler
+
+from tests.metaschemas import metaschema
+
+
+def _metaschema_set() -> MetaSchemaSet:
+    return MetaSchemaSet(
+        metaschemas=[
+            metaschema(
+                "catalog.xml",
+                schema_dict={
+                    "define-assembly": [
+                        {
+                            "@name": "catalog",
+                            "constraint": {
+                                "allowed-values": [
+                                    {
+                                        "@target": "prop[has-oscal-namespace('http://csrc.nist.gov/ns/oscal')]/@name",
+                                        "enum": [{"@value": "label"}],
+                                    }
+                                ],
+                                "index": [
+                                    {
+                                        "@name": "index-groups",
+                                        "@target": "group",
+                                        "key-field": [{"@target": "@id"}],
+                                    }
+                                ],
+                            },
+                            "model": {
+                                "define-field": [
+                                    {
+                                        "@name": "title",
+                                        "constraint": {
+                                            "expect": [
+                                                {"@target": "group", "@test": "@id ="}
+                                            ]
+                                        },
+                                    }
+                                ]
+                            },
+                        }
+                    ]
+                },
+            )
+        ]
+    )
+
+
+class TestConstraintTable:
+    def test_entries(self):
+        metaschema_set = _metaschema_set()
+        table = metaschema_set.constraints
+        (catalog,) = metaschema_set.graph.modules["catalog.xml"]
+
+        allowed_values, index = table.constraints(catalog)
+        assert allowed_values.kind == "allowed-values"
+        assert allowed_values.target.valid
+        assert allowed_values.parameters["allow_other"] is False
+        ((key_field, pattern),) = index.parameters["key_fields"]
+        assert key_field.expression == "@id" and pattern is None
+
+        # the inline field's constraint is in the table too, and the same expression is parsed once
+        (expect,) = table.constraints(catalog.model[0].target)
+        assert expect.target is index.target
+        assert len(table.entries) == 3
+        assert set(table.metapaths) == {
+            "prop[has-oscal-namespace('http://csrc.nist.gov/ns/oscal')]/@name",
+            "group",
+            "@id",
+            "@id =",
+        }
+
+        (invalid,) = table.invalid
+        assert (invalid.definition, invalid.constraint) == ("title", "expect")
+        assert invalid.metapath.expression == "@id ="
+
+    def test_compiler(self):
+        compiler = MetapathCompiler()
+        assert compiler.compile("..") is compiler.compile("..")
+        assert "unknown function" in compiler.compile("undefined-function()").error
+        # a metaschema function with literal arguments is evaluated statically, and can't be
+        literal_call = compiler.compile("has-oscal-namespace('x')")
+        assert not literal_call.valid and "can't be evaluated" in literal_call.error
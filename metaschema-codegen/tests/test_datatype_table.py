@@ -0,0 +1,147 @@
+import json
+
+import xmlschema
+
+from metaschema_codegen.core import schemaparse
+from metaschema_codegen.core.datatypes import (
+    ComplexDataType,
+    DatatypeTable,
+    SimpleRestrictionDatatype,
+    build_datatype_table,
+    dump_datatype_table,
+    introspect_datatypes,
+    load_datatype_table,
+)
+
+SCHEMA_XSD = """<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema">
+  <xs:simpleType name="TokenDatatype">
+    <xs:annotation><xs:documentation>A non-colonized name.</xs:documentation></xs:annotation>
+    <xs:restriction base="xs:token"><xs:pattern value="[a-z][a-z\\-]*"/></xs:restriction>
+  </xs:simpleType>
+  <xs:simpleType name="Unused"><xs:restriction base="xs:string"/></xs:simpleType>
+  <xs:complexType name="MarkupLineDatatype" mixed="true">
+    <xs:choice minOccurs="0" maxOccurs="unbounded"><xs:element name="code" type="xs:string"/><xs:element name="em" type="xs:string"/></xs:choice>
+  </xs:complexType>
+</xs:schema>"""
+
+# A metaschema xsd the parser can run with: the datatypes, and an element for the metaschema documents
+PARSER_XSD = """<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema">
+  <xs:simpleType name="TokenDatatype">
+    <xs:annotation><xs:documentation>{documentation}</xs:documentation></xs:annotation>
+    <xs:restriction base="xs:token"><xs:pattern value="[a-z][a-z\\-]*"/></xs:restriction>
+  </xs:simpleType>
+  <xs:element name="METASCHEMA"><xs:complexType><xs:sequence>
+    <xs:element name="short-name" type="TokenDatatype"/>
+  </xs:sequence></xs:complexType></xs:element>
+</xs:schema>"""
+
+
+def _table() -> DatatypeTable:
+    return DatatypeTable(
+        schema_location="metaschema.xsd",
+        xsd_digest="abc",
+        datatypes=introspect_datatypes(xmlschema.XMLSchema(SCHEMA_XSD)),
+    )
+
+
+class TestDatatypeTable:
+    def test_introspect(self):
+        token, markup_line = _table().datatypes
+
+        assert isinstance(token, SimpleRestrictionDatatype)
+        assert token.ref_name == "token"
+        assert token.base_type == "token"
+        assert token.documentation == "A non-colonized name."
+        assert token.patterns["xml"] == "[a-z][a-z\\-]*"
+
+        assert isinstance(markup_line, ComplexDataType)
+        assert markup_line.elements == ["code", "em"]
+
+    def test_round_trip(self):
+        table = _table()
+        assert load_datatype_table(dump_datatype_table(table)) == table
+
+    def test_other_version(self):
+        contents = json.loads(dump_datatype_table(_table()))
+        contents["version"] += 1
+        assert load_datatype_table(json.dumps(contents).encode()) is None
+        assert load_datatype_table(b"not json") is None
+
+    def test_matches(self):
+        table = _table()
+        assert table.matches("copy/of/metaschema.xsd", "abc")
+        # the xsd at the location the table was built from has changed
+        assert not table.matches("metaschema.xsd", "changed")
+        assert not table.matches("other.xsd", "other")
+
+
+class TestPackagedTable:
+    def _parse(self, tmp_path, monkeypatch, schema_location):
+        """
+        Parses a metaschema with the table built from tmp_path/metaschema.xsd as the packaged table, and returns the
+        datatypes and the number of times the xsd was introspected.
+        """
+        table_file = tmp_path.joinpath("datatypes.json")
+        if not table_file.exists():
+            table = build_datatype_table(
+                schema_location=str(tmp_path.joinpath("metaschema.xsd")),
+                schema_base_url=None,
+                cache_dir=tmp_path.joinpath("build"),
+            )
+            table_file.write_bytes(dump_datatype_table(table))
+        monkeypatch.setattr(
+            schemaparse,
+            "packaged_datatype_table",
+            lambda: load_datatype_table(table_file.read_bytes()),
+        )
+        introspected = []
+
+        def _introspect_datatypes(metaschema_schema):
+            introspected.append(metaschema_schema)
+            return introspect_datatypes(metaschema_schema)
+
+        monkeypatch.setattr(schemaparse, "introspect_datatypes", _introspect_datatypes)
+
+        metaschema_file = tmp_path.joinpath("test.xml")
+        metaschema_file.write_text(
+            "<METASCHEMA><short-name>test</short-name></METASCHEMA>"
+        )
+        parser = schemaparse.MetaschemaSetParser(
+            metaschema_location=str(metaschema_file),
+            schema_location=str(schema_location),
+            schema_base_url=None,
+            cache_dir=tmp_path.joinpath("cache"),
+            use_snapshot=False,
+            lazy=True,
+        )
+        return parser.metaschema_set.datatypes, len(introspected)
+
+    def test_matching_xsd(self, tmp_path, monkeypatch):
+        schema_location = tmp_path.joinpath("metaschema.xsd")
+        schema_location.write_text(PARSER_XSD.format(documentation="A token."))
+
+        datatypes, introspected = self._parse(tmp_path, monkeypatch, schema_location)
+        assert introspected == 0
+        assert [datatype.documentation for datatype in datatypes] == ["A token."]
+
+    def test_other_xsd(self, tmp_path, monkeypatch):
+        tmp_path.joinpath("metaschema.xsd").write_text(
+            PARSER_XSD.format(documentation="A token.")
+        )
+        schema_location = tmp_path.joinpath("other.xsd")
+        schema_location.write_text(PARSER_XSD.format(documentation="Another token."))
+
+        datatypes, introspected = self._parse(tmp_path, monkeypatch, schema_location)
+        assert introspected == 1
+        assert [datatype.documentation for datatype in datatypes] == ["Another token."]
+
+    def test_changed_xsd(self, tmp_path, monkeypatch):
+        schema_location = tmp_path.joinpath("metaschema.xsd")
+        schema_location.write_text(PARSER_XSD.format(documentation="A token."))
+        self._parse(tmp_path, monkeypatch, schema_location)
+
+        # the xsd the table was built from changes, e.g. upstream
+        schema_location.write_text(PARSER_XSD.format(documentation="A new token."))
+        datatypes, introspected = self._parse(tmp_path, monkeypatch, schema_location)
+        assert introspected == 1
+        assert [datatype.documentation for datatype in datatypes] == ["A new token."]
@@ -0,0 +1,84 @@
+import pytest
+from lxml import etree
+import xmlschema
+
+from metaschema_codegen.core.extract import ElementExtractor
+
+SCHEMA_XSD = """<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema" targetNamespace="urn:test" xmlns="urn:test" elementFormDefault="qualified">
+  <xs:simpleType name="Token"><xs:restriction base="xs:token"><xs:pattern value="[a-z][a-z\\-]*"/></xs:restriction></xs:simpleType>
+  <xs:simpleType name="MaxOccurs"><xs:union memberTypes="xs:positiveInteger"><xs:simpleType><xs:restriction base="xs:token"><xs:enumeration value="unbounded"/></xs:restriction></xs:simpleType></xs:union></xs:simpleType>
+  <xs:complexType name="MarkupLine" mixed="true"><xs:choice minOccurs="0" maxOccurs="unbounded"><xs:element name="code" type="xs:string"/><xs:element name="em" type="MarkupLine"/></xs:choice></xs:complexType>
+  <xs:complexType name="Remarks" mixed="true"><xs:sequence><xs:element name="p" type="MarkupLine" minOccurs="0" maxOccurs="unbounded"/></xs:sequence><xs:attribute name="class" type="Token"/></xs:complexType>
+  <xs:complexType name="Deprecated"><xs:simpleContent><xs:extension base="xs:string"><xs:attribute name="since" type="xs:string"/></xs:extension></xs:simpleContent></xs:complexType>
+  <xs:complexType name="Example"><xs:sequence><xs:element name="description" type="MarkupLine" minOccurs="0"/><xs:any namespace="##other" processContents="lax" minOccurs="0" maxOccurs="unbounded"/></xs:sequence></xs:complexType>
+  <xs:complexType name="Assembly"><xs:sequence>
+    <xs:element name="formal-name" type="xs:string" minOccurs="0"/>
+    <xs:element name="use-name" type="Token" minOccurs="0"/>
+    <xs:element name="deprecated" type="Deprecated" minOccurs="0"/>
+    <xs:element name="example" type="Example" minOccurs="0" maxOccurs="unbounded"/>
+    <xs:element name="remarks" type="Remarks" minOccurs="0"/>
+    <xs:choice minOccurs="0" maxOccurs="unbounded"><xs:element name="index" type="xs:integer"/><xs:element name="flag" type="xs:boolean"/></xs:choice>
+  </xs:sequence>
+  <xs:attribute name="name" type="Token" use="required"/><xs:attribute name="min-occurs" type="xs:nonNegativeInteger" default="0"/><xs:attribute name="max-occurs" type="MaxOccurs" default="1"/></xs:complexType>
+  <xs:element name="METASCHEMA"><xs:complexType><xs:sequence>
+    <xs:element name="short-name" type="Token"/>
+    <xs:element name="define-assembly" type="Assembly" minOccurs="0" maxOccurs="unbounded"/>
+  </xs:sequence><xs:attribute name="abstract" type="xs:token" default="no"/></xs:complexType></xs:element>
+</xs:schema>"""
+
+METASCHEMA_XML = b"""<?xml version="1.0"?>
+<METASCHEMA xmlns="urn:test" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">
+  <!-- a comment -->
+  <short-name>  test  </short-name>
+  <define-assembly name="one" max-occurs="unbounded">
+    <formal-name>  One  </formal-name>
+    <use-name> first </use-name>
+    <deprecated since="1.0">  Use two  </deprecated>
+    <example>
+      <description>An <code>example</code> of one</description>
+      <o:one xmlns:o="urn:other" id="x"><o:item>a</o:item><o:item/></o:one>
+    </example>
+    <remarks class="note"><p>See <em>also <em>two</em></em>.</p></remarks>
+    <index>1</index><flag>true</flag><index> 2 </index>
+  </define-assembly>
+  <define-assembly name="two" min-occurs="1" max-occurs="3"><remarks>  Plain text  </remarks></define-assembly>
+</METASCHEMA>"""
+
+
+class TestElementExtractor:
+    def test_matches_to_dict(self):
+        schema_xsd = xmlschema.XMLSchema(SCHEMA_XSD)
+        metaschema_etree = etree.fromstring(METASCHEMA_XML).getroottree()
+
+        expected = schema_xsd.to_dict(metaschema_etree)
+        extracted = ElementExtractor(schema_xsd).extract(metaschema_etree)
+
+        assert extracted == expected
+        # Generators iterate over the dicts, so the order of the keys must match as well
+        assert list(extracted["define-assembly"][0].keys()) == list(
+            expected["define-assembly"][0].keys()
+        )
+
+    def test_reuse(self):
+        schema_xsd = xmlschema.XMLSchema(SCHEMA_XSD)
+        extractor = ElementExtractor(schema_xsd)
+        metaschema_etree = etree.fromstring(METASCHEMA_XML).getroottree()
+
+        assert extractor.extract(metaschema_etree) == extractor.extract(
+            metaschema_etree
+        )
+
+    def test_fallback_validation(self):
+        schema_xsd = xmlschema.XMLSchema(
+            """<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema">
+  <xs:element name="M"><xs:complexType><xs:sequence><xs:element name="a" type="xs:string"/></xs:sequence></xs:complexType></xs:element>
+</xs:schema>"""
+        )
+        # the unexpected element is decoded by to_dict(), which only validates it if the parse validates
+        metaschema_etree = etree.fromstring("<M><a>x</a><b>y</b></M>").getroottree()
+
+        with pytest.raises(xmlschema.XMLSchemaValidationError):
+            ElementExtractor(schema_xsd).extract(metaschema_etree)
+        for validation in ("lax", "skip"):
+            extractor = ElementExtractor(schema_xsd, validation=validation)
+            assert extractor.extract(metaschema_etree) == {"a": "x"}
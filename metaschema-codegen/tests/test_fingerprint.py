@@ -0,0 +1,76 @@
+from metaschema_codegen.core.fingerprint import diff
+from metaschema_codegen.core.schemaparse import MetaSchemaSet
+
+from tests.metaschemas import metaschema
+
+
+def _metaschema_set(title_formal_name: str = "Title") -> MetaSchemaSet:
+    return MetaSchemaSet(
+        metaschemas=[
+            metaschema(
+                "catalog.xml",
+                schema_dict={
+                    "define-field": [
+                        {"@name": "title", "formal-name": title_formal_name}
+                    ],
+                    "define-assembly": [
+                        {
+                            "@name": "catalog",
+                            "model": {"assembly": [{"@ref": "group"}]},
+                        },
+                        {
+                            # group and part contain each other
+                            "@name": "group",
+                            "model": {"assembly": [{"@ref": "part"}]},
+                        },
+                        {
+                            "@name": "part",
+                            "model": {
+                                "field": [{"@ref": "title"}],
+                                "assembly": [{"@ref": "group"}],
+                            },
+                            "constraint": {
+                                "expect": [{"@target": ".", "@test": "title"}]
+                            },
+                        },
+                        {"@name": "back-matter"},
+                    ],
+                },
+            )
+        ]
+    )
+
+
+class TestFingerprints:
+    def test_stable(self):
+        fingerprints = _metaschema_set().fingerprints
+        assert fingerprints.definitions == _metaschema_set().fingerprints.definitions
+
+        part = fingerprints[("catalog.xml", "assembly", "part")]
+        assert len(part.constraints) == 1
+        assert part.fingerprint != part.content
+
+    def test_diff(self):
+        old_set = _metaschema_set()
+        assert not diff(old_set, _metaschema_set())
+
+        result = diff(old_set, _metaschema_set(title_formal_name="Heading"))
+
+        # the change propagates to everything that depends on title, through the cycle of group and part
+        assert result.modified == [("catalog.xml", "field", "title")]
+        assert result.changed == [
+            ("catalog.xml", "field", "title"),
+            ("catalog.xml", "assembly", "catalog"),
+            ("catalog.xml", "assembly", "group"),
+            ("catalog.xml", "assembly", "part"),
+        ]
+        assert result.added == result.removed == []
+
+    def test_added_and_removed(self):
+        old_set = _metaschema_set()
+        new_set = _metaschema_set()
+        new_set.metaschemas[0].definitions.assemblies.pop()
+
+        result = diff(old_set, new_set)
+        assert result.removed == [("catalog.xml", "assembly", "back-matter")]
+        assert result.changed == []
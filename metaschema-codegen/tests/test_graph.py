@@ -0,0 +1,133 @@
+import pytest
+
+from metaschema_codegen.core.datatypes import SimpleRestrictionDatatype
+from metaschema_codegen.core.graph import (
+    ChoiceEdge,
+    DefinitionGraphException,
+    UnresolvedReference,
+)
+from metaschema_codegen.core.schemaparse import MetaSchemaSet
+
+from tests.metaschemas import metaschema
+
+
+def _metaschema_set() -> MetaSchemaSet:
+    return MetaSchemaSet(
+        datatypes=[
+            SimpleRestrictionDatatype(
+                name="DateTimeDatatype",
+                ref_name="date-time",
+                documentation=None,
+                base_type="dateTime",
+                patterns={},
+            )
+        ],
+        metaschemas=[
+            metaschema(
+                "catalog.xml",
+                imports=["common.xml"],
+                schema_dict={
+                    "define-assembly": [
+                        {
+                            "@name": "catalog",
+                            "formal-name": "Catalog",
+                            "flag": [{"@ref": "uuid", "@required": "yes"}],
+                            "model": {
+                                "field": [{"@ref": "title", "use-name": "name"}],
+                                "assembly": [
+                                    {
+                                        "@ref": "part",
+                                        "@max-occurs": "unbounded",
+                                        "group-as": {"@name": "parts"},
+                                    },
+                                    {"@ref": "missing"},
+                                ],
+                                "choice": [
+                                    {
+                                        "define-field": [
+                                            {"@name": "a", "@as-type": "date-time"}
+                                        ],
+                                        "field": [{"@ref": "title"}],
+                                    }
+                                ],
+                            },
+                        }
+                    ]
+                },
+            ),
+            metaschema(
+                "common.xml",
+                schema_dict={
+                    "define-flag": [{"@name": "uuid", "@as-type": "date-time"}],
+                    "define-field": [
+                        {
+                            "@name": "title",
+                            "define-flag": [{"@name": "lang", "@as-type": "token"}],
+                        }
+                    ],
+                    "define-assembly": [{"@name": "part"}],
+                },
+            ),
+        ],
+    )
+
+
+class TestDefinitionGraph:
+    def test_resolved_instances(self):
+        metaschema_set = _metaschema_set()
+        graph = metaschema_set.graph
+        (catalog,) = graph.modules["catalog.xml"]
+        uuid, title, part = graph.modules["common.xml"]
+
+        # every instance points at the node of its definition, imported or not
+        (flag,) = catalog.flags
+        assert flag.target is uuid
+        assert flag.required and flag.min_occurs == 1
+        assert uuid.datatype_class == "DateTimeDatatype"
+
+        name, parts, choice = catalog.model
+        assert name.target is title
+        assert (name.effective_name, name.json_key) == ("name", "name")
+        assert parts.target is part
+        assert parts.multiple and parts.max_occurs is None
+        assert parts.json_key == "parts"
+
+        # inline definitions get their own nodes, in the module of their parent
+        assert isinstance(choice, ChoiceEdge)
+        inline, referenced = choice.instances
+        assert inline.target.inline and inline.target.module_name == "catalog"
+        assert graph.node(inline.definition) is inline.target
+        assert referenced.target is title
+        (lang,) = title.flags
+        assert lang.target.inline and lang.target.datatype_class is None
+
+        assert graph.unresolved == [
+            UnresolvedReference(schema="catalog.xml", kind="assembly", ref="missing")
+        ]
+
+    def test_cached(self):
+        metaschema_set = _metaschema_set()
+        graph = metaschema_set.graph
+        assert metaschema_set.graph is graph
+
+        metaschema_set.metaschemas = list(metaschema_set.metaschemas)[:1]
+        assert metaschema_set.graph is not graph
+
+    def test_reachable(self):
+        metaschema_set = _metaschema_set()
+        metaschema_set.metaschemas[0].definitions.assemblies[0].root_name = "catalog"
+        graph = metaschema_set.graph
+        (catalog,) = graph.modules["catalog.xml"]
+        uuid, title, part = graph.modules["common.xml"]
+
+        reachable = graph.reachable(["catalog"])
+        assert reachable.roots == [catalog]
+        assert catalog in reachable and uuid in reachable and title in reachable
+        assert title.flags[0].target in reachable
+        assert reachable.schemas == {"catalog.xml", "common.xml"}
+        assert [datatype.name for datatype in reachable.datatypes] == [
+            "DateTimeDatatype"
+        ]
+
+        with pytest.raises(DefinitionGraphException):
+            graph.reachable(["profile"])
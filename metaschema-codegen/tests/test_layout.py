@@ -0,0 +1,12 @@
+from metaschema_codegen.core.layout import attribute_layout
+
+
+class TestAttributeLayout:
+    def test_layout(self):
+        layout = attribute_layout(
+            "field",
+            [("value", False, False), ("value", True, False), ("part", False, True)],
+        )
+        assert layout.slots == ("value", "value_", "value__", "part")
+        assert layout.optional == ("value_",)
+        assert layout.grouped == ("part",)
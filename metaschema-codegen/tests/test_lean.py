@@ -0,0 +1,55 @@
+import sys
+
+import xmlschema
+from lxml import etree
+
+from metaschema_codegen.core.lean import DocumentationRef, make_lean
+
+SCHEMA_XSD = """<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema">
+  <xs:complexType name="Markup" mixed="true"><xs:sequence><xs:element name="em" type="xs:string" minOccurs="0" maxOccurs="unbounded"/></xs:sequence></xs:complexType>
+  <xs:complexType name="Definition"><xs:sequence>
+    <xs:element name="formal-name" type="xs:string" minOccurs="0"/>
+    <xs:element name="description" type="Markup" minOccurs="0"/>
+    <xs:element name="remarks" type="Markup" minOccurs="0"/>
+  </xs:sequence><xs:attribute name="name" type="xs:string"/></xs:complexType>
+  <xs:element name="METASCHEMA"><xs:complexType><xs:sequence>
+    <xs:element name="short-name" type="xs:string"/>
+    <xs:element name="define-flag" type="Definition" minOccurs="0" maxOccurs="unbounded"/>
+  </xs:sequence></xs:complexType></xs:element>
+</xs:schema>"""
+
+METASCHEMA_XML = """<METASCHEMA>
+  <short-name>test</short-name>
+  <define-flag name="one"><formal-name>One</formal-name></define-flag>
+  <define-flag name="two">
+    <formal-name>Two</formal-name>
+    <description>The <em>second</em> flag</description>
+    <remarks>More about it</remarks>
+  </define-flag>
+</METASCHEMA>"""
+
+
+class TestMakeLean:
+    def test_documentation_refs(self, tmp_path):
+        file = tmp_path.joinpath("test.xml")
+        file.write_text(METASCHEMA_XML)
+        schema_xsd = xmlschema.XMLSchema(SCHEMA_XSD)
+        metaschema_etree = etree.parse(str(file))
+        schema_dict = schema_xsd.to_dict(metaschema_etree)
+
+        lean = make_lean(schema_dict, metaschema_etree, file)
+
+        description = lean["define-flag"][1]["description"]
+        assert description == DocumentationRef(
+            file=str(file), line=6, path=("define-flag", 1, "description")
+        )
+        assert not description
+        assert lean["define-flag"][1]["remarks"].line == 7
+        assert (
+            description.load(schema_xsd) == schema_dict["define-flag"][1]["description"]
+        )
+
+        # Everything but the documentation is kept, and the strings are interned
+        assert lean["define-flag"][0] == schema_dict["define-flag"][0]
+        assert lean["define-flag"][1]["formal-name"] is sys.intern("Two")
+        assert "description" not in lean["define-flag"][0]
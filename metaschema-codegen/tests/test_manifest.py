@@ -0,0 +1,85 @@
+from metaschema_codegen.codegen.python.manifest import MANIFEST_FILENAME
+from metaschema_codegen.codegen.python.package_generator import PackageGenerator
+from metaschema_codegen.core.datatypes import SimpleRestrictionDatatype
+from metaschema_codegen.core.schemaparse import MetaSchemaSet, Metaschema
+
+
+def _metaschema_set(group_name: str = "group") -> MetaSchemaSet:
+    return MetaSchemaSet(
+        datatypes=[
+            SimpleRestrictionDatatype(
+                name="StringDatatype",
+                ref_name="string",
+                documentation=None,
+                base_type="string",
+                patterns={"xml": "\\S.*", "pcre": "\\S.*"},
+            )
+        ],
+        metaschemas=[
+            Metaschema(
+                file="catalog.xml",
+                short_name="catalog",
+                imports=[],
+                globals={},
+                roots=[],
+                schema_dict={
+                    "short-name": "catalog",
+                    "schema-version": "1.0",
+                    "define-assembly": [{"@name": "catalog", "root-name": "catalog"}],
+                },
+            ),
+            Metaschema(
+                file="profile.xml",
+                short_name="profile",
+                imports=[],
+                globals={},
+                roots=[],
+                schema_dict={
+                    "short-name": "profile",
+                    "schema-version": "1.0",
+                    "define-assembly": [{"@name": group_name}],
+                },
+            ),
+        ],
+    )
+
+
+def _modification_times(package_path) -> dict[str, int]:
+    return {path.name: path.stat().st_mtime_ns for path in package_path.iterdir()}
+
+
+class TestGenerationManifest:
+    def test_incremental_generation(self, tmp_path):
+        package_path = tmp_path.joinpath("oscal")
+        generated = PackageGenerator(_metaschema_set(), tmp_path, "oscal")
+        assert package_path.joinpath(MANIFEST_FILENAME).is_file()
+        assert generated.unchanged_modules == []
+        written = _modification_times(package_path)
+
+        # nothing changed, so nothing is rendered or written
+        regenerated = PackageGenerator(
+            _metaschema_set(), tmp_path, "oscal", ignore_existing_files=True
+        )
+        assert regenerated.rendered_modules == []
+        assert _modification_times(package_path) == written
+
+        # only the module of the changed metaschema is rendered
+        regenerated = PackageGenerator(
+            _metaschema_set(group_name="control"),
+            tmp_path,
+            "oscal",
+            ignore_existing_files=True,
+        )
+        assert regenerated.rendered_modules == ["profile"]
+
+        # a module that is no longer generated is deleted, and a file changed since it was written is rewritten
+        package_path.joinpath("datatypes.py").write_text("# edited")
+        PackageGenerator(
+            _metaschema_set(),
+            tmp_path,
+            "oscal",
+            ignore_existing_files=True,
+            roots=["catalog"],
+        )
+        assert not package_path.joinpath("profile.py").exists()
+        assert "# edited" not in package_path.joinpath("datatypes.py").read_text()
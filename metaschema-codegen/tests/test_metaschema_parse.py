@@ -1,4 +1,13 @@
-from metaschema_codegen.core.schemaparse import MetaSchemaSet
+import functools
+import shutil
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from metaschema_codegen.core.schemaparse import (
+    LazyMetaschemas,
+    MetaSchemaSet,
+    MetaschemaSetParser,
+)
 
 
 class TestSchemaParser:
@@ -19,3 +28,121 @@ class TestSchemaParser:
 
     def test_metaschemas(self, parsed_metaschema):
         assert isinstance(parsed_metaschema.metaschemas, list)
+
+    def test_parallel_parse(self, parsed_metaschema):
+        parallel_metaschema = MetaschemaSetParser(
+            metaschema_location="OSCAL/src/metaschema/oscal_complete_metaschema.xml",
+            jobs=4,
+        ).metaschema_set
+        assert parallel_metaschema == parsed_metaschema
+
+    def test_refresh(self, tmp_path):
+        shutil.copytree("OSCAL/src/metaschema", tmp_path, dirs_exist_ok=True)
+        parser = MetaschemaSetParser(
+            metaschema_location=str(tmp_path.joinpath("oscal_complete_metaschema.xml")),
+            use_snapshot=False,
+        )
+        assert parser.refresh() == set()
+
+        catalog_file = tmp_path.joinpath("oscal_catalog_metaschema.xml")
+        catalog_file.write_text(catalog_file.read_text() + "<!-- edited -->\n")
+        assert parser.refresh() == {
+            "oscal_catalog_metaschema.xml",
+            "oscal_complete_metaschema.xml",
+        }
+
+    def test_lxml_engine(self, parsed_metaschema):
+        lxml_metaschema = MetaschemaSetParser(
+            metaschema_location="OSCAL/src/metaschema/oscal_complete_metaschema.xml",
+            use_snapshot=False,
+            engine="lxml",
+        ).metaschema_set
+        assert lxml_metaschema == parsed_metaschema
+
+    def test_validation_modes(self, parsed_metaschema):
+        for validation in ("lax", "skip"):
+            metaschema_set = MetaschemaSetParser(
+                metaschema_location="OSCAL/src/metaschema/oscal_complete_metaschema.xml",
+                use_snapshot=False,
+                validation=validation,
+            ).metaschema_set
+            assert metaschema_set == parsed_metaschema
+
+    def test_lazy(self, parsed_metaschema):
+        parser = MetaschemaSetParser(
+            metaschema_location="OSCAL/src/metaschema/oscal_complete_metaschema.xml",
+            use_snapshot=False,
+            lazy=True,
+        )
+        metaschemas = parser.metaschema_set.metaschemas
+        assert isinstance(metaschemas, LazyMetaschemas)
+        assert parser.metaschema_set.datatypes == parsed_metaschema.datatypes
+
+        # Only the catalog and its imports are parsed
+        catalog = metaschemas.closure("oscal_catalog_metaschema.xml")
+        assert catalog[0].short_name == "oscal-catalog"
+        assert set(metaschemas.parsed.keys()) == {
+            metaschema.file for metaschema in catalog
+        }
+        assert "oscal_ssp_metaschema.xml" not in metaschemas.parsed
+
+        assert parser.metaschema_set.metaschema_list() == parsed_metaschema.metaschemas
+
+    def test_multiple_roots(self, parsed_metaschema):
+        parser = MetaschemaSetParser(
+            metaschema_location=[
+                "OSCAL/src/metaschema/oscal_catalog_metaschema.xml",
+                "OSCAL/src/metaschema/oscal_profile_metaschema.xml",
+            ],
+            use_snapshot=False,
+            profile=True,
+        )
+        metaschema_set = parser.metaschema_set
+
+        # The shared imports are parsed once
+        assert parser.report is not None
+        parsed_files = [timing.file for timing in parser.report.files]
+        assert len(parsed_files) == len(set(parsed_files))
+
+        assert metaschema_set.reached_by["oscal_metadata_metaschema.xml"] == [
+            "oscal_catalog_metaschema.xml",
+            "oscal_profile_metaschema.xml",
+        ]
+        assert metaschema_set.reached_by["oscal_profile_metaschema.xml"] == [
+            "oscal_profile_metaschema.xml"
+        ]
+        catalog = {
+            metaschema.file: metaschema for metaschema in parsed_metaschema.metaschemas
+        }
+        assert metaschema_set.closure("oscal_catalog_metaschema.xml") == [
+            catalog[metaschema.file]
+            for metaschema in metaschema_set.closure("oscal_catalog_metaschema.xml")
+        ]
+
+    def test_remote(self, parsed_metaschema, tmp_path):
+        handler = functools.partial(
+            SimpleHTTPRequestHandler, directory="OSCAL/src/metaschema"
+        )
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            remote_metaschema = MetaschemaSetParser(
+                metaschema_location=f"http://127.0.0.1:{server.server_port}/oscal_complete_metaschema.xml",
+                cache_dir=tmp_path,
+                use_snapshot=False,
+            ).metaschema_set
+        finally:
+            server.shutdown()
+        assert remote_metaschema.metaschemas == parsed_metaschema.metaschemas
+
+    def test_profile(self):
+        parser = MetaschemaSetParser(
+            metaschema_location="OSCAL/src/metaschema/oscal_complete_metaschema.xml",
+            use_snapshot=False,
+            profile=True,
+        )
+        assert parser.report is not None
+        assert "metaschemas" in parser.report.phases
+        assert {timing.file for timing in parser.report.files} == {
+            metaschema.file for metaschema in parser.metaschema_set.metaschemas
+        }
@@ -0,0 +1,140 @@
+import pickle
+
+from metaschema_codegen.core.model import (
+    AllowedValuesConstraint,
+    AssemblyDefinition,
+    Choice,
+    Constraint,
+    FieldDefinition,
+    FlagDefinition,
+    FlagReference,
+    InstanceReference,
+    MetaschemaDefinitions,
+)
+
+SCHEMA_DICT = {
+    "short-name": "test",
+    "schema-version": "1.0",
+    "define-assembly": [
+        {
+            "@name": "catalog",
+            "formal-name": "Catalog",
+            "root-name": "catalog",
+            "flag": [{"@ref": "uuid", "@required": "yes"}],
+            "model": {
+                "assembly": [
+                    {
+                        "@ref": "group",
+                        "@max-occurs": "unbounded",
+                        "group-as": {"@name": "groups", "@in-json": "ARRAY"},
+                    }
+                ],
+                "define-field": [
+                    {"@name": "title", "@min-occurs": 1, "@as-type": "markup-line"}
+                ],
+                "choice": [{"field": [{"@ref": "a"}, {"@ref": "b"}]}],
+            },
+        }
+    ],
+    "define-field": [
+        {
+            "@name": "link",
+            "formal-name": "Link",
+            "use-name": "href-link",
+            "json-value-key": "text",
+            "define-flag": [{"@name": "rel", "@as-type": "token"}],
+        }
+    ],
+    "define-flag": [
+        {
+            "@name": "uuid",
+            "formal-name": "Universally Unique Identifier",
+            "@as-type": "uuid",
+            "@scope": "local",
+            "prop": [{"@name": "status", "@value": "internal"}],
+            "constraint": {
+                "allowed-values": {
+                    "@allow-other": "yes",
+                    "enum": [{"@value": "x", "$": "The x value."}],
+                },
+                "expect": [{"@test": "true()", "@level": "WARNING"}],
+                "index": {"@name": "by-id", "key-field": {"@target": "@id"}},
+                "something-new": {"@target": "."},
+            },
+        }
+    ],
+}
+
+
+class TestModel:
+    def test_definitions(self):
+        definitions = MetaschemaDefinitions.from_dict(SCHEMA_DICT)
+
+        assert definitions.schema_version == "1.0"
+        assert [definition.name for definition in definitions] == [
+            "uuid",
+            "link",
+            "catalog",
+        ]
+
+        flag = definitions.flags[0]
+        assert isinstance(flag, FlagDefinition)
+        assert flag.scope == "local"
+        assert flag.class_name == "UniversallyUniqueIdentifier"
+        assert flag.props[0].value == "internal"
+
+        field = definitions.fields[0]
+        assert field.effective_name == "href-link"
+        assert field.python_name == "href_link"
+        assert field.json_value_key == "text"
+        assert isinstance(field.flags[0], FlagDefinition)
+        assert field.flags[0].scope == "local"
+
+    def test_model(self):
+        assembly = MetaschemaDefinitions.from_dict(SCHEMA_DICT).assemblies[0]
+        assert assembly.root_name == "catalog"
+
+        uuid = assembly.flags[0]
+        assert isinstance(uuid, FlagReference)
+        assert uuid.required
+
+        group, title, choice = assembly.model
+        assert isinstance(group, InstanceReference)
+        assert group.kind == "assembly"
+        assert group.max_occurs is None
+        assert group.multiple and not group.required
+        assert group.group_as is not None
+        assert group.group_as.in_json == "ARRAY"
+        assert group.group_as.in_xml == "UNGROUPED"
+
+        assert isinstance(title, FieldDefinition)
+        assert title.required and not title.multiple
+
+        assert isinstance(choice, Choice)
+        assert [instance.ref for instance in choice.instances] == ["a", "b"]
+
+    def test_constraints(self):
+        constraints = MetaschemaDefinitions.from_dict(SCHEMA_DICT).flags[0].constraints
+        assert [constraint.kind for constraint in constraints] == [
+            "allowed-values",
+            "expect",
+            "index",
+            "something-new",
+        ]
+
+        allowed_values = constraints[0]
+        assert isinstance(allowed_values, AllowedValuesConstraint)
+        assert allowed_values.allow_other
+        assert allowed_values.target == "."
+        assert allowed_values.values[0].description == "The x value."
+
+        assert constraints[1].level == "WARNING"
+        assert type(constraints[3]) is Constraint
+
+    def test_slots_and_pickle(self):
+        definitions = MetaschemaDefinitions.from_dict(SCHEMA_DICT)
+        assembly = definitions.assemblies[0]
+        assert isinstance(assembly, AssemblyDefinition)
+        assert not hasattr(assembly, "__dict__")
+
+        assert pickle.loads(pickle.dumps(definitions)) == definitions
@@ -0,0 +1,117 @@
+import threading
+
+import pytest
+
+from metaschema_codegen.codegen import CodeGenException
+from metaschema_codegen.codegen.python import package_generator
+from metaschema_codegen.codegen.python.package_generator import PackageGenerator
+from metaschema_codegen.codegen.python.package_writer import PackageWriter
+from metaschema_codegen.core.schemaparse import MetaSchemaSet
+
+from tests.metaschemas import metaschema, string_datatype
+
+
+def _metaschema_set(group_name: str = "group") -> MetaSchemaSet:
+    return MetaSchemaSet(
+        datatypes=[string_datatype()],
+        metaschemas=[
+            metaschema(
+                "catalog.xml",
+                schema_dict={
+                    "short-name": "catalog",
+                    "schema-version": "1.0",
+                    "define-assembly": [{"@name": group_name}],
+                },
+            ),
+        ],
+    )
+
+
+def _contents(path) -> dict[str, bytes]:
+    return {file.name: file.read_bytes() for file in path.iterdir() if file.is_file()}
+
+
+class TestPackageWriter:
+    def test_commit(self, tmp_path):
+        package_path = tmp_path.joinpath("package")
+        package_path.mkdir()
+        package_path.joinpath("kept.py").write_text("kept")
+        package_path.joinpath("removed.py").write_text("removed")
+        package_path.joinpath("__pycache__").mkdir()
+        package_path.joinpath("__pycache__", "kept.pyc").write_text("cached")
+        kept_inode = package_path.joinpath("kept.py").stat().st_ino
+
+        writer = PackageWriter(package_path)
+        writer.write_file("written.py", b"written")
+        # nothing changes until the commit
+        assert not package_path.joinpath("written.py").exists()
+        writer.commit(removed=["removed.py"])
+
+        assert _contents(package_path) == {"kept.py": b"kept", "written.py": b"written"}
+        assert package_path.joinpath("kept.py").stat().st_ino == kept_inode
+        assert package_path.joinpath("__pycache__", "kept.pyc").is_file()
+        assert sorted(path.name for path in tmp_path.iterdir()) == [
+            ".package.lock",
+            "package",
+        ]
+
+    def test_recovery(self, tmp_path):
+        package_path = tmp_path.joinpath("package")
+        # a generation that died after moving the package to its backup, and before swapping in its staging
+        tmp_path.joinpath(".package.backup").mkdir()
+        tmp_path.joinpath(".package.backup", "module.py").write_text("previous")
+        tmp_path.joinpath(".package.0123abcd.staging").mkdir()
+
+        PackageWriter(package_path)
+        assert sorted(path.name for path in tmp_path.iterdir()) == [
+            ".package.lock",
+            "package",
+        ]
+        assert _contents(package_path) == {"module.py": b"previous"}
+
+    def test_concurrent_writers(self, tmp_path):
+        package_path = tmp_path.joinpath("package")
+        first = PackageWriter(package_path)
+        first.write_file("first.py", b"first")
+
+        # a second writer waits for the first one, instead of deleting its staging directory
+        second_writer: list[PackageWriter] = []
+        thread = threading.Thread(
+            target=lambda: second_writer.append(PackageWriter(package_path))
+        )
+        thread.start()
+        thread.join(timeout=0.2)
+        assert thread.is_alive()
+        first.commit()
+        thread.join(timeout=5)
+        assert _contents(package_path) == {"first.py": b"first"}
+
+        (second,) = second_writer
+        second.write_file("second.py", b"second")
+        second.commit()
+        assert _contents(package_path) == {"first.py": b"first", "second.py": b"second"}
+
+
+class TestAtomicGeneration:
+    def test_failed_generation(self, tmp_path, monkeypatch):
+        package_path = tmp_path.joinpath("oscal")
+        PackageGenerator(_metaschema_set(), tmp_path, "oscal")
+        generated = _contents(package_path)
+
+        def _module_generator(source):
+            raise CodeGenException("rendering failed")
+
+        monkeypatch.setattr(package_generator, "_module_generator", _module_generator)
+        with pytest.raises(CodeGenException, match="rendering failed"):
+            PackageGenerator(
+                _metaschema_set(group_name="control"),
+                tmp_path,
+                "oscal",
+                ignore_existing_files=True,
+            )
+        # the package is as the first generation left it, and the staging directory is gone
+        assert _contents(package_path) == generated
+        assert sorted(path.name for path in tmp_path.iterdir()) == [
+            ".oscal.lock",
+            "oscal",
+        ]
@@ -0,0 +1,106 @@
+import io
+
+from metaschema_codegen.codegen.python import ModuleSource
+from metaschema_codegen.codegen.python.field_generator import (
+    TopLevelFieldClassGenerator,
+)
+from metaschema_codegen.codegen.python.package_generator import (
+    PackageGenerator,
+    _ForeignNode,
+    _ModuleUnpickler,
+    _pack_module_source,
+)
+from metaschema_codegen.core.schemaparse import MetaSchemaSet
+
+from tests.metaschemas import metaschema, string_datatype
+
+
+def _metaschema_set() -> MetaSchemaSet:
+    return MetaSchemaSet(
+        datatypes=[string_datatype()],
+        metaschemas=[
+            metaschema(
+                "profile.xml",
+                imports=["catalog.xml"],
+                schema_dict={
+                    "define-assembly": [
+                        {
+                            "@name": "profile",
+                            "formal-name": "Profile",
+                            "model": {"assembly": [{"@ref": "catalog"}]},
+                            "constraint": {
+                                "expect": [{"@target": "catalog", "@test": "@id"}]
+                            },
+                        }
+                    ],
+                    # a field with a flag of the catalog module
+                    "define-field": [
+                        {
+                            "@name": "title",
+                            "@as-type": "string",
+                            "flag": [{"@ref": "id"}],
+                        }
+                    ],
+                },
+            ),
+            metaschema(
+                "catalog.xml",
+                schema_dict={
+                    "define-assembly": [{"@name": "catalog", "formal-name": "Catalog"}],
+                    "define-flag": [{"@name": "id", "@as-type": "string"}],
+                },
+            ),
+        ],
+    )
+
+
+class TestParallelGeneration:
+    def test_same_output(self, tmp_path):
+        serial = PackageGenerator(_metaschema_set(), tmp_path, "serial")
+        parallel = PackageGenerator(
+            _metaschema_set(), tmp_path, "parallel", ignore_existing_files=True, jobs=2
+        )
+        assert sorted(serial.rendered_modules) == ["catalog", "datatypes", "profile"]
+        # the modules are written in the order they finish
+        assert sorted(parallel.rendered_modules) == sorted(serial.rendered_modules)
+
+        # the packages have the same files, byte for byte
+        serial_files = {
+            path.name: path.read_bytes()
+            for path in tmp_path.joinpath("serial").iterdir()
+            if path.is_file()
+        }
+        parallel_files = {
+            path.name: path.read_bytes()
+            for path in tmp_path.joinpath("parallel").iterdir()
+            if path.is_file()
+        }
+        assert parallel_files == serial_files
+
+    def test_module_source(self):
+        metaschema_set = _metaschema_set()
+        source = ModuleSource.from_graph(
+            metaschema=metaschema_set.metaschema_list()[0],
+            graph=metaschema_set.graph,
+            constraint_table=metaschema_set.constraints,
+        )
+        unpacked = _ModuleUnpickler(io.BytesIO(_pack_module_source(source))).load()
+
+        # the catalog module isn't sent along with the profile module, only stand-ins for its nodes
+        title, profile = unpacked.nodes
+        catalog = profile.model[0].target
+        assert isinstance(catalog, _ForeignNode)
+        assert (catalog.kind, catalog.module_name, catalog.class_name) == (
+            "assembly",
+            "catalog",
+            "Catalog",
+        )
+        assert not catalog.inline
+        (expect,) = unpacked.constraints(profile)
+        assert expect.target.valid and expect.parameters["test"].expression == "@id"
+
+        # a class with an instance of another module renders as it does from the graph
+        assert (
+            TopLevelFieldClassGenerator(title, unpacked).generated_class
+            == TopLevelFieldClassGenerator(source.nodes[0], source).generated_class
+        )
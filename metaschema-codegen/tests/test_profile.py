@@ -0,0 +1,31 @@
+import tracemalloc
+
+from metaschema_codegen.core.profile import NULL_PROFILER, FileTiming, Profiler
+
+
+class TestProfiler:
+    def test_report(self):
+        profiler = Profiler()
+        with profiler.phase("parse"):
+            data = [bytes(1024) for _ in range(1024)]
+        with profiler.phase("parse"):
+            pass
+        profiler.add_phase("xsd compile", 1.5)
+        profiler.add_file(FileTiming(file="a.xml", parse_seconds=1, decode_seconds=2))
+        report = profiler.stop()
+
+        assert list(report.phases) == ["parse", "xsd compile"]
+        assert report.phases["xsd compile"] == 1.5
+        assert report.files[0].total_seconds == 3
+        assert report.peak_memory is not None and report.peak_memory > len(data) * 1024
+        assert not tracemalloc.is_tracing()
+        assert "a.xml" in str(report)
+
+    def test_disabled(self):
+        with NULL_PROFILER.phase("parse"):
+            pass
+        NULL_PROFILER.add_file(FileTiming(file="a.xml"))
+        report = NULL_PROFILER.stop()
+
+        assert report.phases == {} and report.files == []
+        assert not NULL_PROFILER.enabled
@@ -0,0 +1,121 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from metaschema_codegen.core.cache import SchemaCache, SchemaCacheException
+from metaschema_codegen.core.pool import ConnectionPool
+from metaschema_codegen.core.remote import mirror_metaschemas
+
+
+def _metaschema(*imports: str) -> bytes:
+    import_elements = "".join(f'<import href="{href}"/>' for href in imports)
+    return (
+        '<METASCHEMA xmlns="http://csrc.nist.gov/ns/oscal/metaschema/1.0">'
+        f"{import_elements}</METASCHEMA>"
+    ).encode()
+
+
+class MetaschemaHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1, so connections are kept alive between requests
+    protocol_version = "HTTP/1.1"
+    files = {
+        "/ms/root.xml": _metaschema("a.xml", "b.xml"),
+        "/ms/a.xml": _metaschema("common.xml"),
+        "/ms/b.xml": _metaschema("common.xml"),
+        "/ms/common.xml": _metaschema(),
+        "/ms/outside.xml": _metaschema("../secret.xml"),
+        "/old/root.xml": b"",
+    }
+    requests: list[tuple[str, int]] = []
+
+    def do_GET(self):
+        if self.path.startswith("/old/"):
+            self._respond(301, location=self.path.replace("/old/", "/ms/"))
+            return
+
+        contents = self.files.get(self.path)
+        if contents is None:
+            self._respond(404)
+            return
+
+        etag = f'"{hash(contents)}"'
+        if self.headers.get("If-None-Match") == etag:
+            self._respond(304)
+            return
+
+        self._respond(200, contents, etag=etag)
+
+    def _respond(self, status, contents=b"", etag=None, location=None):
+        self.requests.append((self.path, status))
+        self.send_response(status)
+        if etag is not None:
+            self.send_header("ETag", etag)
+        if location is not None:
+            self.send_header("Location", location)
+        self.send_header("Content-Length", str(len(contents)))
+        self.end_headers()
+        self.wfile.write(contents)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def metaschema_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MetaschemaHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    MetaschemaHandler.requests.clear()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+class TestConnectionPool:
+    def test_reuse(self, metaschema_server):
+        pool = ConnectionPool()
+        for _ in range(3):
+            assert pool.get(metaschema_server + "/ms/common.xml").status == 200
+        assert pool.connections_opened == 1
+
+    def test_redirect(self, metaschema_server):
+        response = ConnectionPool().get(metaschema_server + "/old/root.xml")
+        assert response.status == 200
+        assert response.url == metaschema_server + "/ms/root.xml"
+
+
+class TestMirror:
+    def test_mirror(self, tmp_path, metaschema_server):
+        cache = SchemaCache(cache_dir=tmp_path)
+        directory, start_file = mirror_metaschemas(
+            cache, metaschema_server + "/ms/root.xml", jobs=4
+        )
+
+        assert start_file == "root.xml"
+        assert sorted(file.name for file in directory.iterdir()) == [
+            "a.xml",
+            "b.xml",
+            "common.xml",
+            "root.xml",
+        ]
+        # common.xml is imported twice but fetched once, over pooled connections
+        assert MetaschemaHandler.requests.count(("/ms/common.xml", 200)) == 1
+        assert cache.pool.connections_opened <= 4
+
+    def test_revalidation(self, tmp_path, metaschema_server):
+        mirror_metaschemas(
+            SchemaCache(cache_dir=tmp_path), metaschema_server + "/ms/root.xml"
+        )
+        MetaschemaHandler.requests.clear()
+
+        directory, _ = mirror_metaschemas(
+            SchemaCache(cache_dir=tmp_path), metaschema_server + "/ms/root.xml"
+        )
+        assert {status for _, status in MetaschemaHandler.requests} == {304}
+        assert directory.joinpath("common.xml").read_bytes() == _metaschema()
+
+    def test_import_outside_base(self, tmp_path, metaschema_server):
+        with pytest.raises(SchemaCacheException):
+            mirror_metaschemas(
+                SchemaCache(cache_dir=tmp_path), metaschema_server + "/ms/outside.xml"
+            )
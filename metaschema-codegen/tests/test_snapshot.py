@@ -0,0 +1,106 @@
+from metaschema_codegen.core.schemaparse import MetaSchemaSet, Metaschema
+from metaschema_codegen.core.snapshot import (
+    Snapshot,
+    input_fingerprint,
+    load_snapshot,
+    save_snapshot,
+)
+
+from tests.metaschemas import metaschema
+
+
+def _metaschema_set() -> MetaSchemaSet:
+    return MetaSchemaSet(
+        metaschemas=[
+            Metaschema(
+                file="root.xml",
+                short_name="root",
+                imports=["common.xml"],
+                globals={"thing": "Thing"},
+                roots=["Thing"],
+                schema_dict={"short-name": "root"},
+            )
+        ]
+    )
+
+
+def _constrained_set() -> MetaSchemaSet:
+    return MetaSchemaSet(
+        metaschemas=[
+            metaschema(
+                "catalog.xml",
+                schema_dict={
+                    "define-assembly": [
+                        {
+                            "@name": "catalog",
+                            "constraint": {
+                                "expect": [
+                                    {
+                                        "@target": ".",
+                                        "@test": "has-oscal-namespace(@ns)",
+                                    }
+                                ]
+                            },
+                        }
+                    ],
+                },
+            )
+        ]
+    )
+
+
+class TestSnapshot:
+    def test_round_trip(self, tmp_path):
+        snapshot_file = tmp_path.joinpath("set.snapshot")
+        save_snapshot(
+            snapshot_file,
+            Snapshot(
+                fingerprint="abc", files=["root.xml"], metaschema_set=_metaschema_set()
+            ),
+        )
+
+        snapshot = load_snapshot(snapshot_file)
+        assert snapshot is not None
+        assert snapshot.fingerprint == "abc"
+        assert snapshot.metaschema_set == _metaschema_set()
+
+    def test_missing_or_foreign_file(self, tmp_path):
+        assert load_snapshot(tmp_path.joinpath("missing.snapshot")) is None
+
+        foreign_file = tmp_path.joinpath("foreign.snapshot")
+        foreign_file.write_bytes(b"not a snapshot")
+        assert load_snapshot(foreign_file) is None
+
+    def test_fingerprint(self, tmp_path):
+        tmp_path.joinpath("root.xml").write_text("<METASCHEMA/>")
+        tmp_path.joinpath("common.xml").write_text("<METASCHEMA/>")
+        files = ["root.xml", "common.xml"]
+
+        fingerprint = input_fingerprint(tmp_path, files, "xsd")
+        assert fingerprint == input_fingerprint(tmp_path, list(reversed(files)), "xsd")
+        assert fingerprint != input_fingerprint(tmp_path, files, "other-xsd")
+
+        tmp_path.joinpath("common.xml").write_text("<METASCHEMA></METASCHEMA>")
+        assert fingerprint != input_fingerprint(tmp_path, files, "xsd")
+
+        tmp_path.joinpath("common.xml").unlink()
+        assert input_fingerprint(tmp_path, files, "xsd") is None
+
+    def test_caches_not_pickled(self, tmp_path):
+        metaschema_set = _constrained_set()
+        # parsing the constraints builds the symbol table, graph and constraint table
+        assert len(metaschema_set.constraints.entries) == 1
+        snapshot_file = tmp_path.joinpath("set.snapshot")
+        save_snapshot(
+            snapshot_file,
+            Snapshot(
+                fingerprint="abc", files=["catalog.xml"], metaschema_set=metaschema_set
+            ),
+        )
+
+        snapshot = load_snapshot(snapshot_file)
+        assert snapshot is not None
+        loaded = snapshot.metaschema_set
+        assert not hasattr(loaded, "_constraints")
+        # the caches are rebuilt on first use
+        assert len(loaded.constraints.entries) == 1
@@ -0,0 +1,84 @@
+from metaschema_codegen.core.schemaparse import MetaSchemaSet
+
+from tests.metaschemas import metaschema
+
+
+def _metaschema_set() -> MetaSchemaSet:
+    return MetaSchemaSet(
+        metaschemas=[
+            metaschema(
+                "root.xml",
+                imports=["catalog.xml", "profile.xml"],
+                schema_dict={
+                    "define-flag": [{"@name": "id", "formal-name": "Root Identifier"}]
+                },
+            ),
+            metaschema(
+                "catalog.xml",
+                imports=["common.xml"],
+                schema_dict={
+                    "define-assembly": [{"@name": "group", "formal-name": "Group"}]
+                },
+            ),
+            metaschema(
+                "profile.xml",
+                imports=["common.xml"],
+                schema_dict={
+                    "define-assembly": [{"@name": "group", "formal-name": "Group"}]
+                },
+            ),
+            metaschema(
+                "common.xml",
+                schema_dict={
+                    "define-flag": [
+                        {"@name": "id", "formal-name": "Identifier"},
+                        {"@name": "secret", "@scope": "local"},
+                    ],
+                    "define-field": [{"@name": "id", "formal-name": "Identifier"}],
+                },
+            ),
+        ]
+    )
+
+
+class TestSymbolTable:
+    def test_resolve(self):
+        symbols = _metaschema_set().symbols
+
+        # a local definition shadows the imported one, kinds have separate namespaces
+        assert symbols.resolve("root.xml", "flag", "id").schema == "root.xml"
+        assert symbols.resolve("root.xml", "field", "id").schema == "common.xml"
+        assert symbols.resolve("catalog.xml", "flag", "id").schema == "common.xml"
+
+        # local definitions are only visible in their own metaschema
+        assert symbols.resolve("catalog.xml", "flag", "secret") is None
+        assert symbols.resolve("common.xml", "flag", "secret") is not None
+        assert symbols.resolve("common.xml", "assembly", "group") is None
+
+        assert [symbol.schema for symbol in symbols.formal_names["Identifier"]] == [
+            "common.xml",
+            "common.xml",
+        ]
+        assert len(symbols.modules["common"]) == 3
+
+    def test_shadowing_and_conflicts(self):
+        symbols = _metaschema_set().symbols
+
+        assert [
+            (conflict.schema, conflict.symbol.key) for conflict in symbols.shadowed
+        ] == [("root.xml", ("flag", "id"))]
+
+        # the same definition imported twice is not a conflict
+        assert [
+            (conflict.schema, conflict.symbol.schema, conflict.other.schema)
+            for conflict in symbols.conflicts
+        ] == [("root.xml", "catalog.xml", "profile.xml")]
+
+    def test_rebuilt_when_metaschemas_change(self):
+        metaschema_set = _metaschema_set()
+        symbols = metaschema_set.symbols
+        assert metaschema_set.symbols is symbols
+
+        metaschema_set.metaschemas[3] = metaschema("common.xml", {})
+        assert metaschema_set.symbols is not symbols
+        assert metaschema_set.symbols.resolve("root.xml", "field", "id") is None
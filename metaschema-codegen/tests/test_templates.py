@@ -0,0 +1,163 @@
+from metaschema_codegen.codegen import python as codegen
+from metaschema_codegen.codegen.python.package_generator import PackageGenerator
+from metaschema_codegen.core.schemaparse import MetaSchemaSet
+from metaschema_codegen.databind.bindings import load_runtime
+from metaschema_codegen.codegen.python import (
+    constraint_generator,
+    datatypes_generator,
+    field_generator,
+    flag_generator,
+    module_generator,
+)
+
+from tests.metaschemas import metaschema, string_datatype
+
+
+def _metaschema_set() -> MetaSchemaSet:
+    return MetaSchemaSet(
+        datatypes=[string_datatype()],
+        metaschemas=[
+            metaschema(
+                "catalog.xml",
+                schema_dict={
+                    "short-name": "catalog",
+                    "schema-version": "1.0",
+                    "define-flag": [
+                        {
+                            "@name": "id",
+                            "formal-name": "Identifier",
+                            "@as-type": "string",
+                        }
+                    ],
+                },
+            ),
+        ],
+    )
+
+
+def _assembly_set() -> MetaSchemaSet:
+    return MetaSchemaSet(
+        datatypes=[],
+        metaschemas=[
+            metaschema(
+                "catalog.xml",
+                schema_dict={
+                    "short-name": "catalog",
+                    "schema-version": "1.0",
+                    "define-assembly": [
+                        {
+                            "@name": "catalog",
+                            "model": {
+                                "assembly": [
+                                    {"@ref": "metadata"},
+                                    {
+                                        "@ref": "control",
+                                        "@max-occurs": "unbounded",
+                                        "group-as": {"@name": "controls"},
+                                    },
+                                ]
+                            },
+                        },
+                        {"@name": "metadata"},
+                        {"@name": "control"},
+                    ],
+                },
+            ),
+        ],
+    )
+
+
+class TestTemplates:
+    def test_shared_environment(self):
+        for module in (
+            constraint_generator,
+            datatypes_generator,
+            field_generator,
+            flag_generator,
+            module_generator,
+        ):
+            assert module.jinja_env is codegen.jinja_env
+
+    def test_bytecode_cache(self, tmp_path, monkeypatch):
+        compiled = codegen._initialize_jinja(tmp_path)
+        names = compiled.list_templates(extensions=["jinja2"])
+        for name in names:
+            compiled.get_template(name)
+        assert len(list(tmp_path.joinpath("templates").iterdir())) == len(names)
+
+        # a new environment loads the bytecode instead of compiling the templates
+        def compile(*args, **kwargs):
+            raise AssertionError("compiled a cached template")
+
+        cached = codegen._initialize_jinja(tmp_path)
+        monkeypatch.setattr(cached, "compile", compile)
+        for name in names:
+            assert cached.get_template(name).render is not None
+
+    def test_configured_cache_dir(self, tmp_path, tmp_path_factory):
+        # outside the destination, which has to be empty
+        cache_dir = tmp_path_factory.mktemp("cache")
+        try:
+            names = codegen.precompile_templates(cache_dir)
+            assert codegen.template_cache_dir() == cache_dir
+            assert len(list(cache_dir.joinpath("templates").iterdir())) == len(names)
+
+            codegen.configure_template_cache(None)
+            PackageGenerator(
+                _metaschema_set(),
+                tmp_path,
+                "package",
+                cache_dir=cache_dir,
+            )
+            assert codegen.template_cache_dir() == cache_dir
+        finally:
+            codegen.configure_template_cache(None)
+
+    def test_slots(self, tmp_path):
+        PackageGenerator(_metaschema_set(), tmp_path, "plain")
+        PackageGenerator(
+            _metaschema_set(),
+            tmp_path,
+            "slotted",
+            ignore_existing_files=True,
+            slots=True,
+        )
+        assert "__slots__" not in tmp_path.joinpath("plain", "catalog.py").read_text()
+        assert (
+            "__slots__ = ('value',)"
+            in tmp_path.joinpath("slotted", "catalog.py").read_text()
+        )
+
+    def test_assembly_slots(self):
+        metaschema_set = _assembly_set()
+        source = codegen.ModuleSource.from_graph(
+            metaschema=metaschema_set.metaschema_list()[0],
+            graph=metaschema_set.graph,
+            constraint_table=metaschema_set.constraints,
+            slots=True,
+        )
+        code = codegen.jinja_env.get_template("class_assembly.py.jinja2").render(
+            class_name="Catalog",
+            base_class="Assembly",
+            fields=[],
+            **source.layout_properties(source.nodes[0]),
+        )
+        assert "@dataclass" not in code
+
+        # the base classes don't implement serialization yet, so the abstract methods are filled in to create objects
+        assembly = load_runtime().Assembly
+        namespace = {
+            "Assembly": type(
+                "Assembly",
+                (assembly,),
+                {
+                    "__slots__": (),
+                    **{name: None for name in assembly.__abstractmethods__},
+                },
+            )
+        }
+        exec(code, namespace)
+        catalog = namespace["Catalog"]()
+        assert catalog.__slots__ == ("metadata", "control")
+        assert not hasattr(catalog, "__dict__")
+        assert catalog.metadata is None and catalog.control == []